@@ -127,7 +127,30 @@ class Graph:
         g.edge(previousNode, userNode, arrowhead="none")
         return userNode
 
+    # nested blocks are drawn without recursion: _graph(), _parallel() and _condition() are generators that yield the generator of every nested block
+    # and receive its end node back, _run() drives them with an explicit stack (so nesting depth is not limited by the recursion limit)
     def createGraph(self, previousNode, nodeList, g):
+        return self._run(self._graph(previousNode, nodeList, g))
+
+    def createParallel(self, parallelStart, childNodes, parallelEnd, g):
+        return self._run(self._parallel(parallelStart, childNodes, parallelEnd, g))
+
+    def createCondition(self, start, condition, trysteps, yessteps, nosteps, end, g):
+        return self._run(self._condition(start, condition, trysteps, yessteps, nosteps, end, g))
+
+    def _run(self, generator):
+        stack = [generator]
+        result = None
+        while stack:
+            try:
+                stack.append(stack[-1].send(result))
+                result = None
+            except StopIteration as stop:
+                stack.pop()
+                result = stop.value
+        return result
+
+    def _graph(self, previousNode, nodeList, g):
         for entry in nodeList:
             self.counter+=1
             name = str(self.counter)
@@ -144,7 +167,7 @@ class Graph:
                 name = str(self.counter)
                 #g.node(name, "+", shape="diamond")
                 self.createParallelNode(name, "+", g)
-                self.createParallel(str(int(name)-1), entry["commands"], name, g)
+                yield self._parallel(str(int(name)-1), entry["commands"], name, g)
                 previousNode = name
             elif entry["type"] == "conditionSteps":
                 g.node(name, shape="point")
@@ -152,7 +175,7 @@ class Graph:
                 self.counter+=1
                 name = str(self.counter)
                 g.node(name, shape="point")
-                self.createCondition(str(int(name)-1), entry["condition"], entry["try"], entry["yes"], entry["no"], name, g)
+                yield self._condition(str(int(name)-1), entry["condition"], entry["try"], entry["yes"], entry["no"], name, g)
                 previousNode = name
             elif entry["type"] == "process":
                 hasUsers = False
@@ -161,7 +184,7 @@ class Graph:
                 if entry["visible"] == "False":
                     if hasUsers:
                         previousNode = self.createUsers(previousNode, entry["users"], g)
-                    previousNode = self.createGraph(previousNode, entry["commands"], g)
+                    previousNode = yield self._graph(previousNode, entry["commands"], g)
                 elif self.style == "full":
                         g.node(name, shape="point", width="0")
                         g.edge(previousNode, name, arrowhead="none")
@@ -171,7 +194,7 @@ class Graph:
                             c.attr(label=entry["name"])
                             if hasUsers:
                                 previousNode = self.createUsers(previousNode, entry["users"], c)
-                            previousNode = self.createGraph(previousNode, entry["commands"], c)
+                            previousNode = yield self._graph(previousNode, entry["commands"], c)
                             self.counter += 1
                             name = str(self.counter)
                             c.node(name, shape="point", width="0")
@@ -183,7 +206,7 @@ class Graph:
                     previousNode = name
                     if hasUsers:
                         previousNode = self.createUsers(previousNode, entry["users"], g)
-                    previousNode = self.createGraph(previousNode, entry["commands"], g)
+                    previousNode = yield self._graph(previousNode, entry["commands"], g)
                     self.counter += 1
                     name = str(self.counter)
                     g.node(name, "End " + entry["name"] + " >", shape="underline")
@@ -200,7 +223,7 @@ class Graph:
                             c.node(name, "", shape="none")
                             if hasUsers:
                                 name = self.createUsers(name, entry["users"], c)
-                            endNode = self.createGraph(name, entry["commands"], c)
+                            endNode = yield self._graph(name, entry["commands"], c)
                             self.counter += 1
                             name = str(self.counter)
                             c.node(name, "", shape="none")
@@ -211,7 +234,7 @@ class Graph:
         #g.node("end","", shape="circle", width="0.3", style="filled", fillcolor="red3")
         #g.edge(previousNode, "end")
 
-    def createParallel(self, parallelStart, childNodes, parallelEnd, g):
+    def _parallel(self, parallelStart, childNodes, parallelEnd, g):
         for node in childNodes:
             self.counter+=1
             name = str(self.counter)
@@ -225,7 +248,7 @@ class Graph:
                 self.counter+=1
                 name = str(self.counter)
                 self.createParallelNode(name, "+", g)
-                self.createParallel(str(int(name)-1), node["commands"], name, g)
+                yield self._parallel(str(int(name)-1), node["commands"], name, g)
                 g.edge(name, parallelEnd)
             elif node["type"] == "conditionSteps":
                 g.node(name, shape="point")
@@ -233,7 +256,7 @@ class Graph:
                 self.counter+=1
                 name = str(self.counter)
                 g.node(name, shape="point")
-                self.createCondition(str(int(name)-1), node["condition"], node["try"], node["yes"], node["no"], name, g)
+                yield self._condition(str(int(name)-1), node["condition"], node["try"], node["yes"], node["no"], name, g)
                 g.edge(name, parallelEnd)
             elif node["type"] == "process":
                 hasUsers = False
@@ -244,7 +267,7 @@ class Graph:
                         usersNode = self.createUsers(parallelStart, node["users"], g)
                     else:
                         usersNode = parallelStart
-                    processEnd = self.createGraph(usersNode, node["commands"], g)
+                    processEnd = yield self._graph(usersNode, node["commands"], g)
                     g.edge(processEnd, parallelEnd)
                 elif self.style == "full":
                     name = str(self.counter)
@@ -255,7 +278,7 @@ class Graph:
                         c.attr(label=node["name"])
                         if hasUsers:
                             name = self.createUsers(name, node["users"], c)
-                        processEnd = self.createGraph(name, node["commands"], c)
+                        processEnd = yield self._graph(name, node["commands"], c)
                         self.counter += 1
                         name = str(self.counter)
                         c.node(name, shape="point", width="0")
@@ -267,7 +290,7 @@ class Graph:
                     previousNode = name
                     if hasUsers:
                         previousNode = self.createUsers(previousNode, node["users"], g)
-                    previousNode = self.createGraph(previousNode, node["commands"], g)
+                    previousNode = yield self._graph(previousNode, node["commands"], g)
                     self.counter += 1
                     name = str(self.counter)
                     g.node(name, "End " + node["name"] + " >", shape="underline")
@@ -284,14 +307,14 @@ class Graph:
                             c.node(name, "", shape="none")
                             if hasUsers:
                                 name = self.createUsers(name, node["users"], c)
-                            endNode = self.createGraph(name, node["commands"], c)
+                            endNode = yield self._graph(name, node["commands"], c)
                             self.counter += 1
                             name = str(self.counter)
                             c.node(name, "", shape="none")
                             c.edge(endNode, name)
 
-    def createCondition(self, start, condition, trysteps, yessteps, nosteps, end, g):
-            tryend = self.createGraph(start, trysteps, g)
+    def _condition(self, start, condition, trysteps, yessteps, nosteps, end, g):
+            tryend = yield self._graph(start, trysteps, g)
             self.counter += 1
             name = str(self.counter)
             g.node(name, condition, shape="diamond", style="filled", fillcolor="orange2")
@@ -301,7 +324,7 @@ class Graph:
             g.node("yesdot" + str(self.counter), shape="point")
             g.edge(name,"yesdot" + str(self.counter), label="yes")
             if yessteps and yessteps[-1] in ("abort", "retry"):
-                yesend = self.createGraph("yesdot" + str(self.counter), yessteps[:-1], g)
+                yesend = yield self._graph("yesdot" + str(self.counter), yessteps[:-1], g)
                 self.counter += 1
                 if yessteps[-1] == "abort":
                     g.node("abort" + str(self.counter), "", shape="circle", width="0.2", style="filled", fillcolor="red3")
@@ -309,14 +332,14 @@ class Graph:
                 elif yessteps[-1] == "retry":
                     g.edge(yesend, start)
             else:
-                yesend = self.createGraph("yesdot" + str(self.counter), yessteps, g)
+                yesend = yield self._graph("yesdot" + str(self.counter), yessteps, g)
                 g.edge(yesend, end)
 
             self.counter += 1
             g.node("nodot" + str(self.counter), shape="point")
             g.edge(name,"nodot" + str(self.counter), label="no")
             if nosteps and nosteps[-1] in ("abort", "retry"):
-                noend = self.createGraph("nodot" + str(self.counter), nosteps[:-1], g)
+                noend = yield self._graph("nodot" + str(self.counter), nosteps[:-1], g)
                 self.counter += 1
                 if nosteps[-1] == "abort":
                     g.node("abort" + str(self.counter), "", shape="circle", width="0.2", style="filled", fillcolor="red3")
@@ -324,29 +347,48 @@ class Graph:
                 elif nosteps[-1] == "retry":
                     g.edge(noend, start)
             else:
-                noend = self.createGraph("nodot" + str(self.counter), nosteps, g)
+                noend = yield self._graph("nodot" + str(self.counter), nosteps, g)
                 g.edge(noend, end)
 
-options = arguments(sys.argv[1:])
-infile = sys.argv[-1]
-with open(str(options["output"] / PurePath(infile))) as f:
-    try:
-        data = json.load(f)
-    except json.decoder.JSONDecodeError:
-        print("Invalid Json file, exiting...")
-        sys.exit()
+if __name__ == "__main__":
+    options = arguments(sys.argv[1:])
+    infile = sys.argv[-1]
+    # the json is read without recursion (see jsonio.py of the compiler), so deeply nested processes can be visualised
+    sys.path.insert(0, str(Path(PurePath(__file__)).absolute().parents[1]))
+    from jsonio import loadJSON
+    # binary files exported with --binary are read like json files (see binary.py of the compiler)
+    from binary import readBinary, isBinary
+    if isBinary(infile):
+        with open(str(options["output"] / PurePath(infile)), "rb") as f:
+            try:
+                data = readBinary(f)
+            except ValueError:
+                print("Invalid binary file, exiting...")
+                sys.exit()
+    else:
+        with open(str(options["output"] / PurePath(infile))) as f:
+            try:
+                data = loadJSON(f)
+            except json.decoder.JSONDecodeError:
+                print("Invalid Json file, exiting...")
+                sys.exit()
 
-try:
-    if data["execute"]:
-        graph.node("start","", shape='circle', width="0.3", style="filled", fillcolor="palegreen1")
+    # json files exported with --references are expanded back to the inlined form (see references.py of the compiler)
+    if "processTable" in data:
+        from references import expandReferences
+        data = expandReferences(data)
 
-    Graph(data, "start", options)
+    try:
+        if data["execute"]:
+            graph.node("start","", shape='circle', width="0.3", style="filled", fillcolor="palegreen1")
+
+        Graph(data, "start", options)
 
-    graph.attr(label=data["title"])
-except Exception:
-    print("An unexpected error has occurred while visualising the data. Please make sure you are using a valid Json file.")
-    sys.exit()
+        graph.attr(label=data["title"])
+    except Exception:
+        print("An unexpected error has occurred while visualising the data. Please make sure you are using a valid Json file.")
+        sys.exit()
 
-if options["output"]:
-    infile = Path(infile).stem + ".json"
-graph.render(filename=str(Path(options["output"] / PurePath(infile[:-5]))), view=True, format=options["filetype"])
+    if options["output"]:
+        infile = Path(infile).stem + ".json"
+    graph.render(filename=str(Path(options["output"] / PurePath(infile[:-5]))), view=True, format=options["filetype"])
@@ -0,0 +1,151 @@
+"""
+Imports:
+  import io
+  import glob
+  import time
+  from pathlib import Path
+  from contextlib import redirect_stdout
+  from concurrent.futures import ProcessPoolExecutor
+  from colorama import Fore
+  from console import Console
+  from compiler import compileCode, loadLanguage
+  from session import Session
+  from make import makeCode
+
+Global Variables:
+  _session -- Session() object of the current worker process (see initWorker())
+  _options -- dict containing the options of the current worker process (see console.arguments())
+
+Functions:
+  collectFiles(paths)
+  compileBatch(paths, options, jobs=1)
+  compileOne(codefile)
+  initWorker(options)
+  printSummary(results, sec)
+"""
+import io
+import glob
+import time
+from pathlib import Path
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from colorama import Fore
+from console import Console
+from compiler import compileCode, loadLanguage
+from session import Session
+from make import makeCode
+
+_session = None
+_options = {}
+
+def collectFiles(paths):
+    """
+    Expand files, glob patterns and directories into a list of code files.
+
+    Arguments:
+      paths -- list of strings containing filenames, glob patterns (e.g. "models/*.bpmml") or directories
+
+    Return:
+      list of strings containing the filenames of the code files (every directory is searched recursively for .bpmml files), without duplicates and in the given order
+
+    Note:
+      A path that matches nothing is kept as it is, so that its compilation fails with the usual "does not exist" error.
+    """
+    codefiles = {}
+    for path in paths:
+        if Path(path).is_dir():
+            matches = sorted(str(match) for match in Path(path).rglob("*.bpmml"))
+        elif glob.has_magic(path):
+            matches = sorted(glob.glob(path, recursive=True))
+        else:
+            matches = [path]
+        for match in matches:
+            codefiles.setdefault(match, None)
+    return list(codefiles)
+
+def initWorker(options):
+    """
+    Prepare a worker process by building the Session() (and therefore the parser) that it will use for every code file it compiles.
+
+    Arguments:
+      options -- dict containing the options of the compiler (see console.arguments())
+    """
+    global _session, _options
+    _options = options
+    _session = Session.fromOptions(loadLanguage, options)
+
+def compileOne(codefile):
+    """
+    Compile a single code file with the Session() of the worker process (see initWorker()).
+
+    Arguments:
+      codefile -- string containing the filename of the code file to be compiled (IMPORTANT: with extension)
+
+    Return:
+      turple of (codefile, status, seconds, output) where status is "compiled", "up to date" or "failed" and output is a string containing the messages printed while compiling
+
+    Note:
+      Errors of the compiler (sys.exit() of Console.error()) and unexpected exceptions are caught and reported as failures, so that the worker can continue with the next code file.
+    """
+    output = io.StringIO()
+    start = time.time()
+    status = "failed"
+    with redirect_stdout(output):
+        console = Console()
+        try:
+            del _session.scripts[:]
+            if _options["make"]:
+                compiled = makeCode(codefile, console=console, output=_options["output"], pretty=_options["pretty"], session=_session)
+            else:
+                compiled = compileCode(codefile, console=console, output=_options["output"], pretty=_options["pretty"], importedArgs={}, session=_session)
+            status = "compiled" if compiled else "up to date"
+        except SystemExit:
+            pass
+        except Exception as error:
+            console.error("Unexpected " + type(error).__name__ + ": " + str(error), exitCompiler=False)
+        finally:
+            console.closeLog()
+    return codefile, status, time.time() - start, output.getvalue()
+
+def compileBatch(paths, options, jobs=1):
+    """
+    Compile many code files, using a pool of worker processes, and return the results.
+
+    Arguments:
+      paths -- list of strings containing filenames, glob patterns or directories (see collectFiles())
+      options -- dict containing the options of the compiler (see console.arguments())
+      jobs -- (optional) integer containing the number of worker processes. Defaults to 1 (compile in the current process)
+
+    Return:
+      list of turples of (codefile, status, seconds, output) in the order of the code files, see compileOne()
+
+    Note:
+      Every worker builds its parser once (see initWorker()), so the language is loaded once per worker instead of once per code file.
+    """
+    codefiles = collectFiles(paths)
+    jobs = max(1, min(jobs, len(codefiles)))
+    if jobs == 1:
+        initWorker(options)
+        return [compileOne(codefile) for codefile in codefiles]
+    with ProcessPoolExecutor(max_workers=jobs, initializer=initWorker, initargs=(options,)) as pool:
+        return list(pool.map(compileOne, codefiles))
+
+def printSummary(results, sec):
+    """
+    Print the messages and the result of every compiled code file, followed by the totals.
+
+    Arguments:
+      results -- list of turples returned by compileBatch()
+      sec -- float containing the seconds of the whole batch
+
+    Return:
+      integer containing the number of code files that failed to compile
+    """
+    colors = {"compiled": Fore.GREEN, "up to date": Fore.CYAN, "failed": Fore.RED}
+    for codefile, status, seconds, output in results:
+        print(colors[status] + "%-10s" % status + Fore.RESET + " " + Fore.YELLOW + codefile + Fore.RESET + " (%.3f sec)" % seconds)
+        if output:
+            print("\t" + output.rstrip("\n").replace("\n", "\n\t"))
+    counts = {status: sum(1 for result in results if result[1] == status) for status in colors}
+    print("%d compiled, %d up to date, %d failed" % (counts["compiled"], counts["up to date"], counts["failed"]) + " in %.3f sec" % sec)
+    return counts["failed"]
@@ -0,0 +1,598 @@
+"""
+Usage:
+  Measure the performance of the BPMML compiler.
+
+Help:
+  Command Usage:
+      python3 benchmark.py <benchmark> [repeat]
+  Benchmarks:
+      parser-cache:
+          Compare the compile time of example.bpmml with a cold (rebuilt) and a warm (cached) parser.
+      single-pass:
+          Compare the peak memory (RSS) and compile time of a large generated model with and without the single pass mode.
+      user-roster:
+          Measure the compile time (without exporting) and the memory of the compiled data of a process with a large user list and many "change users" blocks.
+      references:
+          Compare the export time and the json file size of a large generated model with and without the reference-based output.
+      arguments:
+          Measure the reduction time (where the global arguments are substituted) of a generated model where every command, user and condition references global arguments.
+      lazy:
+          Compare the compile time (without exporting) of a code file calling 2 processes of a large generated library with and without lazy reduction.
+      parallel:
+          Compare the reduction time of a large generated model with 1 and with 4 worker processes (see parallel.py). Needs more than one CPU core to be faster.
+      ir:
+          Compare the memory of the compiled data of a large generated model and the time Toolset() takes to walk and check every step of it (see Toolset.walk()), as nodes (see nodes.py) and as plain dicts.
+      deep:
+          Measure the compile time (exporting included) and the time the visualiser takes to build the graph of generated models nested thousands of blocks deep.
+          The graph is built ("split" style) but not rendered, rendering is done by Graphviz.
+      stream:
+          Compare the peak memory (RSS) and compile time of a large generated model compiled normally, in single pass mode and streamed (see stream.py).
+      library:
+          Compare the time taken to validate many small generated code files (every tenth one invalid) within a single process in library mode (see library.py) and with one compiler process per file.
+      string:
+          Compare the time taken to compile a generated model given as a string with compileString() (see library.py) and through files (the code written to a file, compiled, and its json file read back).
+      encoders:
+          Compare the time every encoder (see jsonio.py) and json.dump() take to export a large generated model, with the default and the compact separators.
+      incremental:
+          Compare the time and the peak traced memory of reducing and exporting a large generated model while its processes are reduced (see jsonio.IncrementalExport())
+          and once they all are. The model is parsed beforehand. The json file is renamed into place once it is complete, so nothing can read it earlier either way.
+      binary:
+          Compare the file size, export time and load time of a large generated model exported as json (default and compact) and in the binary format (see binary.py).
+      unchanged:
+          Compare the export time of a large generated model (default, pretty and binary) when its file does not exist and when it already has the same contents,
+          which is left untouched (see jsonio.OutputFile()), and check that the modification time of the unchanged file is kept.
+  Defaults:
+      -Every measurement is repeated 5 times and the best time is reported.
+      -The compiled json files are exported to a temporary folder.
+
+Module Imports:
+  import sys
+  import time
+  import tempfile
+  import os
+  import tracemalloc
+  import subprocess
+  import gc
+  import importlib.util
+  import json
+  from pathlib import Path
+  (custom module) from console import Console
+  (custom module) import compiler
+  (custom module) from roster import plainData, jsonDefault
+  (custom module) from toolset import Toolset
+  (custom module) from jsonio import loadJSON, dumpJSON, ENCODERS, IncrementalExport
+  (custom module) from binary import readBinary
+  (custom module) from session import Session
+  (custom module) from library import checkFiles, compileString, CompileError
+
+Functions:
+  benchArguments(repeat=5, arguments=50, processes=300)
+  benchBinary(repeat=5, processes=2000)
+  benchDeep(repeat=5)
+  benchEncoders(repeat=5, processes=2000)
+  benchIR(repeat=5, processes=500)
+  benchIncremental(repeat=5, processes=2000)
+  benchLibrary(repeat=5, files=100)
+  benchLazy(repeat=5, processes=200)
+  benchParallel(repeat=5, processes=1000, jobs=4)
+  benchParserCache(repeat=5)
+  benchReferences(repeat=5, processes=500)
+  benchSinglePass(repeat=5, processes=2000)
+  benchString(repeat=5, processes=20)
+  benchStream(repeat=5, processes=4000)
+  benchUnchanged(repeat=5, processes=2000)
+  benchUserRoster(repeat=5, users=2000, changes=1000)
+  checkSteps(data)
+  generateArgumentModel(codefile, arguments=50, processes=300, commands=40)
+  generateDeepModel(codefile, depth=1000)
+  generateModel(codefile, processes=100, commands=20)
+  generateRosterModel(codefile, users=2000, changes=1000)
+  isolatedCompile(codefile, output, singlePass=False, stream=False)
+  timeCompile(codefile, output, repeat=1, before=None)
+"""
+import sys
+import time
+import tempfile
+import os
+import tracemalloc
+import subprocess
+import gc
+import importlib.util
+import json
+from pathlib import Path
+from console import Console
+import compiler
+from roster import plainData, jsonDefault
+from toolset import Toolset
+from jsonio import loadJSON, dumpJSON, ENCODERS, IncrementalExport
+from binary import readBinary
+from session import Session
+from library import checkFiles, compileString, CompileError
+
+def timeCompile(codefile, output, repeat=1, before=None):
+    """
+    Compile a .bpmml file multiple times and return the best time (in seconds).
+
+    Arguments:
+      codefile -- string containing the filename of the code file to be compiled (IMPORTANT: with extension)
+      output -- pathlib.PosixPath object instance containing the output directory
+      repeat -- (optional) integer containing the number of compilations. Defaults to 1
+      before -- (optional) function without arguments that is called before every compilation (it is not timed). Defaults to None
+    """
+    console = Console(logdir=str(output), pre="\t")
+    best = float("inf")
+    for _ in range(repeat):
+        if before: before()
+        start = time.perf_counter()
+        compiler.compileCode(codefile, console, output=output)
+        best = min(best, time.perf_counter() - start)
+    console.closeLog()
+    return best
+
+def benchParserCache(repeat=5):
+    """ Compare the compile time of example.bpmml with a cold and a warm parser cache."""
+    def clearCache():
+        Path(compiler.parserCachePath()).unlink(missing_ok=True)
+    with tempfile.TemporaryDirectory() as output:
+        cold = timeCompile("example.bpmml", Path(output), repeat, before=clearCache)
+        compiler.warmCache()
+        warm = timeCompile("example.bpmml", Path(output), repeat)
+    print("example.bpmml cold parser: %.2f ms" % (cold * 1000))
+    print("example.bpmml warm parser: %.2f ms (%.1fx faster)" % (warm * 1000, cold / warm))
+
+def generateModel(codefile, processes=100, commands=20):
+    """
+    Write a large .bpmml file and return its size (in bytes).
+
+    Arguments:
+      codefile -- string containing the filename of the code file to be written (IMPORTANT: with extension)
+      processes -- (optional) integer containing the number of global processes. Defaults to 100
+      commands -- (optional) integer containing the number of commands of every block. Defaults to 20
+
+    Note:
+      Every global process has users, nested parallel and conditional blocks and calls one of the first 10 processes (which make no calls).
+    """
+    lines = ["start with owner = Firstname"]
+    for p in range(processes):
+        lines += ["    process generated%d" % p, "        users", "            (div%d, dep, pos) &owner Lastname" % p, "        end"]
+        lines += ["        command1 step%d_%d" % (p, c) for c in range(commands)]
+        lines += ["        parallel"]
+        lines += ["            send parallel%d_%d" % (p, c) for c in range(commands)]
+        lines += ["            parallel", "                sign nested%d" % p, "                archive nested%d" % p, "            end", "        end"]
+        lines += ["        try"]
+        lines += ["            compose try%d_%d" % (p, c) for c in range(commands)]
+        lines += ["        check condition%d" % p, "            yes", "                receive yes%d" % p, "            end", "            no", "                execute no%d" % p, "                retry", "            end", "        end"]
+        lines += ["        change users", "            add (div, dep, pos) Other Person", "        end"]
+        if p >= 10:
+            lines += ["        call generated%d" % (p % 10)]
+        lines += ["    end"]
+    lines += ["end", ""]
+    text = "\n".join(lines)
+    open(codefile, "w").write(text)
+    return len(text)
+
+def isolatedCompile(codefile, output, singlePass=False, stream=False):
+    """
+    Compile a .bpmml file within a new Python process and return a turple of (compile time in seconds, peak memory of the process in KB).
+
+    Arguments:
+      codefile -- string containing the filename of the code file to be compiled (IMPORTANT: with extension)
+      output -- string containing the output directory
+      singlePass -- (optional) boolean containing True if the single pass mode is used, False otherwise. Defaults to False
+      stream -- (optional) boolean containing True if the code file is streamed (see stream.py), False otherwise. Defaults to False
+
+    Note:
+      On Linux the peak memory is read from /proc (VmHWM), as ru_maxrss also counts the memory the benchmark itself was using when the process was started.
+    """
+    code = ("import time, resource\n"
+            "from pathlib import Path\n"
+            "from console import Console\n"
+            "from compiler import compileCode, loadLanguage\n"
+            "from stream import streamCode\n"
+            "from session import Session\n"
+            "session = Session(loadLanguage, singlePass=%r)\n"
+            "start = time.perf_counter()\n"
+            "%s(%r, Console(logdir=%r), output=Path(%r), session=session)\n"
+            "try:\n"
+            "    peak = [int(line.split()[1]) for line in open('/proc/self/status') if line.startswith('VmHWM:')][0]\n"
+            "except (OSError, IndexError):\n"
+            "    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+            "print(time.perf_counter() - start, peak)\n") % (singlePass, "streamCode" if stream else "compileCode", codefile, output, output)
+    seconds, memory = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split()
+    return float(seconds), int(memory)
+
+def benchLibrary(repeat=5, files=100):
+    """ Compare the time taken to validate many small generated code files in library mode (one warm process) and with one compiler process per file."""
+    with tempfile.TemporaryDirectory() as output:
+        codefiles = []
+        for index in range(files):
+            codefile = output + "/generated%d.bpmml" % index
+            generateModel(codefile, 5, 5)
+            if index % 10 == 0:
+                with open(codefile, "a") as invalid:
+                    invalid.write("    dummy\n")
+            codefiles.append(codefile)
+        compiler.warmCache()
+        session = Session(compiler.loadLanguage, exportImports=False)
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            failed = sum(isinstance(result, CompileError) for codefile, result in checkFiles(codefiles, session))
+            times.append(time.perf_counter() - start)
+        print("library mode:     %8.2f ms per file (%d of %d invalid)" % (min(times) / files * 1000, failed, files))
+        start = time.perf_counter()
+        for codefile in codefiles:
+            subprocess.run([sys.executable, "launcher.py", "-o", output, codefile], capture_output=True, cwd=str(Path(__file__).parent))
+        print("process per file: %8.2f ms per file" % ((time.perf_counter() - start) / files * 1000))
+
+def benchString(repeat=5, processes=20):
+    """ Compare the time taken to compile a generated model given as a string in memory and through files."""
+    with tempfile.TemporaryDirectory() as output:
+        codefile = output + "/generated.bpmml"
+        generateModel(codefile, processes)
+        text = open(codefile).read()
+        compiler.warmCache()
+        session = Session(compiler.loadLanguage, exportImports=False)
+        console = Console(logdir=output)
+        def throughFiles():
+            with open(codefile, "w") as code:
+                code.write(text)
+            compiler.compileCode(codefile, console, output=Path(output), session=session)
+            with open(compiler.outputPath(codefile, Path(output))) as jsonFile:
+                return loadJSON(jsonFile)
+        for name, compileText in (("through files:", throughFiles), ("compileString:", lambda: compileString(text, "generated", session=session))):
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                compileText()
+                best = min(best, time.perf_counter() - start)
+            print("%-15s %8.2f ms" % (name, best * 1000))
+        console.closeLog()
+
+def benchSinglePass(repeat=5, processes=2000):
+    """ Compare the peak memory and compile time of a large generated model with and without the single pass mode."""
+    with tempfile.TemporaryDirectory() as output:
+        codefile = output + "/generated.bpmml"
+        size = generateModel(codefile, processes)
+        compiler.warmCache()
+        print("generated.bpmml: %.1f MB" % (size / 1e6))
+        for singlePass in (False, True):
+            runs = [isolatedCompile(codefile, output, singlePass) for _ in range(repeat)]
+            print("%-12s %8.2f s %10.1f MB peak RSS" % ("single pass:" if singlePass else "tree:", min(run[0] for run in runs), min(run[1] for run in runs) / 1024))
+
+def benchStream(repeat=5, processes=4000):
+    """ Compare the peak memory and compile time of a large generated model compiled normally, in single pass mode and streamed."""
+    with tempfile.TemporaryDirectory() as output:
+        codefile = output + "/generated.bpmml"
+        size = generateModel(codefile, processes)
+        compiler.warmCache()
+        print("generated.bpmml: %.1f MB" % (size / 1e6))
+        for name, singlePass, stream in (("tree:", False, False), ("single pass:", True, False), ("stream:", False, True)):
+            runs = [isolatedCompile(codefile, output, singlePass, stream) for _ in range(repeat)]
+            print("%-12s %8.2f s %10.1f MB peak RSS" % (name, min(run[0] for run in runs), min(run[1] for run in runs) / 1024))
+
+def generateRosterModel(codefile, users=2000, changes=1000):
+    """
+    Write a .bpmml file with a single process that has a large user list and many "change users" blocks.
+
+    Arguments:
+      codefile -- string containing the filename of the code file to be written (IMPORTANT: with extension)
+      users -- (optional) integer containing the number of users of the process. Defaults to 2000
+      changes -- (optional) integer containing the number of "change users" blocks (each adds a user and removes another). Defaults to 1000
+    """
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    name = lambda n: "Person " + "".join(letters[n // 26 ** k % 26] for k in range(3))
+    lines = ["start", "    process main", "        users"]
+    lines += ["            (div, dep, pos) " + name(n) for n in range(users)]
+    lines += ["        end"]
+    for c in range(changes):
+        lines += ["        command1 step", "        change users", "            add (div, dep, pos) " + name(users + c), "            remove (div, dep, pos) " + name(c), "        end"]
+    lines += ["    end", "end", ""]
+    open(codefile, "w").write("\n".join(lines))
+
+def benchUserRoster(repeat=5, users=2000, changes=1000):
+    """ Measure the compile time (without exporting) and the memory of the compiled data of a process with a large user list and many "change users" blocks."""
+    with tempfile.TemporaryDirectory() as output:
+        codefile = output + "/roster.bpmml"
+        generateRosterModel(codefile, users, changes)
+        session = compiler.Session(compiler.loadLanguage)
+        console = Console(logdir=output)
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            compiler.compileCode(codefile, console, session=session, export=False)
+            best = min(best, time.perf_counter() - start)
+        tracemalloc.start()
+        data = compiler.compileCode(codefile, console, session=session, export=False)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        console.closeLog()
+    print("%d users, %d change users blocks: %.2f s, %.1f MB of compiled data" % (users, changes, best, memory / 1e6))
+
+def benchReferences(repeat=5, processes=500):
+    """ Compare the export time and the json file size of a large generated model with and without the reference-based output."""
+    with tempfile.TemporaryDirectory() as output:
+        codefile = output + "/generated.bpmml"
+        generateModel(codefile, processes)
+        console = Console(logdir=output)
+        data = compiler.compileCode(codefile, console, export=False)
+        console.closeLog()
+        for references in (False, True):
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                compiler.exportJSON(codefile, data, Path(output), references=references)
+                best = min(best, time.perf_counter() - start)
+            size = Path(compiler.outputPath(codefile, Path(output))).stat().st_size
+            print("%-12s %8.3f s %10.2f MB" % ("references:" if references else "inlined:", best, size / 1e6))
+
+def generateArgumentModel(codefile, arguments=50, processes=300, commands=40):
+    """
+    Write a .bpmml file where every command, user and condition references global arguments.
+
+    Arguments:
+      codefile -- string containing the filename of the code file to be written (IMPORTANT: with extension)
+      arguments -- (optional) integer containing the number of global arguments (every argument references the previous one). Defaults to 50
+      processes -- (optional) integer containing the number of global processes. Defaults to 300
+      commands -- (optional) integer containing the number of commands of every process. Defaults to 40
+    """
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    arg = lambda a: "&arg" + letters[a % arguments % 26] + "z" * (a % arguments // 26) #user names only allow letters
+    definitions = ["arga = first"] + [arg(a)[1:] + " = " + arg(a - 1) + " next" for a in range(1, arguments)]
+    lines = ["start with " + ", ".join(definitions)]
+    for p in range(processes):
+        lines += ["    process args%d" % p, "        users", "            (%s, dep, %s) Some %s" % (arg(p), arg(p + 1), arg(p + 2)), "        end"]
+        lines += ["        command1 %s step %s of %s" % (arg(c), arg(c * 7), arg(p + c)) for c in range(commands)]
+        lines += ["        try", "            send " + arg(p), "        check %s is %s" % (arg(p), arg(p * 3)), "            yes", "                sign " + arg(1), "            end", "            no", "                archive " + arg(2), "            end", "        end"]
+        lines += ["    end"]
+    lines += ["end", ""]
+    open(codefile, "w").write("\n".join(lines))
+
+def benchArguments(repeat=5, arguments=50, processes=300):
+    """ Measure the reduction time (the part of the compilation that substitutes the global arguments) of a generated model where every command, user and condition references global arguments."""
+    with tempfile.TemporaryDirectory() as output:
+        codefile = output + "/arguments.bpmml"
+        generateArgumentModel(codefile, arguments, processes)
+        session = compiler.Session(compiler.loadLanguage)
+        console = Console(logdir=output)
+        tree = compiler.parseCode(session.parser, open(codefile).read(), console)
+        processDict, globalArgs, importedProcessDict, importedMainDict = compiler.handleRootChildren(tree, codefile, output, console, {}, session)
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            compiler.treeReduction(processDict, "arguments", globalArgs, importedProcessDict, importedMainDict, console)
+            best = min(best, time.perf_counter() - start)
+        console.closeLog()
+    print("%d arguments, %d processes: %.3f s reduction" % (arguments, processes, best))
+
+def benchLazy(repeat=5, processes=200):
+    """ Compare the compile time (without exporting) of a code file calling 2 processes of a large generated library with and without lazy reduction."""
+    with tempfile.TemporaryDirectory() as output:
+        generateModel(output + "/library.bpmml", processes)
+        codefile = output + "/importer.bpmml"
+        open(codefile, "w").write("start\n    import library\n    process main\n        call generated%d from library\n        call generated1 from library\n    end\nend\n" % (processes - 1))
+        console = Console(logdir=output)
+        for lazy in ("", "omit"):
+            session = compiler.Session(compiler.loadLanguage, moduleCache=False, lazy=lazy) #no module cache, so the library is compiled every time
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                compiler.compileCode(codefile, console, session=session, export=False)
+                best = min(best, time.perf_counter() - start)
+            print("%-6s %8.3f s" % ("lazy:" if lazy else "eager:", best))
+        console.closeLog()
+
+def benchParallel(repeat=5, processes=1000, jobs=4):
+    """ Compare the reduction time of a large generated model with 1 and with more worker processes."""
+    with tempfile.TemporaryDirectory() as output:
+        codefile = output + "/generated.bpmml"
+        generateModel(codefile, processes)
+        session = compiler.Session(compiler.loadLanguage)
+        console = Console(logdir=output)
+        tree = compiler.parseCode(session.parser, open(codefile).read(), console)
+        processDict, globalArgs, importedProcessDict, importedMainDict = compiler.handleRootChildren(tree, codefile, output, console, {}, session)
+        print("%d processes, %d CPU cores" % (processes, os.cpu_count()))
+        for workers in (1, jobs):
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                compiler.treeReduction(processDict, "generated", globalArgs, importedProcessDict, importedMainDict, console, jobs=workers)
+                best = min(best, time.perf_counter() - start)
+            print("%d worker%s %8.2f s reduction" % (workers, "s:" if workers > 1 else ": ", best))
+        console.closeLog()
+
+def checkSteps(data):
+    """ Check every step (and user) of compiled data with the Toolset() is...() methods, walking it with Toolset.walk(), and return the number of valid steps (and users)."""
+    toolset = Toolset(data, {})
+    checked = 0
+    for step in toolset.walk(users=True):
+        if toolset.isStep(step) or toolset.isUser(step):
+            checked += 1
+    return checked
+
+def benchIR(repeat=5, processes=500):
+    """ Compare the memory of the compiled data of a large generated model and the time Toolset() takes to check every step of it, as nodes and as plain dicts."""
+    with tempfile.TemporaryDirectory() as output:
+        codefile = output + "/generated.bpmml"
+        generateModel(codefile, processes)
+        session = compiler.Session(compiler.loadLanguage)
+        console = Console(logdir=output)
+        compiler.compileCode(codefile, console, session=session, export=False) #warm parser
+        memory = {}
+        times = {}
+        for form in ("nodes", "dicts"):
+            gc.collect()
+            tracemalloc.start()
+            data = compiler.compileCode(codefile, console, session=session, export=False)
+            if form == "dicts":
+                plainData(data)
+            gc.collect()
+            memory[form] = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                steps = checkSteps(data)
+                best = min(best, time.perf_counter() - start)
+            times[form] = best
+        console.closeLog()
+    print("%d processes, %d steps checked" % (processes, steps))
+    for form in ("nodes", "dicts"):
+        print("%-6s %8.1f MB of compiled data, %8.3f s to check every step" % (form + ":", memory[form] / 1e6, times[form]))
+
+def generateDeepModel(codefile, depth=1000):
+    """
+    Write a .bpmml file whose "main" process nests depth blocks, one within the other (processes, parallel and try/check blocks in turn).
+
+    Arguments:
+      codefile -- string containing the filename of the code file to be written (IMPORTANT: with extension)
+      depth -- (optional) integer containing the number of nested blocks. Defaults to 1000
+
+    Note:
+      Lines are not indented (like a machine generated model), so the size of the file only grows with the depth.
+    """
+    kinds = ("process", "parallel", "try")
+    lines = ["start", "process main"]
+    for level in range(depth):
+        if kinds[level % 3] == "process":
+            lines.append("process nested" + "abcdefghij"[level % 10] * (1 + level // 10)) #names are letters only and unique
+        else:
+            lines.append(kinds[level % 3])
+        lines.append("command1 level%d" % level)
+    for level in reversed(range(depth)):
+        if kinds[level % 3] == "try":
+            lines += ["check condition%d" % level, "yes", "command2 yes%d" % level, "end", "no", "command3 no%d" % level, "end"]
+        lines.append("end")
+    lines += ["end", "end", ""]
+    open(codefile, "w").write("\n".join(lines))
+
+def benchDeep(repeat=5):
+    """ Measure the compile time (exporting included) and the time the visualiser takes to build the graph of generated models nested thousands of blocks deep."""
+    spec = importlib.util.spec_from_file_location("visualiser", str(Path(__file__).absolute().parent / "Graph Visualisation" / "visualiser.py"))
+    visualiser = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(visualiser)
+    with tempfile.TemporaryDirectory() as output:
+        for depth in (1000, 2000, 4000):
+            codefile = output + "/deep%d.bpmml" % depth
+            generateDeepModel(codefile, depth)
+            compileTime = timeCompile(codefile, Path(output), repeat)
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                with open(output + "/deep%d.json" % depth) as jsonFile:
+                    data = loadJSON(jsonFile)
+                visualiser.graph = visualiser.Digraph('G', filename='graph') #the visualiser draws on a module-level graph
+                visualiser.Graph(data, "start", {"style": "split"})
+                best = min(best, time.perf_counter() - start)
+            print("depth %5d: %8.3f s compile, %8.3f s graph (%d lines)" % (depth, compileTime, best, len(visualiser.graph.body)))
+
+def benchEncoders(repeat=5, processes=2000):
+    """ Compare the time every encoder and json.dump() take to export a large generated model, with the default and the compact separators."""
+    with tempfile.TemporaryDirectory() as output:
+        codefile = output + "/generated.bpmml"
+        generateModel(codefile, processes)
+        console = Console(logdir=output)
+        data = compiler.compileCode(codefile, console, export=False)
+        console.closeLog()
+        jsonPath = output + "/generated.json"
+        for compact in (False, True):
+            separators = (",", ":") if compact else (", ", ": ")
+            def jsonDump():
+                with open(jsonPath, "w", encoding="utf-8") as stream:
+                    json.dump(data, stream, default=jsonDefault, separators=separators, ensure_ascii=not compact)
+            writers = [("json.dump", jsonDump)]
+            writers += [(name, lambda name=name: dumpJSON(data, jsonPath, compact=compact, encoder=name)) for name, (write, supports, encode) in ENCODERS.items() if supports(False, compact, None)]
+            for name, writer in writers:
+                best = float("inf")
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    writer()
+                    best = min(best, time.perf_counter() - start)
+                size = Path(jsonPath).stat().st_size
+                print("%-8s %-10s %8.3f s %10.2f MB" % ("compact" if compact else "default", name + ":", best, size / 1e6))
+
+def benchBinary(repeat=5, processes=2000):
+    """ Compare the file size, export time and load time of a large generated model exported as json (default and compact) and in the binary format."""
+    with tempfile.TemporaryDirectory() as output:
+        codefile = output + "/generated.bpmml"
+        generateModel(codefile, processes)
+        console = Console(logdir=output)
+        data = compiler.compileCode(codefile, console, export=False)
+        console.closeLog()
+        for name, compact, binary in (("json", False, False), ("compact", True, False), ("binary", False, True)):
+            path = compiler.outputPath(codefile, Path(output), binary)
+            exportTime = loadTime = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                compiler.exportJSON(codefile, data, Path(output), compact=compact, binary=binary)
+                exportTime = min(exportTime, time.perf_counter() - start)
+                start = time.perf_counter()
+                with open(path, "rb" if binary else "r") as stream:
+                    readBinary(stream) if binary else loadJSON(stream)
+                loadTime = min(loadTime, time.perf_counter() - start)
+            print("%-8s %10.2f MB %8.3f s export %8.3f s load" % (name + ":", Path(path).stat().st_size / 1e6, exportTime, loadTime))
+
+def benchIncremental(repeat=5, processes=2000):
+    """ Compare the time and the peak traced memory of reducing and exporting a large generated model while its processes are reduced and once they all are."""
+    with tempfile.TemporaryDirectory() as output:
+        codefile = output + "/generated.bpmml"
+        generateModel(codefile, processes)
+        session = Session(compiler.loadLanguage)
+        console = Console(logdir=output)
+        tree = compiler.parseCode(session.parser, open(codefile).read(), console)
+        processDict, globalArgs, importedProcessDict, importedMainDict = compiler.handleRootChildren(tree, codefile, Path(output), console, {}, session)
+        jsonPath = compiler.outputPath(codefile, Path(output))
+        def wholeData():
+            readyProcessDict = compiler.treeReduction(processDict, "generated", globalArgs, importedProcessDict, importedMainDict, console)
+            mainProcess = readyProcessDict.pop("main", {})
+            data = {"title": "generated", "globalProcesses": list(readyProcessDict.values()), "execute": mainProcess}
+            compiler.exportJSON(codefile, data, Path(output))
+        def incremental():
+            exporter = IncrementalExport(jsonPath, "generated")
+            readyProcessDict = compiler.treeReduction(processDict, "generated", globalArgs, importedProcessDict, importedMainDict, console, emit=exporter.add)
+            exporter.finish(readyProcessDict.pop("main", {}))
+        for name, export in (("whole data:", wholeData), ("incremental:", incremental)):
+            best = float("inf")
+            for _ in range(repeat):
+                gc.collect()
+                start = time.perf_counter()
+                export()
+                best = min(best, time.perf_counter() - start)
+            gc.collect()
+            tracemalloc.start()
+            export()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print("%-13s %8.3f s %10.1f MB peak traced" % (name, best, peak / 1e6))
+        console.closeLog()
+
+def benchUnchanged(repeat=5, processes=2000):
+    """ Compare the export time of a large generated model when its file does not exist and when it already has the same contents (default, pretty and binary)."""
+    with tempfile.TemporaryDirectory() as output:
+        codefile = output + "/generated.bpmml"
+        generateModel(codefile, processes)
+        console = Console(logdir=output)
+        data = compiler.compileCode(codefile, console, export=False)
+        console.closeLog()
+        for name, pretty, binary in (("default", False, False), ("pretty", True, False), ("binary", False, True)):
+            path = compiler.outputPath(codefile, Path(output), binary)
+            writtenTime = unchangedTime = float("inf")
+            for _ in range(repeat):
+                if os.path.exists(path): os.remove(path)
+                start = time.perf_counter()
+                compiler.exportJSON(codefile, data, Path(output), prettify=pretty, binary=binary)
+                writtenTime = min(writtenTime, time.perf_counter() - start)
+                modified = os.stat(path).st_mtime_ns
+                start = time.perf_counter()
+                compiler.exportJSON(codefile, data, Path(output), prettify=pretty, binary=binary)
+                unchangedTime = min(unchangedTime, time.perf_counter() - start)
+                kept = os.stat(path).st_mtime_ns == modified
+            print("%-8s %10.2f MB %8.3f s written %8.3f s unchanged (modification time %s)" % (name + ":", Path(path).stat().st_size / 1e6, writtenTime, unchangedTime, "kept" if kept else "CHANGED"))
+
+BENCHMARKS = {"parser-cache": benchParserCache, "single-pass": benchSinglePass, "user-roster": benchUserRoster, "references": benchReferences, "arguments": benchArguments, "lazy": benchLazy, "parallel": benchParallel, "ir": benchIR, "deep": benchDeep, "stream": benchStream, "library": benchLibrary, "string": benchString, "encoders": benchEncoders, "binary": benchBinary, "incremental": benchIncremental, "unchanged": benchUnchanged}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(__doc__)
+        sys.exit()
+    BENCHMARKS[sys.argv[1]](*[int(arg) for arg in sys.argv[2:3]])
@@ -0,0 +1,403 @@
+"""
+Usage:
+  Write and read the compact binary output of the compiler (see launcher.py --binary), and convert it to and from json losslessly.
+  Run it directly to convert files: python3 binary.py [--pretty|--compact] <file.json|file.bpmb> ...
+
+Binary Output (.bpmb):
+  The json output repeats the same keys, types, file names and users on every node. The binary output stores every string once, in a string table, and refers to it by its index.
+  A file is made of (integers are unsigned LEB128 varints unless stated otherwise):
+      header -- MAGIC and a byte containing BINARY_VERSION
+      strings -- the number of strings, then every string as its length in bytes and its UTF-8 bytes
+      shapes -- the number of shapes, then every shape (the keys of a dict, in order) as its number of keys and the index of every key in the strings
+      interned -- the number of interned records, then every one of them as a value
+      root -- the value of the data
+  Every value starts with a tag byte:
+      NULL, FALSE, TRUE -- nothing follows
+      INT -- the zigzag encoded integer (any size)
+      FLOAT -- 8 bytes (little-endian double)
+      STRING -- the index of the string
+      LIST -- the number of items, then every item
+      RECORD -- the index of the shape of the dict, the length in bytes of its values (4 bytes, little-endian, so a reader can skip a whole node), then every value in the order of the shape
+      INTERNED -- the index of the interned record
+  Dicts without a "type" whose values are all strings, numbers, booleans or null (users) are interned: every distinct one is stored once and referred to wherever it is used.
+  Keys keep their order and values their types, so json converted to binary and back is the same data, and the same json file if it is written with the same options.
+
+Imports:
+  import sys
+  import struct
+  from pathlib import PurePath
+  from roster import jsonDefault
+  from sourcemap import POSITION_KEYS
+  from jsonio import loadJSON, dumpJSON, writeFile
+
+Global Variables:
+  MAGIC -- bytes containing the first bytes of every binary file
+  BINARY_VERSION -- integer containing the version of the binary format
+  BINARY_EXTENSION -- string containing the extension of the binary files
+
+Functions:
+  binaryPath(jsonPath)
+  binaryToJSON(binaryFile, jsonFile='', pretty=False, compact=False)
+  decodeBinary(buffer)
+  encodeBinary(data, sourceMap=None)
+  isBinary(path)
+  jsonToBinary(jsonFile, binaryFile='')
+  readBinary(stream)
+  writeBinary(data, stream, sourceMap=None)
+"""
+import sys
+import struct
+from pathlib import PurePath
+from roster import jsonDefault
+from sourcemap import POSITION_KEYS
+from jsonio import loadJSON, dumpJSON, writeFile
+
+MAGIC = b"BPMB"
+BINARY_VERSION = 1
+BINARY_EXTENSION = ".bpmb"
+NULL, FALSE, TRUE, INT, FLOAT, STRING, LIST, RECORD, INTERNED = range(9)
+_SCALARS = (str, int, float, bool, type(None))
+_TRUNCATED = "Damaged BPMML binary file: it ends before its data does (the file is truncated)"
+_LENGTH = struct.Struct("<I")
+_DOUBLE = struct.Struct("<d")
+
+def _varint(value, out):
+    """ Append an unsigned integer to out as a LEB128 varint"""
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _readVarint(buffer, position):
+    """ Return a turple of (unsigned LEB128 varint at position, position after it)"""
+    value = shift = 0
+    while True:
+        byte = buffer[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+class _Tables():
+    """ The string, shape and interned record tables of a binary file that is being encoded"""
+
+    def __init__(self):
+        self.strings = {}
+        self.shapes = {}
+        self.interned = {}
+        self.shapeData = bytearray()
+        self.internedData = bytearray()
+
+    def string(self, string):
+        """ Return the index of a string, adding it to the table if it is not there"""
+        index = self.strings.get(string)
+        if index is None:
+            index = self.strings[string] = len(self.strings)
+        return index
+
+    def shape(self, keys):
+        """ Return the index of the shape of a dict (its keys, in order), adding it to the table if it is not there"""
+        index = self.shapes.get(keys)
+        if index is None:
+            index = self.shapes[keys] = len(self.shapes)
+            _varint(len(keys), self.shapeData)
+            for key in keys:
+                _varint(self.string(key), self.shapeData)
+        return index
+
+    def scalar(self, value, out):
+        """ Append a string, number, boolean or null value to out and return True, False for any other value"""
+        if isinstance(value, str):
+            out.append(STRING)
+            _varint(self.string(value), out)
+        elif value is None:
+            out.append(NULL)
+        elif value is True:
+            out.append(TRUE)
+        elif value is False:
+            out.append(FALSE)
+        elif isinstance(value, int):
+            out.append(INT)
+            _varint(value * 2 if value >= 0 else -value * 2 - 1, out)
+        elif isinstance(value, float):
+            out.append(FLOAT)
+            out += _DOUBLE.pack(value)
+        else:
+            return False
+        return True
+
+    def intern(self, record):
+        """ Return the index of an interned record (a dict of strings, numbers, booleans and nulls), adding it to the table if it is not there"""
+        key = tuple((key, type(value), value) for key, value in record.items())
+        index = self.interned.get(key)
+        if index is None:
+            index = self.interned[key] = len(self.interned)
+            out = self.internedData
+            out.append(RECORD)
+            _varint(self.shape(tuple(record)), out)
+            patch = len(out)
+            out += b"\0\0\0\0"
+            for value in record.values():
+                self.scalar(value, out)
+            _LENGTH.pack_into(out, patch, len(out) - patch - 4)
+        return index
+
+def encodeBinary(data, sourceMap=None):
+    """
+    Return data encoded in the binary format (see the module docstring) as bytes.
+
+    Arguments:
+      data -- dict or list containing the data (e.g. compiled data, see compiler.compileCode(), or json output)
+      sourceMap -- (optional) SourceMap() object (see sourcemap.py) that the positions of the nodes are given to instead of being encoded. Defaults to None (the positions are encoded)
+
+    Exceptions:
+      TypeError for any object that is not json serializable (see roster.jsonDefault())
+
+    Notes:
+      The data is walked with an explicit stack, so deeply nested processes are encoded like any other. Dict keys are expected to be strings, like in json.
+      Shared (called) processes are encoded every time they are used, like in the json output.
+    """
+    tables = _Tables()
+    body = bytearray()
+    stack = [] #turples of (iterator over the values of an open dict or list, position of the length of the dict, None for lists)
+    value = data
+    while True:
+        if not tables.scalar(value, body):
+            if isinstance(value, dict):
+                if sourceMap is not None and "type" in value:
+                    sourceMap.add(value)
+                    value = {key: item for key, item in value.items() if key not in POSITION_KEYS}
+                if "type" not in value and value and all(isinstance(item, _SCALARS) for item in value.values()):
+                    body.append(INTERNED)
+                    _varint(tables.intern(value), body)
+                else:
+                    body.append(RECORD)
+                    _varint(tables.shape(tuple(value)), body)
+                    stack.append((iter(value.values()), len(body)))
+                    body += b"\0\0\0\0"
+            elif isinstance(value, (list, tuple)):
+                body.append(LIST)
+                _varint(len(value), body)
+                stack.append((iter(value), None))
+            else:
+                value = jsonDefault(value)
+                continue
+        # find the next value, closing every dict and list that has no values left
+        while stack:
+            values, patch = stack[-1]
+            value = next(values, stack)
+            if value is not stack:
+                break
+            stack.pop()
+            if patch is not None:
+                _LENGTH.pack_into(body, patch, len(body) - patch - 4)
+        else:
+            break
+    out = bytearray(MAGIC)
+    out.append(BINARY_VERSION)
+    _varint(len(tables.strings), out)
+    for string in tables.strings:
+        encoded = string.encode("utf-8", "surrogatepass")
+        _varint(len(encoded), out)
+        out += encoded
+    _varint(len(tables.shapes), out)
+    out += tables.shapeData
+    _varint(len(tables.interned), out)
+    out += tables.internedData
+    out += body
+    return bytes(out)
+
+def writeBinary(data, stream, sourceMap=None):
+    """
+    Write data to a stream in the binary format.
+
+    Arguments:
+      data -- see encodeBinary()
+      stream -- file object (opened as binary) that the data is written to
+      sourceMap -- see encodeBinary()
+    """
+    stream.write(encodeBinary(data, sourceMap))
+
+def decodeBinary(buffer):
+    """
+    Return the data encoded in the binary format (see the module docstring), as plain dicts and lists (like json.loads()).
+
+    Arguments:
+      buffer -- bytes containing the binary file
+
+    Exceptions:
+      ValueError if the buffer is not a binary file of a known version, or it is damaged
+
+    Note:
+      The values are decoded with an explicit stack, so deeply nested processes are decoded like any other. Interned records are copied wherever they are used, so they can be edited on their own.
+    """
+    if buffer[:len(MAGIC)] != MAGIC or len(buffer) == len(MAGIC):
+        raise ValueError("Not a BPMML binary file")
+    if buffer[len(MAGIC)] != BINARY_VERSION:
+        raise ValueError("Unsupported BPMML binary version: " + str(buffer[len(MAGIC)]))
+    try:
+        position = len(MAGIC) + 1
+        count, position = _readVarint(buffer, position)
+        strings = []
+        for _ in range(count):
+            length, position = _readVarint(buffer, position)
+            if position + length > len(buffer):
+                raise ValueError(_TRUNCATED)
+            strings.append(buffer[position:position + length].decode("utf-8", "surrogatepass"))
+            position += length
+        count, position = _readVarint(buffer, position)
+        shapes = []
+        for _ in range(count):
+            length, position = _readVarint(buffer, position)
+            keys = []
+            for _ in range(length):
+                index, position = _readVarint(buffer, position)
+                keys.append(strings[index])
+            shapes.append(keys)
+        count, position = _readVarint(buffer, position)
+        interned = []
+        for _ in range(count):
+            record, position = _decodeValue(buffer, position, strings, shapes, interned)
+            interned.append(record)
+        data, position = _decodeValue(buffer, position, strings, shapes, interned)
+    except (IndexError, struct.error) as error:
+        if str(error).startswith("list"): #an index of a string, shape or interned record that is not in its table (the buffer itself raises "index out of range")
+            raise ValueError("Damaged BPMML binary file: " + str(error)) from None
+        raise ValueError(_TRUNCATED) from None
+    except UnicodeDecodeError as error:
+        raise ValueError("Damaged BPMML binary file: " + str(error)) from None
+    if position != len(buffer):
+        raise ValueError("Damaged BPMML binary file: unexpected data after the root value")
+    return data
+
+def _decodeValue(buffer, position, strings, shapes, interned):
+    """ Decode the value at position and return a turple of (value, position after it)"""
+    stack = [] #lists of [dict or list, keys of the dict (None for lists), number of values]
+    while True:
+        tag = buffer[position]
+        position += 1
+        if tag == STRING:
+            index = buffer[position]
+            if index < 0x80:
+                position += 1
+            else:
+                index, position = _readVarint(buffer, position)
+            value = strings[index]
+        elif tag == RECORD:
+            index = buffer[position]
+            if index < 0x80:
+                position += 1
+            else:
+                index, position = _readVarint(buffer, position)
+            keys = shapes[index]
+            position += 4
+            value = {}
+            if keys:
+                stack.append([value, keys, len(keys)])
+                continue
+        elif tag == INTERNED:
+            index, position = _readVarint(buffer, position)
+            value = interned[index].copy()
+        elif tag == LIST:
+            count, position = _readVarint(buffer, position)
+            value = []
+            if count:
+                stack.append([value, None, count])
+                continue
+        elif tag == INT:
+            value, position = _readVarint(buffer, position)
+            value = -(value + 1 >> 1) if value & 1 else value >> 1
+        elif tag == NULL:
+            value = None
+        elif tag == TRUE:
+            value = True
+        elif tag == FALSE:
+            value = False
+        elif tag == FLOAT:
+            value = _DOUBLE.unpack_from(buffer, position)[0]
+            position += 8
+        else:
+            raise ValueError("Damaged BPMML binary file: unknown tag " + str(tag) + " at byte " + str(position - 1))
+        # the value is complete, it belongs to the innermost open dict or list (which might be complete too)
+        while stack:
+            container, keys, count = stack[-1]
+            if keys is None:
+                container.append(value)
+            else:
+                container[keys[len(container)]] = value
+            if len(container) < count:
+                break
+            stack.pop()
+            value = container
+        else:
+            return value, position
+
+def readBinary(stream):
+    """
+    Read a binary file from a stream and return the data (see decodeBinary()).
+
+    Arguments:
+      stream -- file object (opened as binary) containing the binary file
+    """
+    return decodeBinary(stream.read())
+
+def isBinary(path):
+    """ Return True if a file is a binary file (it starts with MAGIC), False otherwise (e.g. a json file, or any other file with the .bpmb extension). A file that cannot be read is judged by its extension"""
+    try:
+        with open(path, "rb") as stream:
+            return stream.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return PurePath(path).suffix == BINARY_EXTENSION
+
+def binaryPath(jsonPath):
+    """ Return the path of the binary file of a json file (<name>.bpmb next to it)"""
+    return str(PurePath(jsonPath).with_suffix(BINARY_EXTENSION))
+
+def jsonToBinary(jsonFile, binaryFile=""):
+    """
+    Convert a json file to a binary file and return the path of the binary file.
+
+    Arguments:
+      jsonFile -- string containing the path of the json file
+      binaryFile -- (optional) string containing the path of the binary file. Defaults to empty string (the json file with the .bpmb extension)
+    """
+    binaryFile = binaryFile or binaryPath(jsonFile)
+    with open(jsonFile, encoding="utf-8") as stream:
+        data = loadJSON(stream)
+    writeFile(binaryFile, encodeBinary(data))
+    return binaryFile
+
+def binaryToJSON(binaryFile, jsonFile="", pretty=False, compact=False):
+    """
+    Convert a binary file to a json file and return the path of the json file.
+
+    Arguments:
+      binaryFile -- string containing the path of the binary file
+      jsonFile -- (optional) string containing the path of the json file. Defaults to empty string (the binary file with the .json extension)
+      pretty, compact -- (optional) see jsonio.writeJSON(). Default to False
+
+    Note:
+      The json file is the one the compiler exports with the same options (--pretty, --compact).
+    """
+    jsonFile = jsonFile or str(PurePath(binaryFile).with_suffix(".json"))
+    with open(binaryFile, "rb") as stream:
+        data = readBinary(stream)
+    dumpJSON(data, jsonFile, pretty, compact)
+    return jsonFile
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:]
+    pretty = "--pretty" in arguments
+    compact = "--compact" in arguments
+    files = [argument for argument in arguments if argument not in ("--pretty", "--compact")]
+    if not files:
+        print(__doc__)
+        sys.exit()
+    for file in files:
+        try:
+            toJSON = isBinary(file) or PurePath(file).suffix == BINARY_EXTENSION #a damaged .bpmb file is reported, never converted over itself
+            print(file + " -> " + (binaryToJSON(file, pretty=pretty, compact=compact) if toJSON else jsonToBinary(file)))
+        except (OSError, ValueError) as error:
+            print(file + ": " + str(error))
+            sys.exit(1)
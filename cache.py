@@ -0,0 +1,186 @@
+"""
+Imports:
+  import os
+  import pickle
+  import hashlib
+  from pathlib import Path
+  from console import VERSION
+
+Global Variables:
+  CACHE_FORMAT -- string containing the version of the cached data format (part of every key, so entries of an older format are never loaded)
+
+Classes:
+  ModuleCache() -- store the compiled data of imported code files so that they are not recompiled every time they are imported
+"""
+import os
+import pickle
+import hashlib
+from pathlib import Path
+from console import VERSION
+
+CACHE_FORMAT = "nodes-1"
+
+class ModuleCache():
+    """
+    Store the compiled data of imported code files so that they are not recompiled every time they are imported.
+
+    Description:
+      Compiled data is keyed on the path and contents of the imported code file, the arguments given to the import ("with"), the compiler version and the CACHE_FORMAT.
+      Every entry also records the contents of all the code files it was compiled from (the file itself and its imports, transitively), so a change in any of them makes the entry stale.
+      Entries are kept in memory for the current run and, if a cache folder is given, also on disk (as pickle files) to be reused by later runs.
+      Code files that run BPMML SCRIPT commands (or import such files) are never cached, as scripts can change the data in any way.
+
+    Instance Variables:
+      cacheDir -- string containing the folder of the on-disk cache, empty string if only the in-memory cache is used
+      memory -- dict containing the in-memory cache entries (key: cache key, value: dict with the "data" and the "dependencies")
+      hits -- integer containing the number of imports served from the cache
+      diskHits -- integer containing the number of hits that were loaded from the on-disk cache
+      misses -- integer containing the number of imports that had to be compiled
+
+    Public Methods:
+      __init__(self, cacheDir='')
+      begin(self, codefile)
+      end(self)
+      fileHash(self, codefile)
+      get(self, codefile, importedArgs, flavour='')
+      key(self, codefile, importedArgs, flavour='')
+      put(self, codefile, importedArgs, data, record, flavour='')
+      refresh(self)
+      remember(self, codefile, text)
+      stats(self)
+      uncacheable(self)
+    """
+
+    def __init__(self, cacheDir=""):
+        """
+        Initialise ModuleCache object.
+
+        Arguments:
+          cacheDir -- (optional) string containing the folder of the on-disk cache (created if it does not exist). Defaults to empty string (in-memory cache only)
+        """
+        self.cacheDir = cacheDir
+        self.memory = {}
+        self.hits = 0
+        self.diskHits = 0
+        self.misses = 0
+        self._hashes = {}
+        self._records = []
+        if cacheDir:
+            Path(cacheDir).mkdir(parents=True, exist_ok=True)
+
+    def fileHash(self, codefile):
+        """
+        Return the hash of the contents of a file (empty string if the file does not exist).
+
+        Note:
+          Hashes are remembered until refresh() is called, meaning every file is read once per run.
+        """
+        path = str(Path(codefile).resolve())
+        if path not in self._hashes:
+            try:
+                self._hashes[path] = hashlib.sha256(open(path, "rb").read()).hexdigest()
+            except OSError:
+                self._hashes[path] = ""
+        return self._hashes[path]
+
+    def remember(self, codefile, text):
+        """ Hash the given contents of a code file instead of reading it (e.g. a code file given by an import resolver, see session.py), until refresh() is called"""
+        self._hashes[str(Path(codefile).resolve())] = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def refresh(self):
+        """ Forget the remembered file hashes (use it when the code files might have changed, e.g. before every compilation of a long-lived process)"""
+        self._hashes.clear()
+        self._records.clear()
+
+    def key(self, codefile, importedArgs, flavour=""):
+        """
+        Return the cache key of an imported code file.
+
+        Arguments:
+          codefile -- string containing the filename of the imported code file (IMPORTANT: with extension)
+          importedArgs -- dict containing the arguments given to the import (the "#" line entries are ignored)
+          flavour -- (optional) string describing any compiler option that changes the compiled data. Defaults to empty string
+        """
+        args = sorted((name, value) for name, value in importedArgs.items() if name[0] != "#")
+        text = "\n".join([str(Path(codefile).resolve()), self.fileHash(codefile), repr(args), VERSION, CACHE_FORMAT, flavour])
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, codefile, importedArgs, flavour=""):
+        """
+        Return the cached compiled data of an imported code file, None if there is no valid entry (see key() for the arguments).
+
+        Note:
+          A hit adds the dependencies of the entry to the file that is being compiled (see begin()).
+        """
+        key = self.key(codefile, importedArgs, flavour)
+        entry = self.memory.get(key)
+        fromDisk = False
+        if entry is None and self.cacheDir:
+            try:
+                with open(self._diskPath(key), "rb") as cacheFile:
+                    entry = pickle.load(cacheFile)
+                fromDisk = True
+            except (OSError, pickle.PickleError, EOFError, AttributeError):
+                entry = None
+        if entry is None or any(self.fileHash(path) != fileHash for path, fileHash in entry["dependencies"].items()):
+            self.misses += 1
+            return None
+        self.hits += 1
+        if fromDisk:
+            self.diskHits += 1
+            self.memory[key] = entry
+        if self._records:
+            self._records[-1]["dependencies"].update(entry["dependencies"])
+        return entry["data"]
+
+    def begin(self, codefile):
+        """ Start recording the dependencies of a code file that is about to be compiled (every begin() must be followed by an end())"""
+        self._records.append({"dependencies": {str(Path(codefile).resolve()): self.fileHash(codefile)}, "cacheable": True})
+
+    def uncacheable(self):
+        """ Mark the code file that is being compiled (and therefore every file importing it) as not cacheable"""
+        if self._records:
+            self._records[-1]["cacheable"] = False
+
+    def end(self):
+        """
+        Stop recording the dependencies of the last code file given to begin() and return the record.
+
+        Note:
+          The dependencies of the code file are also dependencies of the file importing it.
+        """
+        record = self._records.pop()
+        if self._records:
+            self._records[-1]["dependencies"].update(record["dependencies"])
+            if not record["cacheable"]:
+                self._records[-1]["cacheable"] = False
+        return record
+
+    def put(self, codefile, importedArgs, data, record, flavour=""):
+        """
+        Store the compiled data of an imported code file (see key() for the arguments).
+
+        Arguments (apart from the key() ones):
+          data -- dict containing the compiled data of the code file
+          record -- dict returned by end() after compiling the code file
+        """
+        if not record["cacheable"]:
+            return
+        key = self.key(codefile, importedArgs, flavour)
+        entry = {"data": data, "dependencies": record["dependencies"]}
+        self.memory[key] = entry
+        if self.cacheDir:
+            path = self._diskPath(key)
+            try:
+                with open(path + ".tmp", "wb") as cacheFile:
+                    pickle.dump(entry, cacheFile, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(path + ".tmp", path)
+            except (OSError, RecursionError): #pickle is recursive, so deeply nested data is only kept in memory
+                if os.path.exists(path + ".tmp"): os.remove(path + ".tmp")
+
+    def stats(self):
+        """ Return a string describing the hits and misses of the cache"""
+        return "%d hits (%d from disk), %d misses" % (self.hits, self.diskHits, self.misses)
+
+    def _diskPath(self, key):
+        return str(Path(self.cacheDir) / (key + ".pickle"))
@@ -1,16 +1,78 @@
+"""
+Imports:
+  from pathlib import Path
 
-#online cycle detection for imports. Note that the algorithm works because the graph representation after each step is ALWAYS a connected graph
-IMPORTS=[]
-def detectCycle(parent, child):
-    temp = []
-    global IMPORTS
-    for thread in IMPORTS:
-        head = thread[0]
-        tail = thread[-1]
-        if parent == tail:
-            if child == head:
-                return True
-            temp.append([head, child])
-    temp.append([parent, child])
-    IMPORTS += temp
-    return False
+Classes:
+  ImportGraph() -- keep the imports of a compilation and detect import cycles as soon as they are created
+"""
+from pathlib import Path
+
+class ImportGraph():
+    """
+    Keep the imports of a compilation (which code file imports which) and detect import cycles as soon as they are created.
+
+    Description:
+      Code files are compiled depth first: an imported file (and all of its imports) is compiled before the importing file continues.
+      Therefore a new import creates a cycle if and only if the imported file is still being compiled (it is on the compile path), which is a constant time check.
+      This keeps the detection linear in the number of imports. The graph is reset by every independent compilation (see enter()).
+
+    Instance Variables:
+      imports -- dict containing the imports (key: absolute path of the importing code file, value: dict used as an ordered set of the absolute paths of the code files it imports)
+      path -- list containing the absolute paths of the code files being compiled (outermost first)
+
+    Public Methods:
+      __init__(self)
+      addImport(self, parent, child)
+      enter(self, codefile)
+      leave(self)
+      reset(self)
+    """
+
+    def __init__(self):
+        """ Initialise an empty ImportGraph object"""
+        self.imports = {}
+        self.path = []
+        self._onPath = {}
+
+    def reset(self):
+        """ Forget every import and every code file being compiled"""
+        self.imports = {}
+        self.path = []
+        self._onPath = {}
+
+    def enter(self, codefile):
+        """
+        Mark a code file as being compiled (every enter() must be followed by a leave()).
+
+        Note:
+          Entering a code file while no other file is being compiled starts an independent compilation, so the graph is reset first.
+        """
+        if not self.path:
+            self.reset()
+        codefile = str(Path(codefile).resolve())
+        self._onPath[codefile] = len(self.path)
+        self.path.append(codefile)
+
+    def leave(self):
+        """ Mark the last entered code file as compiled"""
+        del self._onPath[self.path.pop()]
+
+    def addImport(self, parent, child):
+        """
+        Record that a code file imports another one and return the import cycle it creates, if any.
+
+        Arguments:
+          parent -- string containing the filename of the importing code file (IMPORTANT: with extension)
+          child -- string containing the filename of the imported code file (IMPORTANT: with extension)
+
+        Return:
+          list containing the absolute paths of the code files of the cycle (starting and ending with the imported file), empty list if there is no cycle
+        """
+        parent = str(Path(parent).resolve())
+        child = str(Path(child).resolve())
+        self.imports.setdefault(parent, {})[child] = None
+        if child == parent:
+            return [child, child]
+        if child in self._onPath:
+            return self.path[self._onPath[child]:] + [child]
+        return []
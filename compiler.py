@@ -1,55 +1,81 @@
 """
 Imports:
-  import re
-  import json
   from subprocess import run
   from pathlib import Path, PurePath
   from lark import Tree,Transformer,Lark,Token, UnexpectedInput
-  from console import Console
+  from console import Console, CompileError
   from transformer import ReduceTree
-  from check_import import detectCycle
   from toolset import Toolset
+  from session import Session
+  from roster import plainData
+  from references import referenceData
+  from jsonio import dumpJSON, writeFile, IncrementalExport
+  from binary import encodeBinary, BINARY_EXTENSION
+  from sourcemap import SourceMap, mapPath
+  from substitution import ArgumentSubstitution
+  from lazy import lazyPlan, unreducedProcess
+  from parallel import parallelReduction, MIN_PARALLEL_PROCESSES
   import sys
+  import hashlib
+  import lark
 
 Global Variables:
   VISUALISER_PATH -- string containing the absolute path of the visualiser script
+  CACHE_PATH -- string containing the absolute path of the folder that stores the cached parsers
   
 Functions:
-  compileCode(codefile, console=Console(), output='', pretty=False, importedArgs={})
-  exportJSON(codefile, data, output='', prettify=False)
-  handleRootChildren(tree, codefile, output='', console=<Console(), globalArgs={})
-  importstep(children, globalArgs, importedProcessDict, importedMainDict, codefile, output='', console=Console())
+  compileCode(codefile, console=Console(), output='', pretty=False, importedArgs=None, session=None, export=True, text=None, processes=None)
+  compileSource(codefile, readFile, console, output, pretty, importedArgs, session, export, processes=None)
+  exportJSON(codefile, data, output='', prettify=False, references=False, positions='', compact=False, encoder='', binary=False)
+  exportSourceMap(jsonPath, sourceMap, compact=False, encoder='')
+  handleRootChild(child, codefile, globalArgs, importedProcessDict, importedMainDict, output='', console=Console(), session=None, requests=None)
+  handleRootChildren(tree, codefile, output='', console=<Console(), globalArgs={}, session=None, requests=None)
+  importstep(children, globalArgs, importedProcessDict, importedMainDict, codefile, output='', console=Console(), session=None, requests=None)
   loadCode(codefile, console=Console())
-  loadLanguage(language='language.lark', algorithm='lalr')
+  outputPath(codefile, output='', binary=False)
+  loadLanguage(language='language.lark', algorithm='lalr', cache=True, transformer=None)
+  parserCachePath(language='language.lark', cacheDir=CACHE_PATH)
   parseCode(parser, readFile, console=Console())
   runScripts(scripts, globalArgs, data, console=Console())    
-  runVisualiser(codefile, stylise='', output='')   
-  treeReduction(processDict, fileName, globalArgs, importedProcessDict, importedMainDict, console=Console())
+  runVisualiser(codefile, stylise='', output='', binary=False)   
+  warmCache(language='language.lark')
+  treeReduction(processDict, fileName, globalArgs, importedProcessDict, importedMainDict, console=Console(), reachable=None, keepUnreduced=False, jobs=1, emit=None)
   withstep(children, globalArgs, console=Console(), throwError=True, appendLineNum=False)
 
 Notes:
   Could and probably should use a class instead of many functions, but, using functions is more secure in Python (lack of private variables). Could rework it in the future. 
 """
-import re
-import json
 from subprocess import run
 from pathlib import Path, PurePath
 from lark import Tree,Transformer,Lark,Token, UnexpectedInput
-from console import Console
+from console import Console, CompileError
 from transformer import ReduceTree
-from check_import import detectCycle
 from toolset import Toolset
+from session import Session
+from roster import plainData
+from references import referenceData
+from jsonio import dumpJSON, writeFile, IncrementalExport
+from binary import encodeBinary, BINARY_EXTENSION
+from sourcemap import SourceMap, mapPath
+from substitution import ArgumentSubstitution
+from lazy import lazyPlan, unreducedProcess
+from parallel import parallelReduction, MIN_PARALLEL_PROCESSES
 import sys
+import hashlib
+import lark
 
 VISUALISER_PATH = str(Path(PurePath(sys.argv[0])).absolute().parents[0]) + "/Graph Visualisation/visualiser.py"
+CACHE_PATH = str(Path(PurePath(__file__)).absolute().parents[0]) + "/__bpmmlcache__"
 
-def loadLanguage(language="language.lark", algorithm="lalr"):
+def loadLanguage(language="language.lark", algorithm="lalr", cache=True, transformer=None):
     """
     Load the language .lark file into the script and return the parser (within a turple) to be used to parse any text.
 
     Arguments:
       language -- (optional) string containing the name of the Lark language file (with extension). Defaults to "language.lark"
       algorithm -- (optional) string containing the name of the parsing algorithm to be used (early, lalr, cyk, None). Defaults to "lalr"
+      cache -- (optional) boolean containing True if the parser will be loaded from (and saved to) the parser cache, False otherwise. Defaults to True
+      transformer -- (optional) lark Transformer object applied while parsing ("lalr" only), meaning parsing returns the transformed tree. Defaults to None
 
     Return:
       turple containing [0] -> the parser Lark object to be used for parsing any text,
@@ -60,12 +86,62 @@ def loadLanguage(language="language.lark", algorithm="lalr"):
        TypeError for both arguments if they are not strings
        AssertionError for the algorithm argument if it is not a valid parsing algorithm
        MANY potential errors if the language file is invalid
+
+    Notes:
+      Only the "lalr" algorithm can be cached. The cached parser is stored in CACHE_PATH (see parserCachePath()) and is rebuilt automatically whenever the language file or the Lark version changes.
+      If the cache folder is not writable the parser is simply built from scratch.
     """
     #print("Loading Language")
     scripts = []
-    parser = Lark(open(language, "r", encoding="utf-8"), parser=algorithm, lexer_callbacks={'SCRIPT': scripts.append})
+    grammar = open(language, "r", encoding="utf-8").read()
+    if cache and algorithm == "lalr":
+        cacheFile = parserCachePath(language)
+        try:
+            if not Path(cacheFile).is_file():
+                Path(CACHE_PATH).mkdir(exist_ok=True)
+                # a new grammar (or Lark version) makes every older cached parser of the same language stale
+                for staleFile in Path(CACHE_PATH).glob(PurePath(language).stem + "-*.lark"):
+                    staleFile.unlink()
+            parser = Lark(grammar, parser=algorithm, lexer_callbacks={'SCRIPT': scripts.append}, transformer=transformer, cache=cacheFile)
+            return parser, scripts
+        except OSError:
+            pass
+    parser = Lark(grammar, parser=algorithm, lexer_callbacks={'SCRIPT': scripts.append}, transformer=transformer)
     return parser, scripts
 
+def parserCachePath(language="language.lark", cacheDir=CACHE_PATH):
+    """
+    Return the path of the cached parser of a language file.
+
+    Arguments:
+      language -- (optional) string containing the name of the Lark language file (with extension). Defaults to "language.lark"
+      cacheDir -- (optional) string containing the folder that stores the cached parsers. Defaults to CACHE_PATH
+
+    Return:
+      string containing the path of the cached parser (the file itself might not exist yet)
+
+    Exceptions:
+      FileNotFoundError for the language argument if the file does not exist
+
+    Note:
+      The name of the cached parser contains a hash of the contents of the language file and of the Lark version, so editing the language or upgrading Lark automatically invalidates the cache.
+    """
+    key = hashlib.sha256(open(language, "rb").read() + lark.__version__.encode("utf-8")).hexdigest()[:16]
+    return cacheDir + "/" + PurePath(language).stem + "-" + key + ".lark"
+
+def warmCache(language="language.lark"):
+    """
+    Build the cached parser of a language file ahead of time (e.g. at install time) and return its path.
+
+    Arguments:
+      language -- (optional) string containing the name of the Lark language file (with extension). Defaults to "language.lark"
+
+    Return:
+      string containing the path of the cached parser
+    """
+    loadLanguage(language)
+    return parserCachePath(language)
+
 def loadCode(codefile, console=Console()):
     """
     Load the .bpmml code file into the script and return a string containing its contents.
@@ -106,7 +182,7 @@ def parseCode(parser, readFile, console=Console()):
       AttributeError for invalid parser type
 
     Notes:
-      UnxepectedInput is automatically caught and handled, meaning the it throws a beautified error (and sys.exit()) if the readFile string has an error based on our BPMML language definition
+      UnxepectedInput is automatically caught and handled, meaning the it throws a beautified error (and stops the compiler, see Console.stop()) if the readFile string has an error based on our BPMML language definition
     """
     try:
         tree = parser.parse(readFile) # tree creation
@@ -133,10 +209,10 @@ def parseCode(parser, readFile, console=Console()):
         
         console.error(exc_class, line=u.line, exitCompiler=False)
         console.unexpected(u.get_context(readFile)[:-1])
-        sys.exit()
+        console.stop()
     return tree
 
-def handleRootChildren(tree, codefile, output="", console=Console(), globalArgs = {}):
+def handleRootChildren(tree, codefile, output="", console=Console(), globalArgs = {}, session=None, requests=None):
     """
     Handle every BPMML command/block that is directly inside the start block and return a turple with all the availiable info.
 
@@ -153,6 +229,8 @@ def handleRootChildren(tree, codefile, output="", console=Console(), globalArgs
       output -- (optional) pathlib.PosixPath object instance containing the output directory. Defaults to empty path (which makes the output directory the current working directory)
       console -- (optional) Console() object used to print data/info. Defaults to a new Console() instance
       globalArgs -- (optional) (edited in-place) dict containing all of the global arguments during the current compilation. Defaults to empty dict
+      session -- (optional) Session() object shared by every compilation of the run, passed on to the imports. Defaults to None (every import creates its own)
+      requests -- (optional) dict containing the processes asked from every import in lazy mode (see lazy.reachableProcesses()). Defaults to None (every import reduces all of its processes)
 
     Return:
       turple containing [0] -> dict containing all of the global processes of current BPMML code file,
@@ -173,13 +251,8 @@ def handleRootChildren(tree, codefile, output="", console=Console(), globalArgs
     # we iterate the children of the root to save every global process to processDict
     for child in tree.children:
         if child != "start" and child != "end" and child !='\n':
-            if child.data == "withstep":
-                withstep(child.children, globalArgs, console)
-            elif child.data == "importstep":
-                try:
-                    importstep(child.children, globalArgs, importedProcessDict, importedMainDict, codefile, output, console)
-                except Exception:
-                    console.error("Imported BPMML file exported invalid data. If you are running a script, make sure it is valid.", line=child.children[0].line)     
+            if child.data in ("withstep", "importstep"):
+                handleRootChild(child, codefile, globalArgs, importedProcessDict, importedMainDict, output, console, session, requests)
             else:
                 name = str(child.children[1])
                 if name in processDict.keys():
@@ -187,6 +260,29 @@ def handleRootChildren(tree, codefile, output="", console=Console(), globalArgs
                 processDict[name] = child
     return processDict, globalArgs, importedProcessDict, importedMainDict
 
+def handleRootChild(child, codefile, globalArgs, importedProcessDict, importedMainDict, output="", console=Console(), session=None, requests=None):
+    """
+    Handle a global argument definition or an import that is directly inside the start block and change current data in-place.
+
+    Usage: Used within handleRootChildren() function and by the single pass mode (see transformer.InlineReduceTree()).
+
+    Arguments:
+      child -- Lark tree object containing a "withstep" or an "importstep" node
+      see handleRootChildren() and importstep() functions for the rest of the arguments
+
+    Return:
+      None
+    """
+    if child.data == "withstep":
+        withstep(child.children, globalArgs, console)
+    else:
+        try:
+            importstep(child.children, globalArgs, importedProcessDict, importedMainDict, codefile, output, console, session, requests)
+        except CompileError: # the error of the imported file was already reported by its console
+            raise
+        except Exception:
+            console.error("Imported BPMML file exported invalid data. If you are running a script, make sure it is valid.", line=child.children[0].line)
+
 def withstep(children, globalArgs, console=Console(), throwError = True, appendLineNum = False):
     """
     Handle global argument definition in the BPMML code file and change current data in-place.
@@ -208,23 +304,19 @@ def withstep(children, globalArgs, console=Console(), throwError = True, appendL
       use appendLineNum to store the lines of imported global arguments so that you can include said lines in any potential Error/Warning messsages.
       see Notes of handleRootChildren() function for more info on the format of dicts.
     """
+    arguments = ArgumentSubstitution(globalArgs)
     for subchild in children:
         if str(subchild) not in ("with", '\n'):
             argumentList = str(subchild).split("=")
-            variableList = re.findall("&\w+", argumentList[1])
-            for var in variableList:
-                var = var.strip()
-                varInGlobalArgs = True
-                if var not in globalArgs.keys():
-                    varInGlobalArgs = False
-                    if throwError: console.error(console.colorName(argumentList[0]) + " was given a non existing variable as value ("+console.colorName(var)+")", line=subchild.line)
-                if varInGlobalArgs: argumentList[1] = argumentList[1].replace(var, globalArgs[var]) 
+            argumentList[1], missing = arguments.substitute(argumentList[1]) #the arguments defined before are substituted, so chained arguments are resolved here once
+            if missing and throwError:
+                console.error(console.colorName(argumentList[0]) + " was given a non existing variable as value ("+console.colorName(missing[0])+")", line=subchild.line)
             name = "&" + argumentList[0].strip()
             if name not in globalArgs.keys():
                 globalArgs[name] = argumentList[1].strip()
             if appendLineNum: globalArgs["#" + name] = subchild.line
 
-def importstep(children, globalArgs, importedProcessDict, importedMainDict, codefile, output="", console=Console()):
+def importstep(children, globalArgs, importedProcessDict, importedMainDict, codefile, output="", console=Console(), session=None, requests=None):
     """
     Handle imports in the BPMML code file and change current data in-place.
 
@@ -238,22 +330,36 @@ def importstep(children, globalArgs, importedProcessDict, importedMainDict, code
       codefile -- string containing the filename of the code file to be imported (IMPORTANT: with extension)
       output -- (optional) pathlib.PosixPath object instance containing the output directory. Defaults to empty path (which makes the output directory the current working directory)
       console -- (optional) Console() object used to print data/info. Defaults to a new Console() instance
+      session -- (optional) Session() object shared by every compilation of the run. Defaults to None (the imported file creates its own)
+      requests -- (optional) dict containing the processes asked from every import in lazy mode (see lazy.reachableProcesses()). Defaults to None (the imported file reduces all of its processes)
 
     Return:
       None
 
     Note:
       see Notes of handleRootChildren() function for more info on the format of dicts.
+      The compiled data of the imported file is linked in memory. Its json file is only exported if session.exportImports is True (or there is no session).
+      If the session has an import resolver, the imported file is never read from disk: the resolver is given the imported name (with extension) and codefile, and returns its contents (None if it does not exist).
+      The imported file is then named after the folder of codefile, like an imported file found next to it.
+      The session module cache (see cache.ModuleCache()) is checked before compiling the imported file, so a file imported again (with the same arguments) is not recompiled.
+      In lazy mode the imported file only reduces the processes asked for, which are part of its cache key.
     """
     importedName = str(children[1])
     if importedName[-6:] != ".bpmml":
         importedName += ".bpmml"
-    if not Path(importedName).is_file():
+    importedText = None
+    if session and session.importResolver:
+        importedText = session.importResolver(importedName, codefile)
+        importedName = str(PurePath(codefile).parent / importedName)
+        if importedText is None:
+            console.error(console.colorName(importedName) + " does not exist", line=children[0].line)
+    elif not Path(importedName).is_file():
         importedName = str(PurePath(codefile).parent / importedName)
         if not Path(importedName).is_file():
             console.error(console.colorName(importedName) + " does not exist", line=children[0].line)
-    if(detectCycle(codefile, importedName)):
-        console.error(console.colorName(codefile) + " tries to import " + console.colorName(importedName) + " but that creates an import cycle", line=children[0].line)
+    cycle = session.importGraph.addImport(codefile, importedName) if session else []
+    if cycle:
+        console.error(console.colorName(codefile) + " tries to import " + console.colorName(importedName) + " but that creates an import cycle: " + " -> ".join(console.colorName(PurePath(path).name) for path in cycle), line=children[0].line)
     importedArgs = {}
     withTree = ""
     for child in children:
@@ -261,29 +367,36 @@ def importstep(children, globalArgs, importedProcessDict, importedMainDict, code
             withTree = child
     if withTree:
         withstep(withTree.children, importedArgs, console, throwError=False, appendLineNum=True)
+        arguments = ArgumentSubstitution(globalArgs)
         for name, value in importedArgs.items():
             if name[0] == "#": continue
-            variableList = re.findall("&\w+", value)
-            for var in variableList:
-                var = var.strip()
-                if var not in globalArgs.keys():
-                    console.error(console.colorName(name) + " was given a non existing variable as value ("+console.colorName(var)+")", line=importedArgs["#" + name])
-                value = value.replace(var, globalArgs[var])
-                importedArgs[name] = value
-    if output:
-        console.closeLog() #closing and re-opening to append instead of write
-        console.openLog()
-        compileCode(importedName, Console(pre=console.pre + "In " + console.colorName(importedName) + ": \n\t"), pretty=False, output=output, importedArgs=importedArgs)
-        path = str(output / PurePath(importedName).stem)
-    else:
-        console.closeLog() #closing and re-opening to append instead of write
-        console.openLog()
-        compileCode(importedName, Console(pre=console.pre + "In " + console.colorName(importedName) + ": \n\t"), pretty=False, importedArgs=importedArgs)
-        path = str(PurePath(importedName))[:-6]
-    importedFile = json.load(open(path + ".json"))
+            importedArgs[name], missing = arguments.substitute(value)
+            if missing:
+                console.error(console.colorName(name) + " was given a non existing variable as value ("+console.colorName(missing[0])+")", line=importedArgs["#" + name])
     name = PurePath(importedName).stem
     if Token("AS", 'as') in children:
         name = str(children[3])
+    processes = None
+    flavour = ""
+    if requests is not None:
+        processes = sorted(requests.get(name, ()))
+        flavour = "lazy=" + session.lazy + ":" + ",".join(processes)
+    console.closeLog() #closing and re-opening to append instead of write
+    console.openLog()
+    export = (session is None or session.exportImports) and processes is None # a lazily reduced import is only a part of its code file, so it never replaces its json file
+    cache = session.moduleCache if session else None
+    if cache and importedText is not None:
+        cache.remember(importedName, importedText)
+    importedFile = cache.get(importedName, importedArgs, flavour) if cache else None
+    if importedFile is None:
+        if cache: cache.begin(importedName)
+        try:
+            importedFile = compileCode(importedName, console.child(console.pre + "In " + console.colorName(importedName) + ": \n\t", importedName), pretty=False, output=output, importedArgs=dict(importedArgs), session=session, export=export, text=importedText, processes=processes)
+        finally:
+            if cache: record = cache.end()
+        if cache: cache.put(importedName, importedArgs, importedFile, record, flavour)
+    elif export and not Path(outputPath(importedName, output, session.binary)).is_file():
+        exportJSON(importedName, importedFile, output, references=session.references, positions=session.positions, compact=session.compact, encoder=session.encoder, binary=session.binary)
     if name in importedProcessDict.keys():
         console.error(console.colorName(importedName) + " is imported multiple times")
     importedProcessDict[name] = {}
@@ -292,7 +405,7 @@ def importstep(children, globalArgs, importedProcessDict, importedMainDict, code
     importedMainDict[name] = importedFile["execute"] 
 
 #we use a transformer that traverses the trees bottom up and reduces the nodes until it reaches the root
-def treeReduction(processDict, fileName, globalArgs, importedProcessDict, importedMainDict, console=Console()):
+def treeReduction(processDict, fileName, globalArgs, importedProcessDict, importedMainDict, console=Console(), reachable=None, keepUnreduced=False, jobs=1, emit=None):
     """
     Reduce process trees using the transformer.ReduceTree() custom class to compile every global process and return the compiled processes.
 
@@ -303,21 +416,41 @@ def treeReduction(processDict, fileName, globalArgs, importedProcessDict, import
       importedProcessDict -- dict containing all of the global processes of the imported BPMML code files excluding "main" processes
       importedMainDict -- dict containing all of the "main" processes of the imported BPMML code files
       console -- (optional) Console() object used to print data/info. Defaults to a new Console() instance
+      reachable -- (optional) set containing the names of the only global processes to be reduced (lazy mode, see lazy.py). Defaults to None (every process is reduced)
+      keepUnreduced -- (optional) boolean containing True if the processes that are not reduced are kept untransformed (see lazy.unreducedProcess()), False if they are omitted. Defaults to False
+      jobs -- (optional) integer containing the number of worker processes reducing independent processes in parallel (see parallel.py). Defaults to 1 (no workers)
+      emit -- (optional) function called with every compiled global process apart from "main" as soon as it is ready, in order (e.g. to export it, see jsonio.IncrementalExport()). Defaults to None
 
     Return:
       dict containing every compilled global processes (compiled means they are now dicts)
     
     Notes:
       the compiled dicts now have the same key (see handleRootChildren() function) but the values are now other dicts (the compiled version of .bpmml is a dict)
+      Processes are still reduced in the order they are defined, so a call of a process that is defined bellow it fails in lazy mode too. An unreduced "main" process is never kept.
+      Workers are only started for at least MIN_PARALLEL_PROCESSES processes. The reduced processes (and the messages) are the same with any number of workers.
     """
     #print("Reducing Tree")
     readyProcessDict = {} 
+    names = [name for name in processDict if reachable is None or name in reachable]
+    parallelProcesses = {}
+    if jobs > 1 and len(names) >= MIN_PARALLEL_PROCESSES:
+        parallelProcesses = parallelReduction(processDict, names, fileName, globalArgs, importedProcessDict, importedMainDict, console, jobs)
     # we transform every tree in the processDict one by one and then place it in the readyProcessDict
     for name,process in processDict.items():
+        if reachable is not None and name not in reachable:
+            if keepUnreduced and name != "main":
+                readyProcessDict[name] = unreducedProcess(process, fileName)
+                if emit: emit(readyProcessDict[name])
+            continue
+        if name in parallelProcesses:
+            readyProcessDict[name] = parallelProcesses[name]
+            if emit and name != "main": emit(readyProcessDict[name])
+            continue
         reducedTree = ReduceTree(fileName, globalArgs, readyProcessDict, importedProcessDict, importedMainDict, console).transform(process)
         if name in readyProcessDict.keys():
             console.error("An import has the same name as a process: " + console.colorName(name))
         readyProcessDict[name] = reducedTree
+        if emit and name != "main": emit(reducedTree)
     return readyProcessDict
 
 def runScripts(scripts, globalArgs, data, console=Console()):
@@ -341,7 +474,7 @@ def runScripts(scripts, globalArgs, data, console=Console()):
             except Exception as e:
                 console.warning("Script " + console.colorName(code) + " has thrown the following Error: " + console.colorName(str(e)), line=script.line)
 
-def exportJSON(codefile, data, output="", prettify=False):
+def exportJSON(codefile, data, output="", prettify=False, references=False, positions="", compact=False, encoder="", binary=False):
     """ 
     Export json file by converting the data to json.
 
@@ -350,42 +483,140 @@ def exportJSON(codefile, data, output="", prettify=False):
       data -- json convertable data to be converted and extracted
       output -- (optional) pathlib.PosixPath object instance containing the output directory. Defaults to empty path (which makes the output directory the current working directory)
       prettify -- (optional) boolean containing True if the data will be converted using newlines, spacing and tabs, False otherwise. Defaults to False
+      references -- (optional) boolean containing True if the data will be converted to the reference-based form (see references.py), False otherwise. Defaults to False
+      positions -- (optional) string containing "map" to export the positions of the nodes in a source map file next to the json file, "strip" to not export them (see sourcemap.py). Defaults to empty string (the positions are exported in the json file)
+      compact -- (optional) boolean containing True if the data will be converted without spaces after the separators and with non-ASCII characters unescaped (ignored if prettify is True), False otherwise. Defaults to False
+      encoder -- (optional) string containing the name of the encoder converting the data if it supports the options (see jsonio.dumpJSON()). Defaults to empty string (the fastest one that does)
+      binary -- (optional) boolean containing True if the data will be exported in the binary format (see binary.py) instead of json (prettify, compact and encoder are then ignored), False otherwise. Defaults to False
 
     Return:
       None
+
+    Notes:
+      The data is written by the fastest encoder available (see jsonio.py), and without recursion if it is nested too deeply for it, so deeply nested processes are exported like any other.
+      Files are written atomically and a file whose contents did not change is left untouched, modification time included (see jsonio.OutputFile()).
     """
     if output:
         codefile = data["title"] + ".bpmml"
-    with open(str(output / PurePath(codefile[:-6] + ".json")), "w") as output:
-        if prettify:
-            json.dump(data, output, indent=4)
-        else:
-            json.dump(data, output)
+    if references:
+        data = referenceData(data)
+    jsonPath = outputPath(codefile, output, binary)
+    sourceMap = SourceMap(record=positions == "map") if positions else None
+    if binary:
+        writeFile(jsonPath, encodeBinary(data, sourceMap))
+    else:
+        dumpJSON(data, jsonPath, prettify, compact, sourceMap, encoder)
+    if positions == "map":
+        exportSourceMap(jsonPath, sourceMap, compact, encoder)
 
-def runVisualiser(codefile, stylise="", output=""):
-    """ Run the visualiser script by giving the appropriate arguments to run with."""
+def exportSourceMap(jsonPath, sourceMap, compact=False, encoder=""):
+    """ Export the source map (see sourcemap.py) of an exported json file (or binary file) next to it, never pretty as it is only read by tools (see exportJSON() for compact and encoder)"""
+    dumpJSON(sourceMap.toData(PurePath(jsonPath).name), mapPath(jsonPath), compact=compact, encoder=encoder)
+
+def outputPath(codefile, output="", binary=False):
+    """
+    Return the path of the json file (or binary file) that a code file is exported to.
+
+    Arguments:
+      codefile -- string containing the filename of the code file (IMPORTANT: with extension)
+      output -- (optional) pathlib.PosixPath object instance containing the output directory. Defaults to empty path (which makes the output directory the folder of the code file)
+      binary -- (optional) boolean containing True for the path of the binary file (see binary.py), False for the json file. Defaults to False
+    """
+    extension = BINARY_EXTENSION if binary else ".json"
+    if output:
+        return str(output / PurePath(PurePath(codefile).stem + extension))
+    return str(PurePath(codefile[:-6] + extension))
+
+def runVisualiser(codefile, stylise="", output="", binary=False):
+    """ Run the visualiser script by giving the appropriate arguments to run with (binary is True if the code file was exported in the binary format)."""
+    extension = BINARY_EXTENSION if binary else ".json"
     if stylise:
         if output:
-            run(["python3", VISUALISER_PATH, "-o", str(output), "-s", stylise, str(PurePath(codefile[:-6] + ".json"))])
+            run(["python3", VISUALISER_PATH, "-o", str(output), "-s", stylise, str(PurePath(codefile[:-6] + extension))])
         else:
-            run(["python3", VISUALISER_PATH, "-s", stylise, str(PurePath(codefile[:-6] + ".json"))])
+            run(["python3", VISUALISER_PATH, "-s", stylise, str(PurePath(codefile[:-6] + extension))])
     else:
         if output:
-            run(["python3", VISUALISER_PATH, "-o", str(output), str(PurePath(codefile[:-6] + ".json"))])
+            run(["python3", VISUALISER_PATH, "-o", str(output), str(PurePath(codefile[:-6] + extension))])
         else:
-            run(["python3", VISUALISER_PATH, str(PurePath(codefile[:-6] + ".json"))])
+            run(["python3", VISUALISER_PATH, str(PurePath(codefile[:-6] + extension))])
+
+def compileCode(codefile, console=Console(), output="", pretty=False, importedArgs=None, session=None, export=True, text=None, processes=None):
+    """
+    Usage: Use in a separate script to compile a .bpmml. Initialise the arguments using environmental arguments (cmd/terminal), see console.py/launcher.py.
 
-def compileCode(codefile, console=Console(), output="", pretty=False, importedArgs={}):
-    """Usage: Use in a separate script to compile a .bpmml. Initialise the arguments using environmental arguments (cmd/terminal), see console.py/launcher.py."""
-    parser, scripts = loadLanguage()
+    Return the compiled data (the dict that is exported as json). The json file is only exported if export is True.
+
+    Pass the same Session() object (see session.py) to compile many files with a single parser. Imports always share the session of the importing file.
+    A single pass session reduces every process while parsing, so the tree of the code file is never built.
+    If text is given it is compiled instead of the contents of codefile (e.g. an unsaved document of an editor), codefile is then only used for its name and folder (imports are looked up there).
+    A lazy session (see session.py and lazy.py) only reduces the processes reachable from "main" and from the processes asked for: processes (the calls of an importing file) or, if None, the ones of the session.
+    importedArgs (the global arguments given to the code file, like the "with" of an import) is copied, as the global arguments of the code file are added to it while compiling.
+    """
+    importedArgs = dict(importedArgs or {})
+    if session is None:
+        session = Session(loadLanguage)
     fileName = Path(codefile).stem 
-    readFile = loadCode(codefile, console)
-    tree = parseCode(parser, readFile, console)
-    processDict, globalArgs, importedProcessDict, importedMainDict = handleRootChildren(tree, codefile ,output, console, importedArgs)
-    readyProcessDict = treeReduction(processDict, fileName, globalArgs, importedProcessDict, importedMainDict, console)
+    readFile = loadCode(codefile, console) if text is None else text
+    session.importGraph.enter(codefile)
+    try:
+        return compileSource(codefile, readFile, console, output, pretty, importedArgs, session, export, processes)
+    finally:
+        session.importGraph.leave()
+
+def compileSource(codefile, readFile, console, output, pretty, importedArgs, session, export, processes=None):
+    """
+    Compile the already loaded contents (readFile) of a code file, see compileCode().
+
+    Note:
+      Unless the whole data is needed first (scripts, --references, --binary) or the session is single pass, the json file is exported while the processes are reduced
+      (see jsonio.IncrementalExport()), every global process as soon as it is reduced, so the json of the whole data is never held at once.
+    """
+    fileName = Path(codefile).stem
+    mark = len(session.scripts)
+    exporter = None
+    if session.singlePass:
+        globalArgs, importedProcessDict, importedMainDict = importedArgs, {}, {}
+        rootHandler = lambda child: handleRootChild(child, codefile, globalArgs, importedProcessDict, importedMainDict, output, console, session)
+        session.reducer.begin(fileName, globalArgs, {}, importedProcessDict, importedMainDict, console, rootHandler)
+        try:
+            readyProcessDict = parseCode(session.parser, readFile, console)
+        finally:
+            session.reducer.end()
+        scripts = session.popScripts(mark)
+    else:
+        tree = parseCode(session.parser, readFile, console)
+        scripts = session.popScripts(mark)
+        reachable = requests = None
+        if session.lazy:
+            asked = processes if processes is not None else (["main"] + session.processes if session.processes else None)
+            reachable, requests = lazyPlan(tree, asked)
+        processDict, globalArgs, importedProcessDict, importedMainDict = handleRootChildren(tree, codefile ,output, console, importedArgs, session, requests)
+        if session.lazy and processes is None:
+            for name in session.processes:
+                if name not in processDict:
+                    console.warning("Process " + console.colorName(name) + " was asked for but it does not exist. Will ignore")
+        if export and not scripts and not session.references and not session.binary: # the json file is written while the processes are reduced
+            sourceMap = SourceMap(record=session.positions == "map") if session.positions else None
+            exporter = IncrementalExport(outputPath(codefile, output), fileName, pretty, sourceMap, session.compact, session.encoder)
+        try:
+            readyProcessDict = treeReduction(processDict, fileName, globalArgs, importedProcessDict, importedMainDict, console, reachable, session.lazy == "keep", session.reduceJobs, exporter and exporter.add)
+        except BaseException:
+            if exporter: exporter.abort()
+            raise
     mainProcess = readyProcessDict.pop("main", {})
     if mainProcess:
         mainProcess["name"] = fileName
     data = {"title":fileName, "globalProcesses":list(readyProcessDict.values()), "execute":mainProcess}
+    if scripts:
+        plainData(data) # scripts edit the data as plain json data (see toolset.py)
+        if session.moduleCache:
+            session.moduleCache.uncacheable()
     runScripts(scripts, globalArgs, data, console)
-    exportJSON(codefile, data, output, pretty)
\ No newline at end of file
+    if exporter:
+        exporter.finish(mainProcess)
+        if session.positions == "map":
+            exportSourceMap(exporter.path, sourceMap, session.compact, session.encoder)
+    elif export:
+        exportJSON(codefile, data, output, pretty, session.references, session.positions, session.compact, session.encoder, session.binary)
+    return data
\ No newline at end of file
@@ -3,6 +3,7 @@ Imports:
   from colorama import Fore, Style, init
   from pathlib import Path, PurePath
   import sys, getopt
+  from jsonio import ENCODERS
 
 Global Variables:
   VERSION -- string containing info about the current version of the BPMML compiler
@@ -12,16 +13,19 @@ Function:
   arguments(argv) -- handle arguments given to the BPMML compiler
 
 Classes:
+  CompileError(Exception) -- error of the compiler raised instead of exiting (see library.py)
   Console() -- handle interactions of the compiler with the output stream
 """
 from colorama import Fore, Style, init
 from pathlib import Path, PurePath
 import sys, getopt
+from jsonio import ENCODERS
 
 VERSION = "1.0.0 pre-release edition"
 HELP = "This is the help page of the BPMML compiler (version " + VERSION + ")\n" + """
     Command Usage:
         bpmml.exe [options] <codefile.bpmml>
+        bpmml.exe [options] <codefile.bpmml | pattern | dir> ...
     Options:
         -h, --help:
             Display this message.
@@ -36,9 +40,51 @@ HELP = "This is the help page of the BPMML compiler (version " + VERSION + ")\n"
             <mode> can be "full", "minimal", "split".
         -o, --output <dir>:
             Choose the output folder (<dir>) that the json file will be exported to.
+        -w, --warm-cache:
+            Build the cached parser of the BPMML language ahead of time (e.g. at install time), then exit.
+        --single-pass:
+            Reduce every process while parsing instead of building the whole tree first (lower memory on large files).
+        --no-import-json:
+            Do not export the json files of the imported BPMML files (they are still compiled and linked).
+        --module-cache <dir>:
+            Also keep the compiled imported BPMML files in a folder (<dir>) so that later runs do not recompile unchanged imports.
+        --make:
+            Only compile the BPMML codefile if it (or any of its imports) changed since the last --make compilation.
+        -j, --jobs <N>:
+            Compile the given BPMML codefiles using <N> worker processes, then print a summary.
+        --watch:
+            Keep the compiler running and recompile the given BPMML codefiles as soon as they (or their imports) change.
+        --server:
+            Run a local compile server for editors (JSON-RPC over stdin/stdout, one request per line, see server.py).
+        --references:
+            Export every process used more than once a single time, in a "processTable", and refer to it where it is used (see references.py).
+        --lazy:
+            Only reduce the processes reachable from "main" (and from --process), omitting the rest. Imports only reduce the processes that are called from them (and their json files are not exported).
+        --lazy-keep:
+            Like --lazy, but list the processes that are not reduced untransformed (without users and commands, "reduced" is "False").
+        --process <names>:
+            Also reduce the processes <names> (comma separated, the option can be repeated) in lazy mode. Implies --lazy.
+        --reduce-jobs <N>:
+            Reduce the independent global processes of every BPMML codefile using <N> worker processes (worth it for large codefiles, the output is the same).
+        --source-map:
+            Export the positions ("line" and the "file" of processes) in a source map file (<codefile>.map.json) instead of the json file (see sourcemap.py).
+        --strip-positions:
+            Export the json file without any positions (e.g. for production artifacts).
+        --stream:
+            Compile the BPMML codefile one global process at a time, with bounded memory (for very large codefiles, the output is the same, see stream.py).
+        --compact:
+            Export the json file without spaces after the separators and with non-ASCII characters unescaped (ignored with --pretty).
+        --encoder <name>:
+            Export the json files with the encoder <name> ("orjson" if installed, "json" or "stream"), when it supports the output (see jsonio.py). By default the fastest one that does is used.
+        --binary:
+            Export the compiled data in the compact binary format (<codefile>.bpmb) instead of json (see binary.py, which also converts between the two).
     Defaults:
         -The output folder is the folder containing the BPMML codefile.
         -The default style of the visualisation mode is "split".
+        -Many codefiles, glob patterns (e.g. "models/*.bpmml") and directories (searched recursively) can be given, compiling them as a batch.
+        -A batch is compiled by a single process, unless -j is given. The compiler exits with a non-zero code if any codefile of a batch fails.
+        -In lazy mode a codefile without a "main" process (and without --process) reduces every process. --single-pass always reduces every process.
+        -The --stream option only applies to a single codefile (not to --make, batches or --watch). Codefiles running SCRIPT commands, --references, --lazy and --binary are compiled without streaming.
     """
 
 # a process that defines the arguments our compiler accepts (the way it works is standard for Python)
@@ -52,14 +98,15 @@ def arguments(argv):
     Return:
       A dict containing the options, under which the compiler will run, based on the environmental arguments
       Default options are:
-        options = {"pretty": False, "visualise": False, "stylise": "", "output": ""}
+        options = {"pretty": False, "visualise": False, "stylise": "", "output": "", "warm": False, "singlePass": False, "importJSON": True, "moduleCache": "", "make": False, "jobs": 0, "watch": False, "server": False, "references": False, "lazy": "", "processes": [], "reduceJobs": 0, "positions": "", "stream": False, "compact": False, "encoder": "", "binary": False, "files": []}
+      "files" contains the codefiles (or glob patterns/directories) given after the options.
     
     Note:
       Invalid environmental arguments are automatically caught and force the compiler to show the "help" message, then exit.
     """
-    options = {"pretty": False, "visualise": False, "stylise": "", "output": ""}
+    options = {"pretty": False, "visualise": False, "stylise": "", "output": "", "warm": False, "singlePass": False, "importJSON": True, "moduleCache": "", "make": False, "jobs": 0, "watch": False, "server": False, "references": False, "lazy": "", "processes": [], "reduceJobs": 0, "positions": "", "stream": False, "compact": False, "encoder": "", "binary": False, "files": []}
     try:
-        opts,args = getopt.getopt(argv, "hpvVs:o:", ["help", "pretty", "visualise", "stylise", "output", "version"])
+        opts,args = getopt.getopt(argv, "hpvVs:o:wj:", ["help", "pretty", "visualise", "stylise", "output", "version", "warm-cache", "single-pass", "no-import-json", "module-cache=", "make", "jobs=", "watch", "server", "references", "lazy", "lazy-keep", "process=", "reduce-jobs=", "source-map", "strip-positions", "stream", "compact", "encoder=", "binary"])
     except getopt.GetoptError:
         if ".bpmml" in argv[-1]:
           arguments(argv[:-1])
@@ -87,8 +134,87 @@ def arguments(argv):
                 print(Fore.BLUE + arg + Fore.RED + " is not a valid directory\n" + Fore.RESET)
                 sys.exit()
             options["output"] = Path(PurePath(arg)).absolute()
+        elif opt in ('-w', "--warm-cache"):
+            options["warm"] = True
+        elif opt == "--single-pass":
+            options["singlePass"] = True
+        elif opt == "--no-import-json":
+            options["importJSON"] = False
+        elif opt == "--module-cache":
+            options["moduleCache"] = str(Path(PurePath(arg)).absolute())
+        elif opt == "--make":
+            options["make"] = True
+        elif opt in ('-j', "--jobs"):
+            if not arg.isdigit() or int(arg) < 1:
+                print(Fore.BLUE + arg + Fore.RED + " is not a valid number of jobs\n" + Fore.RESET)
+                sys.exit()
+            options["jobs"] = int(arg)
+        elif opt == "--watch":
+            options["watch"] = True
+        elif opt == "--server":
+            options["server"] = True
+        elif opt == "--references":
+            options["references"] = True
+        elif opt == "--lazy":
+            options["lazy"] = options["lazy"] or "omit"
+        elif opt == "--lazy-keep":
+            options["lazy"] = "keep"
+        elif opt == "--process":
+            options["processes"] += [name.strip() for name in arg.split(",") if name.strip()]
+            options["lazy"] = options["lazy"] or "omit"
+        elif opt == "--reduce-jobs":
+            if not arg.isdigit() or int(arg) < 1:
+                print(Fore.BLUE + arg + Fore.RED + " is not a valid number of jobs\n" + Fore.RESET)
+                sys.exit()
+            options["reduceJobs"] = int(arg)
+        elif opt == "--source-map":
+            options["positions"] = "map"
+        elif opt == "--strip-positions":
+            options["positions"] = "strip"
+        elif opt == "--stream":
+            options["stream"] = True
+        elif opt == "--compact":
+            options["compact"] = True
+        elif opt == "--encoder":
+            if arg not in ENCODERS:
+                print(Fore.BLUE + arg + Fore.RED + " is not an available encoder (" + ", ".join(ENCODERS) + ")\n" + Fore.RESET)
+                sys.exit()
+            options["encoder"] = arg
+        elif opt == "--binary":
+            options["binary"] = True
+    options["files"] = args
     return options
 
+class CompileError(Exception):
+    """
+    Error of the compiler raised instead of exiting, by the consoles of the library mode (see library.py).
+
+    Instance Variables:
+      message -- string containing the error message
+      file -- string containing the code file the error refers to, empty string if unknown
+      line -- integer containing the line of the error, None if unknown
+      context -- string containing the invalid line of the code file with the position of the error marked (see Console.unexpected()), empty string if none
+      diagnostics -- list containing every diagnostic collected until the error, the error included (see library.DiagnosticConsole())
+    """
+
+    def __init__(self, message, file="", line=None, context="", diagnostics=()):
+        """
+        Initialise CompileError object.
+
+        Arguments:
+          see Instance Variables (all of them apart from the message are optional)
+        """
+        super().__init__(message)
+        self.message = message
+        self.file = file
+        self.line = line
+        self.context = context
+        self.diagnostics = list(diagnostics)
+
+    def __str__(self):
+        position = self.file + (":" + str(self.line) if self.line else "")
+        return position + ": " + self.message if position else self.message
+
 class Console():
     """
     Handle output/messages shown to the users of the BPMML compiler
@@ -101,16 +227,19 @@ class Console():
 
     Public Methods:
       __init__(self, pre='', open_for='a')
+      child(self, pre, codefile='')
       closeLog(self)
       colorName(self, name)
       error(self, message='Unidentified error was caught', line='', exitCompiler=True)
       invalidArg(self, message='Invalid Argument Given')
       openLog(self, open_for='a')
+      stop(self)
       success(self, sec)
       suggestion(self, message='Unidentified suggestion was caught', line='')
       unexpected(self, message)
       warning(self, message='Unidentified warning was caught', line='')
     """
+    _coloured = False
 
     def __init__(self, logdir=str(Path(PurePath(sys.argv[0])).absolute().parents[0]), pre="", open_for="a"):
         """
@@ -127,7 +256,9 @@ class Console():
         Note:
           The log file is created in the same path as the working path.
         """
-        init() #initializing colorama lib support (important for Windows, pointless for Linux)
+        if not Console._coloured: #initializing colorama lib support (important for Windows, pointless for Linux) once, as every init() wraps the output streams again
+            init()
+            Console._coloured = True
         self.logdir = logdir
         self.openLog(open_for=open_for)
         self.pre = pre
@@ -150,6 +281,10 @@ class Console():
         self.consoleLog.write(self.pre.replace(Fore.YELLOW,"").replace(Fore.RESET, "") + "Error: " + line + message + '\n')
         if exitCompiler: sys.exit()
 
+    def stop(self):
+        """ Exit the compiler after an error that was printed without exiting (e.g. followed by unexpected(), see compiler.parseCode())"""
+        sys.exit()
+
     def warning(self, message="Unidentified warning was caught", line=""):
         """
         Print a warning message.
@@ -241,6 +376,16 @@ class Console():
         print(self.pre + Fore.GREEN + "Code successfully compiled in" + Fore.CYAN + " %.3f sec"  %(sec) + Fore.RESET)
         self.consoleLog.write(self.pre.replace(Fore.YELLOW,"").replace(Fore.RESET, "") + "Code successfully compiled in" + " %.3f sec"  %(sec) + '\n')
 
+    def child(self, pre, codefile=""):
+        """
+        Return a new Console() object for the messages of an imported code file (it logs to the same folder and is of the same class).
+
+        Arguments:
+          pre -- string containing the prefix of the new Console() object
+          codefile -- (optional) string containing the filename of the imported code file (not used by Console(), subclasses may use it). Defaults to empty string
+        """
+        return type(self)(logdir=self.logdir, pre=pre)
+
     def openLog(self, open_for="a"):
         """ Open the log file """
         self.consoleLog = open(self.logdir + "/console.log", open_for)
@@ -0,0 +1,587 @@
+"""
+Usage:
+  Write and read json without recursion (see compiler.exportJSON() and the visualiser).
+
+Json Without Recursion:
+  json.dump() and json.load() handle nested dicts and lists recursively, so deeply nested processes (thousands of nested process, parallel and try/check blocks) hit the recursion limit.
+  writeJSON() walks the data with an explicit stack instead and writes exactly what json.dump() writes (with the default separators, ensure_ascii and, when pretty, indent=4).
+  The nodes and user snapshots of compiled data are converted to json while they are written (see roster.jsonDefault()), so the data never needs to be converted first.
+  loadJSON() uses json.loads() and only if the json is nested too deeply it parses it again with an explicit stack (json.loads() is much faster for everything else).
+  StreamWriter() writes compiled data one global process at a time (see stream.py), exactly like writeJSON() writes the whole data, so the data never has to be held at once.
+  IncrementalExport() writes a json file that way while the processes are reduced (see compiler.compileSource()), so its json is never held at once either.
+
+Encoders:
+  dumpJSON() writes a json file with the first registered encoder (see registerEncoder()) that writes the options given exactly like writeJSON() does:
+    "orjson" -- orjson.dumps(), if orjson is installed (compact json only, as it never writes spaces)
+    "json" -- json.dumps(), whose C encoder is only used without indentation
+    "stream" -- writeJSON(), for everything else (pretty json and source maps), and for data nested too deeply for the others
+  Compact json has no spaces after the separators and its non-ASCII characters are written as UTF-8 instead of escaped (the only json orjson writes), so every encoder writes it the same.
+  Json files are written through a buffer of BUFFER_SIZE bytes.
+
+Unchanged Files:
+  Every file is written atomically (see OutputFile()): to a temporary file of its own next to its path (<path>.<random>.tmp), then renamed over it, so a reader never sees half a file
+  and writers of the same file (e.g. parallel compilations exporting a shared import) never write to the same temporary file.
+  The SHA-256 hash of the new contents is computed while they are written and compared with the hash of the existing file, and an existing file with the same contents
+  is left untouched (the temporary file is removed), so its modification time does not change and file watchers are not triggered. The existing file is only read if it has the same size.
+  Contents already held at once (see writeFile()) are compared before anything is written, so an unchanged file costs no write at all.
+  Another process may write the same file at the same time: the hash is read from the single file it opened (whichever one the path named then), the rename is atomic
+  and every writer only ever removes its own temporary file, so the file always ends up with the complete contents of one of the writers.
+
+Imports:
+  import os
+  import re
+  import json
+  import hashlib
+  import time
+  from json.encoder import encode_basestring_ascii, encode_basestring
+  from roster import jsonDefault
+  from sourcemap import POSITION_KEYS
+  import orjson (optional)
+
+Global Variables:
+  CHUNK_SIZE -- integer containing the number of encoded pieces that are joined before every write to the stream
+  BUFFER_SIZE -- integer containing the size (in bytes) of the buffer of the json files written by dumpJSON()
+  REPLACE_ATTEMPTS -- integer containing the number of times a file is renamed over a file that another process has open (which fails on Windows) before giving up
+  ENCODERS -- dict containing the registered encoders (key: name, value: turple of (write function, supports function, encode function or None), see registerEncoder())
+
+Functions:
+  chooseEncoder(pretty=False, compact=False, sourceMap=None, encoder='')
+  dumpJSON(data, path, pretty=False, compact=False, sourceMap=None, encoder='')
+  fileDigest(path, size)
+  loadJSON(stream)
+  registerEncoder(name, write, supports, encode=None)
+  temporaryFile(path)
+  writeFile(path, contents)
+  writeJSON(data, stream, pretty=False, sourceMap=None, level=0, compact=False)
+
+Classes:
+  IncrementalExport() -- export the json file of compiled data while its global processes are still being compiled
+  OutputFile() -- write a file atomically, leaving an existing file with the same contents untouched
+  StreamWriter() -- write compiled data as json one global process at a time
+"""
+import os
+import re
+import json
+import hashlib
+import time
+from json.encoder import encode_basestring_ascii, encode_basestring
+from roster import jsonDefault
+from sourcemap import POSITION_KEYS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CHUNK_SIZE = 8192
+BUFFER_SIZE = 1 << 20
+REPLACE_ATTEMPTS = 10
+ENCODERS = {}
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+def _leaf(value, encodeString=encode_basestring_ascii):
+    """ Return the json of a value that is not a dict or a list (None if it has to be converted with jsonDefault() first)"""
+    if isinstance(value, str):
+        return encodeString(value)
+    if value is None:
+        return "null"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if isinstance(value, int):
+        return int.__repr__(value)
+    if isinstance(value, float):
+        if value != value:
+            return "NaN"
+        if value in (float("inf"), float("-inf")):
+            return "Infinity" if value > 0 else "-Infinity"
+        return float.__repr__(value)
+    return None
+
+def writeJSON(data, stream, pretty=False, sourceMap=None, level=0, compact=False):
+    """
+    Write data to a stream as json.
+
+    Arguments:
+      data -- dict or list containing the data (e.g. compiled data, see compiler.compileCode())
+      stream -- file object (opened as text) that the json is written to
+      pretty -- (optional) boolean containing True if the json will be written using newlines and an indent of 4 spaces (like json.dump(data, stream, indent=4)), False otherwise. Defaults to False
+      sourceMap -- (optional) SourceMap() object (see sourcemap.py) that the positions of the nodes are given to instead of being written. Defaults to None (the positions are written)
+      level -- (optional) integer containing the indentation level the data starts at when pretty (the number of dicts and lists it is written within). Defaults to 0
+      compact -- (optional) boolean containing True if the json will be written without spaces after the separators and with non-ASCII characters unescaped (see the module docstring), False otherwise. Defaults to False
+
+    Notes:
+      The output is the same as json.dump(data, stream, default=jsonDefault) (with indent=4 if pretty, with separators=(",", ":") and ensure_ascii=False if compact).
+      Keys are expected to be strings, which is always the case for compiled data.
+      Shared (called) processes are written every time they are used, like json.dump() does.
+
+    Exceptions:
+      TypeError for any object that is not json serializable (see roster.jsonDefault())
+    """
+    compact = compact and not pretty
+    itemSeparator = "," if pretty or compact else ", "
+    keySeparator = ":" if compact else ": "
+    encodeString = encode_basestring if compact else encode_basestring_ascii
+    chunks = []
+    stack = [] #turples of (iterator over the items of an open dict or list, True for a dict, closing bracket)
+    first = True #True if the next item is the first one of the innermost open dict or list
+    value = data
+    while True:
+        # write the value (opening it if it is a non empty dict or list)
+        encoded = _leaf(value, encodeString)
+        if encoded is None:
+            if not isinstance(value, (dict, list, tuple)):
+                value = jsonDefault(value)
+                continue
+            if value:
+                isDict = isinstance(value, dict)
+                chunks.append("{" if isDict else "[")
+                if not isDict:
+                    items = iter(value)
+                elif sourceMap is not None and "type" in value:
+                    sourceMap.add(value)
+                    items = iter([item for item in value.items() if item[0] not in POSITION_KEYS])
+                else:
+                    items = iter(value.items())
+                stack.append((items, isDict, "}" if isDict else "]"))
+                first = True
+            else:
+                chunks.append("{}" if isinstance(value, dict) else "[]")
+        else:
+            chunks.append(encoded)
+        if len(chunks) >= CHUNK_SIZE:
+            stream.write("".join(chunks))
+            chunks.clear()
+        # find the next value, closing every dict and list that has no items left
+        while stack:
+            items, isDict, closing = stack[-1]
+            item = next(items, stack)
+            if item is stack:
+                stack.pop()
+                chunks.append("\n" + "    " * (len(stack) + level) + closing if pretty else closing)
+                first = False
+                continue
+            separator = "" if first else itemSeparator
+            if pretty:
+                separator += "\n" + "    " * (len(stack) + level)
+            first = False
+            if isDict:
+                chunks.append(separator + encodeString(item[0]) + keySeparator)
+                value = item[1]
+            else:
+                chunks.append(separator)
+                value = item
+            break
+        else:
+            break
+    stream.write("".join(chunks))
+
+def fileDigest(path, size):
+    """ Return the SHA-256 digest (bytes) of the contents of a file, None if it does not exist or its size is not size (so a file that cannot have the same contents is never read)"""
+    try:
+        with open(path, "rb") as existing:
+            if os.fstat(existing.fileno()).st_size != size:
+                return None
+            digest = hashlib.sha256()
+            for block in iter(lambda: existing.read(BUFFER_SIZE), b""):
+                digest.update(block)
+            return digest.digest()
+    except OSError:
+        return None
+
+def writeFile(path, contents):
+    """
+    Write bytes to a file atomically (see OutputFile()), unless the file already has exactly these contents.
+
+    Arguments:
+      path -- string containing the path of the file
+      contents -- bytes containing the contents of the file
+
+    Return:
+      boolean containing True if the file was written, False if it was left untouched
+    """
+    if fileDigest(path, len(contents)) == hashlib.sha256(contents).digest():
+        return False
+    with OutputFile(path, text=False) as stream:
+        stream.write(contents)
+    return stream.changed
+
+def _writeStream(data, path, pretty, compact, sourceMap):
+    """ Write a json file with writeJSON()"""
+    with OutputFile(path) as stream:
+        writeJSON(data, stream, pretty, sourceMap, compact=compact)
+
+def _encodeStdlib(data, compact):
+    """ Return the json of data encoded by json.dumps() (the C encoder of the standard library, only used without indentation)"""
+    return json.dumps(data, default=jsonDefault, separators=(",", ":") if compact else (", ", ": "), ensure_ascii=not compact)
+
+def _writeStdlib(data, path, pretty, compact, sourceMap):
+    """ Write a json file with json.dumps()"""
+    writeFile(path, _encodeStdlib(data, compact).encode("utf-8"))
+
+def _orjsonBytes(data):
+    """ Return the json of data encoded by orjson, as UTF-8 bytes (compact only, orjson never writes spaces and always writes UTF-8)"""
+    try:
+        return orjson.dumps(data, default=jsonDefault)
+    except orjson.JSONEncodeError as error: #a TypeError
+        if "Recursion limit" in str(error):
+            raise RecursionError(str(error)) from error
+        raise
+
+def _encodeOrjson(data, compact):
+    """ Return the json of data encoded by orjson"""
+    return _orjsonBytes(data).decode("utf-8")
+
+def _writeOrjson(data, path, pretty, compact, sourceMap):
+    """ Write a json file with orjson"""
+    writeFile(path, _orjsonBytes(data))
+
+def registerEncoder(name, write, supports, encode=None):
+    """
+    Register an encoder that dumpJSON() can write json files with (registered encoders are preferred in the order they are registered).
+
+    Arguments:
+      name -- string containing the name of the encoder (see the --encoder option)
+      write -- function of (data, path, pretty, compact, sourceMap) writing the data to the json file at path
+      supports -- function of (pretty, compact, sourceMap) returning True if the encoder writes that json exactly like writeJSON() does, False otherwise
+      encode -- (optional) function of (data, compact) returning the json of the data as a string (used by StreamWriter() for every global process). Defaults to None (the encoder only writes files)
+
+    Note:
+      An encoder that fails with RecursionError (data nested too deeply for it) is replaced by "stream" (writeJSON()), which supports everything.
+    """
+    ENCODERS[name] = (write, supports, encode)
+
+def chooseEncoder(pretty=False, compact=False, sourceMap=None, encoder=""):
+    """ Return the name of the encoder dumpJSON() writes the options given with (see dumpJSON() for the arguments)"""
+    names = [encoder] if encoder in ENCODERS else list(ENCODERS)
+    return next((name for name in names if ENCODERS[name][1](pretty, compact and not pretty, sourceMap)), "stream")
+
+def dumpJSON(data, path, pretty=False, compact=False, sourceMap=None, encoder=""):
+    """
+    Write data to a json file with the fastest encoder that supports the options and return the name of the encoder used.
+
+    Arguments:
+      data -- dict or list containing the data (e.g. compiled data, see compiler.compileCode())
+      path -- string containing the path of the json file
+      see writeJSON() for pretty, compact and sourceMap
+      encoder -- (optional) string containing the name of the encoder to use (see ENCODERS), if it supports the options. Defaults to empty string (the first registered encoder that does)
+
+    Exceptions:
+      TypeError for any object that is not json serializable (see roster.jsonDefault())
+
+    Notes:
+      Whichever the encoder, the json file is the same (see writeJSON()).
+      The json file is written atomically and only if its contents changed (see OutputFile()).
+    """
+    compact = compact and not pretty
+    name = chooseEncoder(pretty, compact, sourceMap, encoder)
+    try:
+        ENCODERS[name][0](data, path, pretty, compact, sourceMap)
+    except RecursionError:
+        name = "stream"
+        _writeStream(data, path, pretty, compact, sourceMap)
+    return name
+
+if orjson is not None:
+    registerEncoder("orjson", _writeOrjson, lambda pretty, compact, sourceMap: compact and sourceMap is None, _encodeOrjson)
+registerEncoder("json", _writeStdlib, lambda pretty, compact, sourceMap: not pretty and sourceMap is None, _encodeStdlib)
+registerEncoder("stream", _writeStream, lambda pretty, compact, sourceMap: True)
+
+class StreamWriter():
+    """
+    Write compiled data as json one global process at a time.
+
+    Description:
+      The output is exactly what writeJSON() writes for {"title": title, "globalProcesses": [every process given to add()], "execute": main process}, pretty, compact or neither,
+      and the nodes are given to the source map in the same order. begin() must be called first and end() last.
+      Every process is encoded by the encoder dumpJSON() would choose for the options (see chooseEncoder()), so only the json of a single process is ever held at once.
+
+    Instance Variables:
+      stream -- file object (opened as text) that the json is written to
+      pretty -- boolean containing True if the json is written using newlines and an indent of 4 spaces, False otherwise
+      sourceMap -- SourceMap() object that the positions of the nodes are given to, None if they are written
+      compact -- boolean containing True if the json is written without spaces after the separators and with non-ASCII characters unescaped, False otherwise
+      encoder -- string containing the name of the encoder of the processes (see ENCODERS)
+      processes -- integer containing the number of global processes written
+
+    Public Methods:
+      __init__(self, stream, pretty=False, sourceMap=None, compact=False, encoder='')
+      add(self, process)
+      begin(self, title)
+      end(self, execute)
+    """
+
+    def __init__(self, stream, pretty=False, sourceMap=None, compact=False, encoder=""):
+        """
+        Initialise StreamWriter object.
+
+        Arguments:
+          see writeJSON() and dumpJSON() (encoder)
+        """
+        self.stream = stream
+        self.pretty = pretty
+        self.sourceMap = sourceMap
+        self.compact = compact and not pretty
+        self.encoder = chooseEncoder(pretty, self.compact, sourceMap, encoder)
+        self.processes = 0
+        self._encode = ENCODERS[self.encoder][2]
+        self._separator = "," if self.compact else ", "
+        self._keySeparator = ":" if self.compact else ": "
+        self._encodeString = encode_basestring if self.compact else encode_basestring_ascii
+
+    def begin(self, title):
+        """ Write the title of the compiled data and open the list of its global processes"""
+        if self.pretty:
+            self.stream.write('{\n    "title": ' + encode_basestring_ascii(title) + ',\n    "globalProcesses": [')
+        else:
+            self.stream.write('{"title"' + self._keySeparator + self._encodeString(title) + self._separator + '"globalProcesses"' + self._keySeparator + "[")
+
+    def add(self, process):
+        """ Write the next global process (a node or a dict)"""
+        if self.pretty:
+            self.stream.write(("," if self.processes else "") + "\n        ")
+        elif self.processes:
+            self.stream.write(self._separator)
+        self._write(process, 2)
+        self.processes += 1
+
+    def end(self, execute):
+        """ Close the list of the global processes and write the main process ("execute", an empty dict if there is none)"""
+        if self.pretty:
+            self.stream.write(("\n    ]" if self.processes else "]") + ',\n    "execute": ')
+        else:
+            self.stream.write("]" + self._separator + '"execute"' + self._keySeparator)
+        self._write(execute, 1)
+        self.stream.write("\n}" if self.pretty else "}")
+
+    def _write(self, value, level):
+        if self._encode is not None:
+            try:
+                self.stream.write(self._encode(value, self.compact))
+                return
+            except RecursionError:
+                pass
+        writeJSON(value, self.stream, self.pretty, self.sourceMap, level, self.compact)
+
+def temporaryFile(path):
+    """
+    Create a new temporary file next to a file and return a turple of (file object opened as binary, string containing the path of the temporary file).
+
+    Note:
+      The temporary file (<path>.<random>.tmp) is created exclusively, so every writer gets its own, and with the permissions of any new file (unlike tempfile.mkstemp(), which only allows its owner).
+    """
+    while True:
+        temporary = "%s.%s.tmp" % (path, os.urandom(6).hex())
+        try:
+            return open(temporary, "xb", buffering=BUFFER_SIZE), temporary
+        except FileExistsError:
+            continue
+
+def _replace(temporary, path):
+    """ Rename a temporary file over a file, retrying for a moment while another process has the file open (on Windows a rename fails then, e.g. while another writer compares it)"""
+    for attempt in range(REPLACE_ATTEMPTS):
+        try:
+            os.replace(temporary, path)
+            return
+        except PermissionError:
+            if attempt == REPLACE_ATTEMPTS - 1:
+                _remove(temporary)
+                raise
+            time.sleep(0.01 * (attempt + 1))
+
+def _remove(temporary):
+    """ Remove a temporary file, if it is still there"""
+    try:
+        os.remove(temporary)
+    except FileNotFoundError:
+        pass
+
+class OutputFile():
+    """
+    Write a file atomically, leaving an existing file with the same contents untouched.
+
+    Description:
+      The contents are written to a new temporary file next to the path of the file (<path>.<random>.tmp, see temporaryFile()) and hashed on the way. close() compares their hash with the hash of the existing file (see fileDigest()),
+      removes the temporary file if they are the same and renames it over the file otherwise, so a reader never sees half a file and an unchanged file keeps its modification time.
+      abort() removes the temporary file without touching the file. It can be used as a context manager, that closes it or, on any exception, aborts it.
+
+    Instance Variables:
+      path -- string containing the path of the file
+      temporary -- string containing the path of the temporary file
+      text -- boolean containing True if str is written (encoded as UTF-8), False if bytes are
+      changed -- boolean containing True if close() replaced the file, False if it was left untouched, None before close()
+
+    Public Methods:
+      __init__(self, path, text=True)
+      abort(self)
+      close(self)
+      write(self, data)
+    """
+
+    def __init__(self, path, text=True):
+        """
+        Initialise OutputFile object by opening the temporary file.
+
+        Arguments:
+          path -- string containing the path of the file
+          text -- (optional) boolean containing True if str will be written, False if bytes will be. Defaults to True
+        """
+        self.path = path
+        self.text = text
+        self.changed = None
+        self._digest = hashlib.sha256()
+        self._size = 0
+        self._file, self.temporary = temporaryFile(path)
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def write(self, data):
+        """ Write str (if text) or bytes to the temporary file"""
+        if self.text:
+            data = data.encode("utf-8")
+        self._digest.update(data)
+        self._size += len(data)
+        self._file.write(data)
+
+    def close(self):
+        """ Close the temporary file and replace the file with it, unless the file has the same contents, and return changed"""
+        if self._file.closed:
+            return self.changed
+        self._file.close()
+        self.changed = fileDigest(self.path, self._size) != self._digest.digest()
+        if self.changed:
+            _replace(self.temporary, self.path)
+        else:
+            _remove(self.temporary)
+        return self.changed
+
+    def abort(self):
+        """ Close and remove the temporary file, leaving the file as it was"""
+        if not self._file.closed:
+            self._file.close()
+            _remove(self.temporary)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, errorType, error, traceback):
+        if errorType is None:
+            self.close()
+        else:
+            self.abort()
+
+class IncrementalExport():
+    """
+    Export the json file of compiled data while its global processes are still being compiled (see compiler.compileSource() and stream.py).
+
+    Description:
+      The json file is written through a StreamWriter() to an OutputFile() (a temporary file of its own), so it only replaces the final path once finish() is called (and only if its contents changed),
+      and a compilation that fails never leaves half a json file behind (abort() removes it). It can be used as a context manager, that aborts on any exception.
+
+    Instance Variables:
+      path -- string containing the path of the json file
+      writer -- StreamWriter() object writing the json file
+      changed -- boolean containing True if finish() replaced the json file, False if it was left untouched (same contents), None before finish()
+
+    Public Methods:
+      __init__(self, path, title, pretty=False, sourceMap=None, compact=False, encoder='')
+      abort(self)
+      add(self, process)
+      finish(self, execute)
+    """
+
+    def __init__(self, path, title, pretty=False, sourceMap=None, compact=False, encoder=""):
+        """
+        Initialise IncrementalExport object by opening the json file and writing the title of the compiled data.
+
+        Arguments:
+          path -- string containing the path of the json file
+          title -- string containing the title of the compiled data
+          see StreamWriter() for the rest of the arguments
+        """
+        self.path = path
+        self.changed = None
+        self._stream = OutputFile(path)
+        self.writer = StreamWriter(self._stream, pretty, sourceMap, compact, encoder)
+        self.writer.begin(title)
+
+    def add(self, process):
+        """ Write the next global process (see StreamWriter.add())"""
+        self.writer.add(process)
+
+    def finish(self, execute):
+        """ Write the main process (see StreamWriter.end()), close the json file and move it to its final path (see OutputFile.close())"""
+        try:
+            self.writer.end(execute)
+        except BaseException:
+            self.abort()
+            raise
+        self.changed = self._stream.close()
+
+    def abort(self):
+        """ Close and remove the unfinished json file"""
+        self._stream.abort()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, errorType, error, traceback):
+        if errorType is not None:
+            self.abort()
+
+def loadJSON(stream):
+    """
+    Read json from a stream and return the data (like json.load()).
+
+    Arguments:
+      stream -- file object (opened as text) containing the json
+
+    Exceptions:
+      json.JSONDecodeError if the stream does not contain valid json
+    """
+    text = stream.read()
+    try:
+        return json.loads(text)
+    except RecursionError:
+        return _loadDeep(text)
+
+def _loadDeep(text):
+    """ Parse valid json with an explicit stack (dicts and lists are opened and closed here, the rest is decoded by json)"""
+    scan = json.JSONDecoder().scan_once
+    stack = [] #the dicts and lists that are open
+    keys = [] #the key of the next value of every open dict (None until it is read, always None for lists)
+    position = 0
+    while True:
+        position = _WHITESPACE.match(text, position).end()
+        char = text[position:position + 1]
+        if char in (",", ":"):
+            position += 1
+            continue
+        if char in ("{", "["):
+            position += 1
+            stack.append({} if char == "{" else [])
+            keys.append(None)
+            continue
+        if char in ("}", "]"):
+            position += 1
+            value = stack.pop()
+            keys.pop()
+        else:
+            try:
+                value, position = scan(text, position)
+            except StopIteration:
+                raise json.JSONDecodeError("Expecting value", text, position) from None
+            if stack and isinstance(stack[-1], dict) and keys[-1] is None:
+                keys[-1] = value
+                continue
+        # the value is complete, it belongs to the innermost open dict or list
+        if not stack:
+            return value
+        if keys[-1] is None:
+            stack[-1].append(value)
+        else:
+            stack[-1][keys[-1]] = value
+            keys[-1] = None
@@ -5,6 +5,7 @@ Usage:
 Help:
   Command Usage:
       bpmml.exe [options] codefile.bpmml
+      bpmml.exe [options] codefile.bpmml|pattern|dir ...
   Options:
         -h, --help:
             Display this message.
@@ -19,33 +20,129 @@ Help:
             mode can be "full", "minimal", "split".
         -o, --output dir:
             Choose the output folder (dir) that the json file will be exported to.
+        -w, --warm-cache:
+            Build the cached parser of the BPMML language ahead of time (e.g. at install time), then exit.
+        --single-pass:
+            Reduce every process while parsing instead of building the whole tree first (lower memory on large files).
+        --no-import-json:
+            Do not export the json files of the imported BPMML files (they are still compiled and linked).
+        --module-cache dir:
+            Also keep the compiled imported BPMML files in a folder (dir) so that later runs do not recompile unchanged imports.
+        --make:
+            Only compile the BPMML codefile if it (or any of its imports) changed since the last --make compilation.
+        -j, --jobs N:
+            Compile the given BPMML codefiles using N worker processes, then print a summary.
+        --watch:
+            Keep the compiler running and recompile the given BPMML codefiles as soon as they (or their imports) change.
+        --server:
+            Run a local compile server for editors (JSON-RPC over stdin/stdout, one request per line, see server.py).
+        --references:
+            Export every process used more than once a single time, in a "processTable", and refer to it where it is used (see references.py).
+        --lazy:
+            Only reduce the processes reachable from "main" (and from --process), omitting the rest. Imports only reduce the processes that are called from them (and their json files are not exported).
+        --lazy-keep:
+            Like --lazy, but list the processes that are not reduced untransformed (without users and commands, "reduced" is "False").
+        --process names:
+            Also reduce the processes names (comma separated, the option can be repeated) in lazy mode. Implies --lazy.
+        --reduce-jobs N:
+            Reduce the independent global processes of every BPMML codefile using N worker processes (worth it for large codefiles, the output is the same).
+        --source-map:
+            Export the positions ("line" and the "file" of processes) in a source map file (codefile.map.json) instead of the json file (see sourcemap.py).
+        --strip-positions:
+            Export the json file without any positions (e.g. for production artifacts).
+        --stream:
+            Compile the BPMML codefile one global process at a time, with bounded memory (for very large codefiles, the output is the same, see stream.py).
+        --compact:
+            Export the json file without spaces after the separators and with non-ASCII characters unescaped (ignored with --pretty).
+        --encoder name:
+            Export the json files with the encoder name ("orjson" if installed, "json" or "stream"), when it supports the output (see jsonio.py). By default the fastest one that does is used.
+        --binary:
+            Export the compiled data in the compact binary format (codefile.bpmb) instead of json (see binary.py, which also converts between the two).
     Defaults:
         -The output folder is the folder containing the BPMML codefile.
         -The default style of the visualisation mode is "split".
+        -Many codefiles, glob patterns (e.g. "models/*.bpmml") and directories (searched recursively) can be given, compiling them as a batch.
+        -A batch is compiled by a single process, unless -j is given. The compiler exits with a non-zero code if any codefile of a batch fails.
+        -In lazy mode a codefile without a "main" process (and without --process) reduces every process. --single-pass always reduces every process.
+        -The --stream option only applies to a single codefile (not to --make, batches or --watch). Codefiles running SCRIPT commands, --references, --lazy and --binary are compiled without streaming.
   
 Module Imports:
   import time
   import sys
-  (custom module) from console import Console, arguments
-  (custom module) from compiler import compileCode
+  import glob
+  from pathlib import Path
+  (custom module) from console import Console, arguments, HELP
+  (custom module) from compiler import compileCode, loadLanguage, runVisualiser, warmCache
+  (custom module) from session import Session
+  (custom module) from make import makeCode
+  (custom module) from stream import streamCode
+  (custom module) from batch import compileBatch, printSummary
+  (custom module) from watch import Watcher
+  (custom module) from server import serve
 """
 import time
 import sys
-from console import Console, arguments
-from compiler import compileCode, runVisualiser
+import glob
+from pathlib import Path
+from console import Console, arguments, HELP
+from compiler import compileCode, loadLanguage, runVisualiser, warmCache
+from session import Session
+from make import makeCode
+from stream import streamCode
+from batch import compileBatch, printSummary
+from watch import Watcher
+from server import serve
 
-options = arguments(sys.argv[1:])
-codefile = sys.argv[-1]
-startCode = time.time() #starting code timer
-console = Console(open_for="w")
-compileCode(codefile, console=console, output=options["output"], pretty=options["pretty"])
-endCode = time.time() # end of timer
-console.success(endCode-startCode)
-console.closeLog()
-if options["visualise"]:
-    try:
-        runVisualiser(codefile, options["stylise"], options["output"])
-    except Exception:
-        console.warning("The visualiser executable was not found. Visualisation aborted.")
+def runVisualisation(codefile, options, console):
+    """ Run the graph visualiser for a compiled code file (see compiler.runVisualiser()), if it was requested"""
+    if options["visualise"]:
+        try:
+            runVisualiser(codefile, options["stylise"], options["output"], options["binary"])
+        except Exception:
+            console.warning("The visualiser executable was not found. Visualisation aborted.")
+            sys.exit()
+
+if __name__ == "__main__": # the guard keeps the worker processes of a batch from running the launcher again
+    options = arguments(sys.argv[1:])
+    if options["warm"]:
+        print("Parser cached in " + warmCache())
+        sys.exit()
+    if options["server"]:
+        serve(options)
+        sys.exit()
+    if not options["files"]:
+        print(HELP)
+        sys.exit()
+    if options["watch"]:
+        Watcher(options["files"], options).run()
         sys.exit()
-        
\ No newline at end of file
+    codefile = options["files"][0]
+    if options["jobs"] or len(options["files"]) > 1 or Path(codefile).is_dir() or glob.has_magic(codefile):
+        startCode = time.time()
+        results = compileBatch(options["files"], options, jobs=options["jobs"] or 1)
+        failed = printSummary(results, time.time() - startCode)
+        console = Console()
+        for codefile, status, seconds, output in results:
+            if status != "failed":
+                runVisualisation(codefile, options, console)
+        console.closeLog()
+        sys.exit(1 if failed else 0)
+    startCode = time.time() #starting code timer
+    console = Console(open_for="w")
+    stream = options["stream"] and not options["make"]
+    session = Session.fromOptions(loadLanguage, options, singlePass=options["singlePass"] and not stream) # streaming parses every global process on its own
+    if stream:
+        compiled = streamCode(codefile, console=console, output=options["output"], pretty=options["pretty"], session=session)
+    elif options["make"]:
+        compiled = makeCode(codefile, console=console, output=options["output"], pretty=options["pretty"], session=session)
+    else:
+        compiled = compileCode(codefile, console=console, output=options["output"], pretty=options["pretty"], session=session)
+    endCode = time.time() # end of timer
+    if compiled:
+        console.success(endCode-startCode)
+    else:
+        print(codefile + " is up to date")
+    if options["moduleCache"]:
+        print("Module cache: " + session.moduleCache.stats())
+    console.closeLog()
+    runVisualisation(codefile, options, console)
@@ -0,0 +1,121 @@
+"""
+Usage:
+  Find the global processes of a code file that have to be reduced in lazy mode (see compiler.treeReduction()).
+
+Lazy Reduction:
+  Instead of reducing every global process, only the processes that are used are reduced: the roots (the "main" process and the processes asked for, e.g. with --process)
+  and every process they call, transitively. Imports are asked for the processes the code file calls from them (and for their "main" process if the import itself is called),
+  so an imported library only reduces what its importer uses. The json file of an import reduced that way is not exported, so it never replaces the json file of the whole library.
+  The processes that are not used are omitted from "globalProcesses", or listed untransformed (see unreducedProcess()) if they are kept.
+  Calls are found in the parsed tree before anything is reduced, so lazy reduction needs the tree (single pass sessions always reduce every process).
+
+Imports:
+  from lark import Tree
+  from nodes import ProcessNode
+
+Functions:
+  callTarget(args)
+  processCalls(process)
+  lazyPlan(tree, processes=None)
+  reachableProcesses(processDict, roots)
+  unreducedProcess(process, fileName)
+"""
+from lark import Tree
+from nodes import ProcessNode
+
+def callTarget(args):
+    """
+    Return the called process of a callstep node.
+
+    Arguments:
+      args -- list containing the children (tokens) of a callstep node ("call <name> [from <import>]" or "[from <import>] call <name>")
+
+    Return:
+      turple containing [0] -> token containing the name of the called process,
+                        [1] -> token containing the name of the import it is called from, None for processes of the code file (and for calls of an imported "main" process)
+    """
+    if args[0] == "call":
+        return args[1], (args[3] if len(args) > 2 else None)
+    return args[3], (args[1] if len(args) > 2 else None)
+
+def processCalls(process):
+    """
+    Return the calls of a process tree (nested processes included), as a list of turples of (name of the called process, name of the import or None), see callTarget().
+
+    Note:
+      The tree is walked iteratively and only its subtrees are visited (not its tokens).
+    """
+    calls = []
+    stack = [process]
+    while stack:
+        node = stack.pop()
+        if node.data == "callstep":
+            calls.append(callTarget(node.children))
+        else:
+            stack.extend(child for child in node.children if isinstance(child, Tree))
+    return calls
+
+def reachableProcesses(processDict, roots):
+    """
+    Find the global processes used by the roots (transitively) and the processes they call from imports.
+
+    Arguments:
+      processDict -- dict containing the global process trees of the code file (see compiler.handleRootChildren())
+      roots -- iterable containing the names of the processes that are used (names that are not global processes are ignored)
+
+    Return:
+      turple containing [0] -> set containing the names of the global processes to be reduced,
+                        [1] -> dict containing the processes asked from every import (key: name of the import, value: set of process names, "main" if the import itself is called)
+
+    Note:
+      The calls are followed iteratively, so long call chains do not hit the recursion limit.
+    """
+    reachable = set()
+    requests = {}
+    stack = [name for name in roots if name in processDict]
+    while stack:
+        name = stack.pop()
+        if name in reachable:
+            continue
+        reachable.add(name)
+        for target, parent in processCalls(processDict[name]):
+            if parent is not None:
+                parent = str(parent)
+                if parent[-6:] == ".bpmml":
+                    parent = parent[:-6]
+                requests.setdefault(parent, set()).add(str(target))
+            elif str(target) in processDict:
+                stack.append(str(target))
+            else:
+                requests.setdefault(str(target), set()).add("main") #an imported code file is called, meaning its "main" process
+    return reachable, requests
+
+def lazyPlan(tree, processes=None):
+    """
+    Plan the lazy reduction of a parsed code file.
+
+    Arguments:
+      tree -- Lark tree object containing the tree exported from parsing the code file
+      processes -- (optional) iterable containing the names of the processes asked for (by the importing code file). Defaults to None, meaning the code file is not an import:
+                   its "main" process is the root, or every process is reduced if it has no "main" process
+
+    Return:
+      turple of (reachable, requests), see reachableProcesses(). (None, None) if every process has to be reduced
+    """
+    processDict = {str(child.children[1]): child for child in tree.children if isinstance(child, Tree) and child.data == "process"}
+    if processes is None:
+        if "main" not in processDict:
+            return None, None
+        processes = ("main",)
+    return reachableProcesses(processDict, processes)
+
+def unreducedProcess(process, fileName):
+    """
+    Return the untransformed form of a global process that was not reduced (it has no users and no commands, and "reduced" is "False").
+
+    Arguments:
+      process -- Lark tree object containing the process
+      fileName -- string containing the name of the code file (without extension)
+    """
+    name = str(process.children[1])
+    return ProcessNode(fileName+".bpmml", process.children[0].line, name, "False" if name[0] == "_" else "True", [], [], "False")
@@ -0,0 +1,244 @@
+"""
+Usage:
+  Use the BPMML compiler as a library, e.g. to compile or validate many code files within a single (warm) Python process.
+
+Library Mode:
+  Console() prints the messages of the compiler and an error ends the process (sys.exit()), which suits the command line but not a process embedding the compiler.
+  In library mode the messages are collected as diagnostics instead (see DiagnosticConsole()) and an error raises a CompileError() (see console.py) carrying its message, file and line,
+  so the process can go on with the next code file. compileFile() returns a CompileResult() containing the compiled data and the warnings and suggestions of the compilation.
+  Pass the same Session() object (see session.py) to every compilation, so the language is loaded once and unchanged imports are not recompiled (see cache.ModuleCache()).
+  compileString() compiles code that is not in a file and never touches the disk (no code file is read and no json file is written), unless its import resolver does.
+
+Imports:
+  import io
+  from pathlib import PurePath
+  from contextlib import redirect_stdout
+  from console import Console, CompileError
+  from compiler import compileCode, loadLanguage
+  from session import Session
+  from roster import plainData
+
+Global Variables:
+  _session -- Session() object used by compileString() when no session is given (created by the first of them)
+
+Functions:
+  checkFiles(codefiles, session=None, output='', export=False, stdout=None)
+  compileFile(codefile, session=None, output='', pretty=False, importedArgs=None, export=False, text=None, stdout=None)
+  compileString(text, name='main', args=None, importResolver=None, session=None, plain=False, stdout=None)
+
+Classes:
+  CompileResult() -- the result of a successful compilation in library mode
+  DiagnosticConsole(Console) -- Console() that collects messages as diagnostics instead of printing them
+"""
+import io
+from pathlib import PurePath
+from contextlib import redirect_stdout
+from console import Console, CompileError
+from compiler import compileCode, loadLanguage
+from session import Session
+from roster import plainData
+
+_session = None
+
+class DiagnosticConsole(Console):
+    """
+    Console() that collects messages as diagnostics instead of printing them.
+
+    Description:
+      Every error, warning and suggestion becomes a dict of {"severity", "message", "line", "file", "context"}. The log is kept in memory.
+      Consoles of imported code files (see Console.child()) share the diagnostics list, their diagnostics name the imported file.
+      Errors raise a CompileError() (see console.py) instead of exiting, once they are collected.
+
+    Instance Variables (apart from the Console() ones):
+      diagnostics -- list containing the collected diagnostics
+      file -- string containing the code file the messages refer to
+
+    Public Methods (apart from the Console() ones):
+      __init__(self, logdir='', pre='', open_for='a', diagnostics=None, file='')
+      failure(self)
+    """
+
+    def __init__(self, logdir="", pre="", open_for="a", diagnostics=None, file=""):
+        """
+        Initialise DiagnosticConsole object.
+
+        Arguments:
+          see Console() for logdir, pre and open_for (the log is never written to disk)
+          diagnostics -- (optional) list that the diagnostics are appended to. Defaults to a new list
+          file -- (optional) string containing the code file the messages refer to. Defaults to empty string
+        """
+        self.diagnostics = [] if diagnostics is None else diagnostics
+        self.file = file
+        super().__init__(logdir=logdir, pre=pre, open_for=open_for)
+
+    def openLog(self, open_for="a"):
+        """ Keep the log in memory"""
+        self.consoleLog = io.StringIO()
+
+    def child(self, pre, codefile=""):
+        """ Return a DiagnosticConsole() object sharing the diagnostics, for the messages of an imported code file (see Console.child())"""
+        return DiagnosticConsole(logdir=self.logdir, pre=pre, diagnostics=self.diagnostics, file=codefile)
+
+    def colorName(self, name):
+        """ Return the name without colours"""
+        return str(name)
+
+    def error(self, message="Unidentified error was caught", line="", exitCompiler=True):
+        """ Collect an error diagnostic and raise it as a CompileError() if the compiler must exit (see Console.error())"""
+        self._collect("error", message, line)
+        if exitCompiler: raise self.failure()
+
+    def warning(self, message="Unidentified warning was caught", line=""):
+        """ Collect a warning diagnostic (see Console.warning())"""
+        self._collect("warning", message, line)
+
+    def suggestion(self, message="Unidentified suggestion was caught", line=""):
+        """ Collect a suggestion diagnostic (see Console.suggestion())"""
+        self._collect("suggestion", message, line)
+
+    def invalidArg(self, message="Invalid Argument Given"):
+        """ Collect an error diagnostic and raise it as a CompileError() (see Console.invalidArg())"""
+        self._collect("error", message, "")
+        raise self.failure()
+
+    def unexpected(self, message):
+        """ Attach the invalid line of the code file to the last diagnostic (see Console.unexpected())"""
+        if self.diagnostics:
+            self.diagnostics[-1]["context"] = message
+
+    def stop(self):
+        """ Raise the last error diagnostic as a CompileError() (see Console.stop())"""
+        raise self.failure()
+
+    def failure(self):
+        """ Return a CompileError() object of the last error diagnostic (of every diagnostic collected if there is none)"""
+        errors = [diagnostic for diagnostic in self.diagnostics if diagnostic["severity"] == "error"]
+        if not errors:
+            return CompileError("Unidentified error was caught", self.file, diagnostics=self.diagnostics)
+        error = errors[-1]
+        return CompileError(error["message"], error["file"], error["line"], error["context"], self.diagnostics)
+
+    def _collect(self, severity, message, line):
+        self.diagnostics.append({"severity": severity, "message": message, "line": int(line) if str(line).isdigit() else None, "file": self.file, "context": ""})
+
+class CompileResult():
+    """
+    The result of a successful compilation in library mode (see compileFile()).
+
+    Instance Variables:
+      codefile -- string containing the filename of the compiled code file
+      data -- dict containing the compiled data (see compiler.compileCode())
+      diagnostics -- list containing every diagnostic of the compilation, imports included (see DiagnosticConsole())
+      warnings -- list containing the warning diagnostics
+      suggestions -- list containing the suggestion diagnostics
+    """
+
+    def __init__(self, codefile, data, diagnostics):
+        """
+        Initialise CompileResult object.
+
+        Arguments:
+          see Instance Variables
+        """
+        self.codefile = codefile
+        self.data = data
+        self.diagnostics = diagnostics
+        self.warnings = [diagnostic for diagnostic in diagnostics if diagnostic["severity"] == "warning"]
+        self.suggestions = [diagnostic for diagnostic in diagnostics if diagnostic["severity"] == "suggestion"]
+
+def compileFile(codefile, session=None, output="", pretty=False, importedArgs=None, export=False, text=None, stdout=None):
+    """
+    Compile a code file in library mode and return a CompileResult() object.
+
+    Arguments:
+      codefile -- string containing the filename of the code file to be compiled (IMPORTANT: with extension)
+      session -- (optional) Session() object shared by every compilation (see session.py). Defaults to a new Session() that does not export the json files of the imports
+      output -- (optional) pathlib.PosixPath object instance containing the output directory. Defaults to empty path (which makes the output directory the folder of the code file)
+      pretty -- (optional) boolean containing True if the json file will be exported using newlines, spacing and tabs, False otherwise. Defaults to False
+      importedArgs -- (optional) dict containing global arguments given to the code file (like the "with" of an import). Defaults to none
+      export -- (optional) boolean containing True if the json file will be exported, False otherwise. Defaults to False
+      text -- (optional) string compiled instead of the contents of codefile (see compiler.compileCode()). Defaults to None
+      stdout -- (optional) file object that anything the compilation prints is written to (e.g. the details of the parser for syntax errors, or the output of scripts). Defaults to None (it is discarded)
+
+    Exceptions:
+      CompileError for every error of the compiler, and for any unexpected exception (chained to it), see console.CompileError()
+
+    Note:
+      The file hashes of the session module cache are refreshed first, so code files changed since the last compilation are never served from the cache.
+    """
+    if session is None:
+        session = Session(loadLanguage, exportImports=False)
+    console = DiagnosticConsole(file=codefile)
+    if session.moduleCache:
+        session.moduleCache.refresh()
+    try:
+        with redirect_stdout(stdout or io.StringIO()):
+            data = compileCode(codefile, console, output=output, pretty=pretty, importedArgs=dict(importedArgs or {}), session=session, export=export, text=text)
+    except CompileError:
+        raise
+    except Exception as error:
+        console.error("Unexpected " + type(error).__name__ + ": " + str(error), exitCompiler=False)
+        raise console.failure() from error
+    finally:
+        del session.scripts[:] # the scripts of a code file that failed are never run
+    return CompileResult(codefile, data, console.diagnostics)
+
+def checkFiles(codefiles, session=None, output="", export=False, stdout=None):
+    """
+    Compile many code files in library mode, one after the other, and yield a turple of (codefile, CompileResult() or CompileError() object) for every one of them.
+
+    Arguments:
+      codefiles -- iterable containing the filenames of the code files (IMPORTANT: with extension)
+      see compileFile() for the rest of the arguments (a single session is used for every code file)
+
+    Note:
+      A code file that fails never stops the rest.
+    """
+    if session is None:
+        session = Session(loadLanguage, exportImports=False)
+    for codefile in codefiles:
+        try:
+            yield codefile, compileFile(codefile, session, output, export=export, stdout=stdout)
+        except CompileError as error:
+            yield codefile, error
+
+def compileString(text, name="main", args=None, importResolver=None, session=None, plain=False, stdout=None):
+    """
+    Compile BPMML code given as a string in library mode and return a CompileResult() object, without reading or writing any file.
+
+    Arguments:
+      text -- string containing the BPMML code
+      name -- (optional) string containing the name of the code (the title of the compiled data and the "file" of its processes), a path if its imports are resolved relative to a folder. Defaults to "main"
+      args -- (optional) dict containing global arguments given to the code (like the "with" of an import). Defaults to none
+      importResolver -- (optional) function of (imported name, importing code file) returning the contents of an imported code file, None if it does not exist (see compiler.importstep()),
+                        or a dict containing the contents of the code files that can be imported (key: name, with or without the ".bpmml" extension). Defaults to None (nothing can be imported)
+      session -- (optional) Session() object shared by every compilation (see session.py), its import resolver is replaced by the one given during the compilation. Defaults to a Session() without a module cache shared by every compileString() call
+      plain -- (optional) boolean containing True if the compiled data will be returned as plain dicts and lists (see roster.plainData()), e.g. for json.dumps(), False to keep the nodes. Defaults to False
+      stdout -- (optional) see compileFile()
+
+    Exceptions:
+      CompileError for every error of the compiler (see compileFile())
+
+    Notes:
+      Imports are compiled from the contents given by the resolver, so a compilation performs no file system I/O apart from what the resolver (or a BPMML SCRIPT command) does
+      (and loading the language, once for the default session).
+      The module cache of a given session also checks on disk the imports of a cached import that were not resolved during the compilation (they are recompiled if they are not there).
+    """
+    codefile = name if name.endswith(".bpmml") else name + ".bpmml"
+    if isinstance(importResolver, dict):
+        sources = importResolver
+        importResolver = lambda importedName, importer: sources.get(importedName, sources.get(PurePath(importedName).stem))
+    resolver = importResolver or (lambda importedName, importer: None)
+    global _session
+    if session is None:
+        if _session is None:
+            _session = Session(loadLanguage, exportImports=False, moduleCache=False)
+        session = _session
+    previous, session.importResolver = session.importResolver, resolver
+    try:
+        result = compileFile(codefile, session, importedArgs=args, text=text, stdout=stdout)
+    finally:
+        session.importResolver = previous
+    if plain:
+        plainData(result.data)
+    return result
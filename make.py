@@ -0,0 +1,135 @@
+"""
+Imports:
+  import os
+  import json
+  from pathlib import Path, PurePath
+  from console import Console, VERSION
+  from compiler import compileCode, loadLanguage, outputPath, CACHE_PATH
+  from session import Session
+  from cache import ModuleCache
+
+Global Variables:
+  MANIFEST_NAME -- string containing the filename of the make manifest (stored in the output folder)
+
+Functions:
+  makeCode(codefile, console=Console(), output='', pretty=False, session=None)
+
+Classes:
+  Manifest() -- remember what every code file was compiled from, so that up-to-date code files are not recompiled
+"""
+import os
+import json
+from pathlib import Path, PurePath
+from console import Console, VERSION
+from compiler import compileCode, loadLanguage, outputPath, CACHE_PATH
+from session import Session
+from cache import ModuleCache
+
+MANIFEST_NAME = ".bpmml-make.json"
+
+class Manifest():
+    """
+    Remember what every code file was compiled from, so that up-to-date code files are not recompiled.
+
+    Description:
+      For every compiled code file the manifest keeps the hashes of the code file and of all of its imports (transitively), the imports of every code file (the import graph), the exported json file and the options it was compiled with.
+      A code file is up to date if none of those hashes changed, the options are the same and the json file still exists.
+
+    Instance Variables:
+      path -- string containing the path of the manifest file
+      files -- dict containing the entries of the manifest (key: absolute path of the code file)
+      imports -- dict containing the import graph (key: absolute path of the importing code file, value: list of the absolute paths of the code files it imports)
+
+    Public Methods:
+      __init__(self, path)
+      record(self, codefile, jsonFile, options, compileRecord, imports)
+      save(self)
+      upToDate(self, codefile, jsonFile, options, fileHash)
+    """
+
+    def __init__(self, path):
+        """
+        Initialise Manifest object by loading the manifest file (a missing, invalid or outdated manifest is ignored).
+
+        Arguments:
+          path -- string containing the path of the manifest file
+        """
+        self.path = path
+        self.files = {}
+        self.imports = {}
+        try:
+            manifest = json.load(open(path))
+            if manifest["version"] == VERSION:
+                self.files = manifest["files"]
+                self.imports = manifest["imports"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def upToDate(self, codefile, jsonFile, options, fileHash):
+        """
+        Check if a code file does not need to be recompiled and return True/False depending on the result.
+
+        Arguments:
+          codefile -- string containing the filename of the code file (IMPORTANT: with extension)
+          jsonFile -- string containing the path of the json file the code file is exported to
+          options -- string describing the compiler options that change the exported json file
+          fileHash -- function returning the hash of the contents of a file (see cache.ModuleCache.fileHash())
+        """
+        entry = self.files.get(str(Path(codefile).resolve()))
+        if not entry or entry["options"] != options or entry["json"] != str(Path(jsonFile).resolve()) or not Path(jsonFile).is_file():
+            return False
+        return all(fileHash(path) == recordedHash for path, recordedHash in entry["dependencies"].items())
+
+    def record(self, codefile, jsonFile, options, compileRecord, imports):
+        """
+        Record the compilation of a code file.
+
+        Arguments:
+          see upToDate() for codefile, jsonFile and options
+          compileRecord -- dict returned by cache.ModuleCache.end() after compiling the code file
+          imports -- dict containing the imports discovered while compiling (see check_import.ImportGraph.imports)
+
+        Note:
+          Code files that run BPMML SCRIPT commands are forgotten instead, so they are always recompiled.
+        """
+        path = str(Path(codefile).resolve())
+        self.imports.update((parent, list(children)) for parent, children in imports.items())
+        if not compileRecord["cacheable"]:
+            self.files.pop(path, None)
+            return
+        self.files[path] = {"options": options, "json": str(Path(jsonFile).resolve()), "dependencies": compileRecord["dependencies"]}
+
+    def save(self):
+        """ Save the manifest file (through a temporary file, so that an interrupted save never leaves a broken manifest)"""
+        with open(self.path + ".tmp", "w") as manifestFile:
+            json.dump({"version": VERSION, "files": self.files, "imports": self.imports}, manifestFile, indent=4)
+        os.replace(self.path + ".tmp", self.path)
+
+def makeCode(codefile, console=Console(), output="", pretty=False, session=None):
+    """
+    Compile a .bpmml code file only if it (or any of its imports, transitively) changed since it was last compiled, and return True if it was compiled, False if it was up to date.
+
+    Arguments:
+      see compiler.compileCode()
+
+    Notes:
+      The manifest is stored in the output folder (or the folder of the code file) as MANIFEST_NAME.
+      Imports are compiled through the on-disk module cache (see cache.ModuleCache()), meaning only the imports that changed are recompiled. If the session has no on-disk module cache, one is created in CACHE_PATH.
+    """
+    if session is None:
+        session = Session(loadLanguage)
+    if session.moduleCache is None or not session.moduleCache.cacheDir:
+        session.moduleCache = ModuleCache(CACHE_PATH + "/modules")
+    jsonFile = outputPath(codefile, output, session.binary)
+    manifest = Manifest(str(Path(PurePath(jsonFile).parent) / MANIFEST_NAME))
+    options = "pretty=%s,importJSON=%s,references=%s,lazy=%s:%s,positions=%s,compact=%s,binary=%s" % (pretty, session.exportImports, session.references, session.lazy, ",".join(session.processes), session.positions, session.compact and not pretty, session.binary)
+    if manifest.upToDate(codefile, jsonFile, options, session.moduleCache.fileHash):
+        return False
+    session.moduleCache.begin(codefile)
+    try:
+        compileCode(codefile, console, output=output, pretty=pretty, importedArgs={}, session=session)
+    finally:
+        compileRecord = session.moduleCache.end()
+    manifest.record(codefile, jsonFile, options, compileRecord, session.importGraph.imports)
+    manifest.save()
+    return True
@@ -0,0 +1,194 @@
+"""
+Usage:
+  The compact representation of the compiled data: every step of a process is a node object instead of a dict.
+
+Nodes:
+  ReduceTree() (see transformer.py) reduces every command, parallel, condition, change of users, process and user to a node. Nodes only store their fields (__slots__),
+  so they take a fraction of the memory of the dicts they replace, and their type is their class, so checking the type of a step needs no probing of keys.
+  Nodes are converted to the json schema of BPMML only when the data is exported (see toData() and roster.jsonDefault()), so the json output is unchanged.
+  Every node also behaves like the (read and write) dict of its json form: node["commands"], node.get("file"), "line" in node, node.items() etc.
+  That dict layer is for code outside the compiler: the compiler itself (and the traversal of Toolset(), see toolset.py) reads the attributes of a node directly, and finds its nested steps through STEPS.
+  Compiled data can still contain plain dicts (e.g. an imported code file whose data was edited by a BPMML SCRIPT, see roster.plainData()), so code handling steps must accept both,
+  nodeType() and copyStep() do.
+
+Functions:
+  copyStep(step, **changes)
+  nodeType(step)
+
+Classes:
+  Node() -- the base class of every node
+  CommandNode(Node) -- "singleCommand" step
+  ParallelNode(Node) -- "parallelSteps" step
+  ConditionNode(Node) -- "conditionSteps" step
+  ChangeUsersNode(Node) -- "changeUsers" step
+  ProcessNode(Node) -- "process" step (and global process)
+  UserNode(Node) -- user of a process
+"""
+
+class Node():
+    """
+    The base class of every node.
+
+    Description:
+      TYPE is the "type" of the json form (empty for nodes without one) and FIELDS the (json key, attribute) pairs of the rest of the json form, in order
+      (ATTRIBUTES is the same as a dict, it is set for every subclass). STEPS are the attributes containing lists of nested steps, in order.
+      A field that is None is not part of the json form (like a key that was never set, or was popped, in the dict the node replaces).
+
+    Public Methods:
+      copy(self, **changes)
+      get(self, key, default=None)
+      items(self)
+      keys(self)
+      toData(self)
+    """
+    __slots__ = ()
+    TYPE = ""
+    FIELDS = ()
+    ATTRIBUTES = {}
+    STEPS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.ATTRIBUTES = dict(cls.FIELDS)
+
+    def toData(self):
+        """ Return the json form of the node (a new dict, the values are not converted)"""
+        data = {"type": self.TYPE} if self.TYPE else {}
+        for key, attribute in self.FIELDS:
+            value = getattr(self, attribute)
+            if value is not None:
+                data[key] = value
+        return data
+
+    def copy(self, **changes):
+        """ Return a shallow copy of the node, with the fields given (by json key) changed"""
+        node = object.__new__(type(self))
+        for key, attribute in self.FIELDS:
+            setattr(node, attribute, changes[key] if key in changes else getattr(self, attribute))
+        return node
+
+    def keys(self):
+        return self.toData().keys()
+
+    def items(self):
+        return self.toData().items()
+
+    def get(self, key, default=None):
+        attribute = self.ATTRIBUTES.get(key)
+        if attribute is not None:
+            value = getattr(self, attribute)
+            return default if value is None else value
+        return self.TYPE if key == "type" and self.TYPE else default
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self.ATTRIBUTES:
+            raise KeyError(key)
+        setattr(self, self.ATTRIBUTES[key], value)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.toData())
+
+    def __eq__(self, other):
+        if isinstance(other, (Node, dict)):
+            return self.toData() == (other.toData() if isinstance(other, Node) else other)
+        return NotImplemented
+
+    __hash__ = None #equal nodes are not the same node, like dicts
+
+    def __repr__(self):
+        return type(self).__name__ + "(" + repr(self.toData()) + ")"
+
+class CommandNode(Node):
+    """ "singleCommand" step: line (integer), commands (string containing the command and its arguments)"""
+    __slots__ = ("line", "commands")
+    TYPE = "singleCommand"
+    FIELDS = (("line", "line"), ("commands", "commands"))
+
+    def __init__(self, line, commands):
+        self.line = line
+        self.commands = commands
+
+class ParallelNode(Node):
+    """ "parallelSteps" step: line (integer), commands (list of steps)"""
+    __slots__ = ("line", "commands")
+    TYPE = "parallelSteps"
+    FIELDS = (("line", "line"), ("commands", "commands"))
+    STEPS = ("commands",)
+
+    def __init__(self, line, commands):
+        self.line = line
+        self.commands = commands
+
+class ConditionNode(Node):
+    """ "conditionSteps" step: line (integer), condition (string), tryCommands ("try", list of steps), yes and no (lists of steps, that may end with "retry" or "abort")"""
+    __slots__ = ("line", "condition", "tryCommands", "yes", "no")
+    TYPE = "conditionSteps"
+    FIELDS = (("line", "line"), ("condition", "condition"), ("try", "tryCommands"), ("yes", "yes"), ("no", "no"))
+    STEPS = ("tryCommands", "yes", "no")
+
+    def __init__(self, line, condition, tryCommands, yes, no):
+        self.line = line
+        self.condition = condition
+        self.tryCommands = tryCommands
+        self.yes = yes
+        self.no = no
+
+class ChangeUsersNode(Node):
+    """ "changeUsers" step: line (integer, None for the changes added at the end of invisible processes), add and remove (lists of users), currentUsers (users after the change, None until the process is reduced)"""
+    __slots__ = ("line", "add", "remove", "currentUsers")
+    TYPE = "changeUsers"
+    FIELDS = (("line", "line"), ("add", "add"), ("remove", "remove"), ("currentUsers", "currentUsers"))
+
+    def __init__(self, line, add, remove, currentUsers=None):
+        self.line = line
+        self.add = add
+        self.remove = remove
+        self.currentUsers = currentUsers
+
+class ProcessNode(Node):
+    """ "process" step: file, name and visible ("True"/"False") strings, line (integer), users (list), commands (list of steps), reduced ("False" for processes that were not reduced, see lazy.py, None otherwise)"""
+    __slots__ = ("file", "line", "name", "visible", "users", "commands", "reduced")
+    TYPE = "process"
+    FIELDS = (("file", "file"), ("line", "line"), ("name", "name"), ("visible", "visible"), ("users", "users"), ("commands", "commands"), ("reduced", "reduced"))
+    STEPS = ("commands",)
+
+    def __init__(self, file, line, name, visible, users, commands, reduced=None):
+        self.file = file
+        self.line = line
+        self.name = name
+        self.visible = visible
+        self.users = users
+        self.commands = commands
+        self.reduced = reduced
+
+class UserNode(Node):
+    """ User of a process (no "type"): div, dep, pos and name strings, line (integer, None once the user is part of a process)"""
+    __slots__ = ("div", "dep", "pos", "name", "line")
+    FIELDS = (("div", "div"), ("dep", "dep"), ("pos", "pos"), ("name", "name"), ("line", "line"))
+
+    def __init__(self, div, dep, pos, name, line=None):
+        self.div = div
+        self.dep = dep
+        self.pos = pos
+        self.name = name
+        self.line = line
+
+def nodeType(step):
+    """ Return the "type" of a step, which is either a node or a dict"""
+    return step.TYPE if isinstance(step, Node) else step["type"]
+
+def copyStep(step, **changes):
+    """ Return a shallow copy of a step (a node or a dict) with the fields given changed"""
+    return step.copy(**changes) if isinstance(step, Node) else dict(step, **changes)
@@ -0,0 +1,278 @@
+"""
+Usage:
+  Reduce the independent global processes of a code file in parallel, with a pool of worker processes (see compiler.treeReduction()).
+
+Parallel Reduction:
+  Global processes only depend on each other through "call", and a process can only call the processes defined above it. So the processes are reduced in waves:
+  a wave contains every process whose callees are already reduced, and the processes of a wave are reduced by the workers at the same time.
+  Compiled data shares the nodes of called (and imported) processes instead of copying them. Those shared objects are never copied back and forth: they are pickled
+  as references (see _SharedObjects()), so the data merged into the readyProcessDict is shared exactly like the data of the serial reduction.
+  Messages of the workers are recorded (see RecordingConsole()) and printed in the order the processes are defined. A process that fails in a worker (an error, or any exception)
+  is reduced again by the importing process after every process defined above it, so errors, including "defined bellow the call", are the same as the serial reduction ones.
+
+Imports:
+  import gc
+  import io
+  import re
+  import sys
+  import pickle
+  from concurrent.futures import ProcessPoolExecutor, BrokenExecutor
+  from transformer import ReduceTree
+  from references import _postOrder
+  from lazy import processCalls
+
+Global Variables:
+  MIN_PARALLEL_PROCESSES -- integer containing the smallest number of processes that is worth starting a pool of workers for
+  _worker -- dict containing the state of the current worker process (see _initWorker())
+
+Functions:
+  callDependencies(processDict, names)
+  parallelReduction(processDict, names, fileName, globalArgs, importedProcessDict, importedMainDict, console, jobs)
+
+Classes:
+  RecordingConsole() -- Console() compatible object that records the messages instead of printing them
+"""
+import gc
+import io
+import re
+import sys
+import pickle
+from concurrent.futures import ProcessPoolExecutor, BrokenExecutor
+from transformer import ReduceTree
+from references import _postOrder
+from lazy import processCalls
+
+MIN_PARALLEL_PROCESSES = 16
+_NAME = re.compile("\x1e(.*?)\x1f", re.S)
+_worker = {}
+
+class RecordingConsole():
+    """
+    Console() compatible object that records the messages instead of printing them (see replay()).
+
+    Description:
+      Names coloured by colorName() are only marked, so that the console that replays the messages colours them its own way.
+      An error stops the reduction (SystemExit) like Console.error() does.
+
+    Instance Variables:
+      messages -- list containing the recorded messages as turples of (kind, message, line)
+
+    Public Methods:
+      __init__(self)
+      colorName(self, name)
+      error(self, message='Unidentified error was caught', line='', exitCompiler=True)
+      replay(self, console, messages=None)
+      stop(self)
+      suggestion(self, message='Unidentified suggestion was caught', line='')
+      warning(self, message='Unidentified warning was caught', line='')
+    """
+
+    def __init__(self):
+        """ Initialise RecordingConsole object"""
+        self.messages = []
+
+    def colorName(self, name):
+        """ Mark a name to be coloured by the console that replays the message"""
+        return "\x1e" + str(name) + "\x1f"
+
+    def error(self, message="Unidentified error was caught", line="", exitCompiler=True):
+        """ Record an error message (see Console.error())"""
+        self.messages.append(("error", message, line))
+        if exitCompiler: sys.exit()
+
+    def stop(self):
+        """ Stop the reduction after an error recorded without exiting (see Console.stop())"""
+        sys.exit()
+
+    def warning(self, message="Unidentified warning was caught", line=""):
+        """ Record a warning message (see Console.warning())"""
+        self.messages.append(("warning", message, line))
+
+    def suggestion(self, message="Unidentified suggestion was caught", line=""):
+        """ Record a suggestion message (see Console.suggestion())"""
+        self.messages.append(("suggestion", message, line))
+
+    def replay(self, console, messages=None):
+        """ Print the recorded messages (or the given ones) with a console (see console.Console())"""
+        for kind, message, line in self.messages if messages is None else messages:
+            getattr(console, kind)(_NAME.sub(lambda match: console.colorName(match.group(1)), message), line=line)
+
+class _SharedObjects():
+    """ Pickle the objects of shared (called and imported) processes as references. roots is a function returning the shared process of a key"""
+
+    def __init__(self, roots, base=None):
+        self.roots = roots
+        self.base = base
+        self.ids = {}
+        self._orders = {}
+
+    def add(self, key):
+        """ Pickle every node, dict and list of a shared process as a reference (key, position in the post-order walk)"""
+        for index, node in enumerate(self.order(key)):
+            self.ids.setdefault(id(node), key + (index,))
+
+    def order(self, key):
+        if key not in self._orders:
+            self._orders[key] = _postOrder(self.roots(key))
+        return self._orders[key]
+
+    def dumps(self, data):
+        stream = io.BytesIO()
+        pickler = pickle.Pickler(stream, protocol=pickle.HIGHEST_PROTOCOL)
+        ids, base = self.ids, self.base.ids if self.base else {}
+        pickler.persistent_id = lambda obj: ids.get(id(obj)) or base.get(id(obj))
+        pickler.dump(data)
+        return stream.getvalue()
+
+    def loads(self, data):
+        unpickler = pickle.Unpickler(io.BytesIO(data))
+        unpickler.persistent_load = lambda pid: self.order(pid[:-1])[pid[-1]]
+        return unpickler.load()
+
+def _importRoots(importedProcessDict, importedMainDict):
+    """ Return a function returning the imported process of a key and a list of every key"""
+    def roots(key):
+        return importedProcessDict[key[1]][key[2]] if key[0] == "i" else importedMainDict[key[1]]
+    keys = [("i", alias, name) for alias, processes in importedProcessDict.items() for name in processes]
+    keys += [("m", alias) for alias, main in importedMainDict.items() if main]
+    return roots, keys
+
+def _initWorker(processDict, fileName, globalArgs, importedProcessDict, importedMainDict):
+    """ Prepare a worker process with the state shared by every task of a code file"""
+    roots, keys = _importRoots(importedProcessDict, importedMainDict)
+    imports = _SharedObjects(roots)
+    for key in keys:
+        imports.add(key)
+    _worker.update(processDict=processDict, fileName=fileName, globalArgs=globalArgs, importedProcessDict=importedProcessDict, importedMainDict=importedMainDict, imports=imports)
+
+def _reduceTask(names, callees):
+    """ Reduce some processes in a worker and return a turple of (list of (name, reduced, messages), pickled dict of the reduced processes)"""
+    imports = _worker["imports"]
+    callees = imports.loads(callees)
+    shared = _SharedObjects(lambda key: callees[key[1]], imports)
+    for name in callees:
+        shared.add(("p", name))
+    outcomes = []
+    reducedProcesses = {}
+    for name in names:
+        console = RecordingConsole()
+        try:
+            reducedProcesses[name] = ReduceTree(_worker["fileName"], _worker["globalArgs"], callees, _worker["importedProcessDict"], _worker["importedMainDict"], console).transform(_worker["processDict"][name])
+            outcomes.append((name, True, console.messages))
+        except (SystemExit, Exception):
+            outcomes.append((name, False, []))
+    return outcomes, shared.dumps(reducedProcesses)
+
+def callDependencies(processDict, names):
+    """
+    Return the call dependencies between global processes.
+
+    Arguments:
+      processDict -- dict containing the global process trees of the code file (see compiler.handleRootChildren())
+      names -- list containing the names of the processes to be reduced, in the order they are defined
+
+    Return:
+      dict containing the names of the processes every process calls (key: name, value: list of names). Only the processes of names defined above the caller are dependencies,
+      a call of any other process fails (or calls an import) the same way whenever it is reduced
+    """
+    position = {name: index for index, name in enumerate(names)}
+    dependencies = {}
+    for name in names:
+        callees = []
+        for target, parent in processCalls(processDict[name]):
+            target = str(target)
+            if parent is None and position.get(target, len(names)) < position[name] and target not in callees:
+                callees.append(target)
+        dependencies[name] = callees
+    return dependencies
+
+def parallelReduction(processDict, names, fileName, globalArgs, importedProcessDict, importedMainDict, console, jobs):
+    """
+    Reduce global processes with a pool of worker processes and return the reduced processes.
+
+    Arguments:
+      processDict -- dict containing the global process trees of the code file (see compiler.handleRootChildren())
+      names -- list containing the names of the processes to be reduced, in the order they are defined
+      jobs -- integer containing the number of worker processes
+      see compiler.treeReduction() for the rest of the arguments
+
+    Return:
+      dict containing the reduced processes (key: name), in the order they are defined
+
+    Notes:
+      see the module docstring. Waves with fewer processes than workers are reduced by the importing process itself.
+      If the pool of workers cannot be started (e.g. within a worker of a batch on some platforms) every process is reduced by the importing process.
+    """
+    dependencies = callDependencies(processDict, names)
+    position = {name: index for index, name in enumerate(names)}
+    readyProcessDict = {}
+    messages = {}
+    pending = list(names)
+    failed = len(names)
+    printed = 0
+    roots, keys = _importRoots(importedProcessDict, importedMainDict)
+    imports = _SharedObjects(roots)
+    for key in keys:
+        imports.add(key)
+    results = _SharedObjects(lambda key: readyProcessDict[key[1]] if key[0] == "p" else roots(key))
+    try:
+        pool = ProcessPoolExecutor(jobs, initializer=_initWorker, initargs=(processDict, fileName, globalArgs, importedProcessDict, importedMainDict))
+    except (OSError, AssertionError, ValueError):
+        pool = None
+    try:
+        while pending and pool:
+            wave = [name for name in pending if position[name] < failed and all(callee in readyProcessDict for callee in dependencies[name])]
+            if not wave:
+                break
+            pending = [name for name in pending if name not in wave]
+            outcomes = []
+            if len(wave) < jobs:
+                # every process is only given its callees (like in the workers), so processes defined bellow it are never callable
+                for name in wave:
+                    recorder = RecordingConsole()
+                    callees = {callee: readyProcessDict[callee] for callee in dependencies[name]}
+                    try:
+                        readyProcessDict[name] = ReduceTree(fileName, globalArgs, callees, importedProcessDict, importedMainDict, recorder).transform(processDict[name])
+                        outcomes.append((name, True, recorder.messages))
+                    except (SystemExit, Exception):
+                        outcomes.append((name, False, []))
+            else:
+                size = -(-len(wave) // (jobs * 4))
+                collect = gc.isenabled()
+                try:
+                    callees = imports.dumps({callee: readyProcessDict[callee] for name in wave for callee in dependencies[name]}) #pickled once for every task of the wave
+                    tasks = [pool.submit(_reduceTask, wave[start:start + size], callees) for start in range(0, len(wave), size)]
+                    gc.disable() #the merged data has no reference cycles, collecting while millions of objects are unpickled only costs time
+                    for task in tasks:
+                        taskOutcomes, reducedProcesses = task.result()
+                        readyProcessDict.update(results.loads(reducedProcesses))
+                        outcomes += taskOutcomes
+                except (BrokenExecutor, OSError, RecursionError):
+                    # the workers could not be started (or died), or the processes are nested too deeply to be pickled: the rest is reduced here
+                    for name in wave:
+                        readyProcessDict.pop(name, None)
+                    pool.shutdown()
+                    pool = None
+                    break
+                finally:
+                    if collect: gc.enable()
+            for name, reduced, recorded in outcomes:
+                if reduced:
+                    messages[name] = recorded
+                else:
+                    failed = min(failed, position[name])
+            # the messages are printed in the order the processes are defined, as soon as every process above is reduced
+            while printed < failed and names[printed] in messages:
+                RecordingConsole().replay(console, messages.pop(names[printed]))
+                printed += 1
+    finally:
+        if pool: pool.shutdown()
+    # whatever is left (the process that failed and the ones bellow it) is reduced here in order, printing its messages (and errors) directly
+    above = {name: readyProcessDict[name] for name in names[:printed]}
+    for name in names[printed:]:
+        if name in messages:
+            RecordingConsole().replay(console, messages.pop(name))
+        else:
+            readyProcessDict[name] = ReduceTree(fileName, globalArgs, above, importedProcessDict, importedMainDict, console).transform(processDict[name])
+        above[name] = readyProcessDict[name]
+    return {name: readyProcessDict[name] for name in names}
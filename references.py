@@ -0,0 +1,124 @@
+"""
+Usage:
+  Convert compiled data to (and from) the reference-based output, where shared processes are emitted once.
+
+Reference-Based Output:
+  Every process that is used more than once (e.g. a process called from many places, or a global process that is also called) is moved to the "processTable" of the data,
+  keyed as "<file>:<name>" (a "#<n>" suffix tells apart different processes with the same key). Everywhere it was used there is a reference instead:
+      {"type": "processRef", "name": <name of the process>, "ref": <key in the processTable>}
+  Processes used once stay inlined. Entries of the processTable may reference other entries. expandReferences() gives back the inlined data, which is exported exactly like the normal output.
+
+Imports:
+  from nodes import Node, ProcessNode
+
+Functions:
+  expandReferences(data)
+  referenceData(data)
+"""
+from nodes import Node, ProcessNode
+
+_CONTAINERS = (dict, list, Node)
+
+def _children(node):
+    """ Return the (key, value) pairs of a dict, a node (its json form, see nodes.py) or a list"""
+    return enumerate(node) if isinstance(node, list) else node.items()
+
+def _isProcess(node):
+    return isinstance(node, ProcessNode) or (isinstance(node, dict) and node.get("type") == "process")
+
+def _postOrder(root, resolve=None):
+    """ Return every dict, node and list reachable from root once, children before parents (iteratively). resolve is applied to every child before walking it"""
+    order = []
+    entered = set()
+    stack = [(root, False)]
+    while stack:
+        node, finished = stack.pop()
+        if finished:
+            order.append(node)
+            continue
+        if id(node) in entered:
+            continue
+        entered.add(id(node))
+        stack.append((node, True))
+        for _, child in reversed(list(_children(node))):
+            if resolve: child = resolve(child)
+            if isinstance(child, _CONTAINERS) and id(child) not in entered:
+                stack.append((child, False))
+    return order
+
+def referenceData(data):
+    """
+    Return the reference-based form of compiled data (see the module docstring). The data is not changed.
+
+    Arguments:
+      data -- dict containing the compiled data of a code file (see compiler.compileCode())
+
+    Return:
+      dict containing the data with shared processes replaced by references, plus the "processTable" (only if there are shared processes)
+
+    Note:
+      Compiled data shares the nodes of called processes instead of copying them, so the data is walked as a graph: every node, dict and list is visited once,
+      no matter how many times it is used. The walk is iterative, so deeply nested processes do not hit the recursion limit.
+      The nodes are converted to their json form (see nodes.py), meaning the reference-based data is plain json data.
+    """
+    order = _postOrder(data)
+    # count how many times every process is used and give the shared ones a key (called processes come before their callers)
+    uses = {}
+    for node in order:
+        for _, child in _children(node):
+            if _isProcess(child):
+                uses[id(child)] = uses.get(id(child), 0) + 1
+    keys = {}
+    taken = set()
+    for node in order:
+        if uses.get(id(node), 0) > 1:
+            key = base = str(node.get("file", "")) + ":" + str(node["name"])
+            counter = 1
+            while key in taken:
+                counter += 1
+                key = base + "#" + str(counter)
+            taken.add(key)
+            keys[id(node)] = key
+    # copy every container once, children first, replacing the shared processes with references
+    copies = {}
+    for node in order:
+        copy = [None] * len(node) if isinstance(node, list) else {}
+        for name, child in _children(node):
+            if id(child) in keys:
+                copy[name] = {"type": "processRef", "name": child["name"], "ref": keys[id(child)]}
+            elif isinstance(child, _CONTAINERS):
+                copy[name] = copies[id(child)]
+            else:
+                copy[name] = child
+        copies[id(node)] = copy
+    referenced = copies[id(data)]
+    if keys:
+        referenced["processTable"] = {key: copies[nodeId] for nodeId, key in keys.items()}
+    return referenced
+
+def expandReferences(data):
+    """
+    Return the inlined form of reference-based data (see the module docstring), which is the same as the normal compiled data. The data is not changed.
+
+    Arguments:
+      data -- dict containing reference-based data (see referenceData()), plain data is returned as it is
+
+    Exceptions:
+      KeyError for a reference that is not in the processTable
+
+    Note:
+      Every entry of the processTable is expanded once and shared by all of its references, so the expanded data is as small in memory as the reference-based one.
+    """
+    if "processTable" not in data:
+        return data
+    table = data["processTable"]
+    root = {name: value for name, value in data.items() if name != "processTable"}
+    resolve = lambda node: table[node["ref"]] if isinstance(node, dict) and node.get("type") == "processRef" else node
+    copies = {}
+    for node in _postOrder(root, resolve):
+        copy = {} if isinstance(node, dict) else [None] * len(node)
+        for name, child in _children(node):
+            child = resolve(child)
+            copy[name] = copies[id(child)] if isinstance(child, (dict, list)) else child
+        copies[id(node)] = copy
+    return copies[id(root)]
@@ -0,0 +1,194 @@
+"""
+Imports:
+  from nodes import Node
+
+Functions:
+  jsonDefault(obj) -- convert the objects of this module (and the nodes) while converting data to json (the default argument of json.dump())
+  plainData(data) -- replace every UserSnapshot() and node of the compiled data with a plain list or dict, in-place
+  userKey(user) -- return the hashable key of a user
+
+Classes:
+  UserRoster() -- keep the current users of a process with hashed membership
+  UserSnapshot() -- the users of a process at a point of its execution, stored as the changes since a shared base
+"""
+from nodes import Node
+
+def userKey(user):
+    """ Return the hashable key of a user (nodes.UserNode()), users are equal if their division, department, position and name are equal"""
+    return (user.div, user.dep, user.pos, user.name)
+
+class UserSnapshot():
+    """
+    The users of a process at a point of its execution ("currentUsers"), stored as the changes since a shared base.
+
+    Description:
+      Snapshots of the same process share their base (a tuple of users), so a snapshot only costs the users added and removed since that base.
+      A snapshot is never changed after it is taken. It is converted to a plain list while exporting (see jsonDefault()), so the json output is the same as a list of the users.
+
+    Instance Variables:
+      base -- turple containing the users of the base (in order)
+      added -- turple containing the users added after the base (in order)
+      removed -- dict containing the number of removed occurrences of every base user (key: user key, see userKey())
+
+    Public Methods:
+      __init__(self, base, added=(), removed={})
+      toList(self)
+    """
+    __slots__ = ("base", "added", "removed")
+
+    def __init__(self, base, added=(), removed={}):
+        """ Initialise UserSnapshot object (see Instance Variables)"""
+        self.base = base
+        self.added = added
+        self.removed = removed
+
+    def toList(self):
+        """ Return a new list containing the users of the snapshot (the base users that were not removed, followed by the added users)"""
+        if not self.removed:
+            return list(self.base) + list(self.added)
+        skip = dict(self.removed)
+        users = []
+        for user in self.base:
+            key = userKey(user)
+            if skip.get(key):
+                skip[key] -= 1 #like list.remove(), the first occurrences are the removed ones
+            else:
+                users.append(user)
+        return users + list(self.added)
+
+    def __iter__(self):
+        return iter(self.toList())
+
+    def __len__(self):
+        return len(self.base) + len(self.added) - sum(self.removed.values())
+
+    def __eq__(self, other):
+        if isinstance(other, (UserSnapshot, list, tuple)):
+            return self.toList() == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return "UserSnapshot(" + repr(self.toList()) + ")"
+
+class UserRoster():
+    """
+    Keep the current users of a process with hashed membership (see transformer.ReduceTree.process()).
+
+    Description:
+      The roster behaves like the list of users it replaces: users are appended when added, the first occurrence is removed when removed and the order is kept.
+      Membership is checked through a dict counting the occurrences of every user key, instead of comparing the users one by one.
+      The roster is stored as a base turple plus the changes since the base, so taking a snapshot costs only those changes (see UserSnapshot()).
+      When the changes outgrow the square root of the base, a new base is created. A snapshot then costs at most about sqrt(n) users instead of n, and the O(n) rebuild of the base is spread over sqrt(n) changes.
+
+    Public Methods:
+      __init__(self, users=())
+      add(self, user)
+      remove(self, user)
+      snapshot(self)
+    """
+
+    def __init__(self, users=()):
+        """
+        Initialise UserRoster object.
+
+        Arguments:
+          users -- (optional) iterable containing the initial users (nodes.UserNode() objects) of the process. Defaults to no users
+        """
+        self._base = tuple(users)
+        self._counts = {}
+        for user in self._base:
+            key = userKey(user)
+            self._counts[key] = self._counts.get(key, 0) + 1
+        self._added = {}
+        self._removed = {}
+        self._changes = 0
+        self._snapshot = None
+
+    def __contains__(self, user):
+        return userKey(user) in self._counts
+
+    def __len__(self):
+        return sum(self._counts.values())
+
+    def add(self, user):
+        """ Add a user at the end of the roster and return True, unless the user is already in the roster (return False)"""
+        key = userKey(user)
+        if key in self._counts:
+            return False
+        self._counts[key] = 1
+        self._added[key] = user
+        self._changed()
+        return True
+
+    def remove(self, user):
+        """ Remove the first occurrence of a user from the roster and return True, unless the user is not in the roster (return False)"""
+        key = userKey(user)
+        count = self._counts.get(key)
+        if not count:
+            return False
+        if count == 1:
+            del self._counts[key]
+        else:
+            self._counts[key] = count - 1
+        if key in self._added:
+            del self._added[key]
+        else:
+            self._removed[key] = self._removed.get(key, 0) + 1
+        self._changed()
+        return True
+
+    def snapshot(self):
+        """ Return a UserSnapshot() of the current users (consecutive snapshots without changes in between are the same object)"""
+        if self._snapshot is None:
+            self._snapshot = UserSnapshot(self._base, tuple(self._added.values()), dict(self._removed))
+        return self._snapshot
+
+    def _changed(self):
+        self._snapshot = None
+        self._changes += 1
+        if self._changes > int(len(self._base) ** 0.5) + 8:
+            self._base = tuple(UserSnapshot(self._base, tuple(self._added.values()), self._removed).toList())
+            self._added = {}
+            self._removed = {}
+            self._changes = 0
+
+def jsonDefault(obj):
+    """
+    Convert the objects of this module and the nodes (see nodes.py) while converting data to json (give it as the default argument of json.dump()/json.dumps()).
+
+    Exceptions:
+      TypeError for any other object (which is what json does without a default argument)
+    """
+    if isinstance(obj, Node):
+        return obj.toData()
+    if isinstance(obj, UserSnapshot):
+        return obj.toList()
+    raise TypeError("Object of type " + type(obj).__name__ + " is not JSON serializable")
+
+def plainData(data):
+    """
+    Replace every UserSnapshot() and node (see nodes.py) of the compiled data with a plain list or dict, in-place, and return the data (use it before editing the data, e.g. with toolset.Toolset()).
+
+    Arguments:
+      data -- dict or list containing compiled data (see compiler.compileCode())
+
+    Note:
+      The data is walked iteratively, so deeply nested processes do not hit the recursion limit. Shared (called) processes are only walked and converted once, so they stay shared.
+    """
+    stack = [data]
+    seen = set()
+    converted = {} #id of the converted object: (the object, so that its id is never reused, its plain form)
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        items = node.items() if isinstance(node, dict) else enumerate(node)
+        for key, value in items:
+            if isinstance(value, (Node, UserSnapshot)):
+                if id(value) not in converted:
+                    converted[id(value)] = (value, value.toData() if isinstance(value, Node) else value.toList())
+                value = node[key] = converted[id(value)][1]
+            if isinstance(value, (dict, list)):
+                stack.append(value)
+    return data
@@ -0,0 +1,158 @@
+"""
+Usage:
+  Run a local compile server for editor integration (see launcher.py --server).
+
+Protocol:
+  JSON-RPC 2.0 over stdin/stdout, one request (and one response) per line.
+  Methods:
+      compile -- params: {"file": codefile, "text": (optional) contents to compile instead of the file, "args": (optional) global arguments, "data": (optional) False to omit the compiled data, "references": (optional) True for the reference-based data (see references.py), "export": (optional) True to export the json file}
+                 result: {"success": boolean, "diagnostics": list of {"severity", "message", "line", "file", "context"}, "data": the compiled data or None, "time": milliseconds}
+      stats -- result: {"requests": integer, "mean", "p50", "p95", "max": milliseconds, "moduleCache": string}
+      shutdown -- result: None, then the server stops (end of input does the same)
+
+Imports:
+  import sys
+  import json
+  import time
+  from console import CompileError
+  from compiler import loadLanguage
+  from session import Session
+  from library import compileFile
+  from references import referenceData
+  from jsonio import writeJSON
+
+Functions:
+  serve(options, instream=sys.stdin, outstream=sys.stdout)
+
+Classes:
+  CompileServer() -- answer compile requests with a warm parser and module cache
+"""
+import sys
+import json
+import time
+from console import CompileError
+from compiler import loadLanguage
+from session import Session
+from library import compileFile
+from references import referenceData
+from jsonio import writeJSON
+
+class CompileServer():
+    """
+    Answer compile requests with a warm parser and module cache.
+
+    Description:
+      CompileServer() keeps a single Session() for its whole life, so every request is compiled without loading the language and imported code files are only recompiled when they change.
+      Requests are compiled in library mode (see library.py), so they never end the server: compiler errors are returned as diagnostics. Nothing but responses is written to the output stream (messages printed by the compiler are redirected to stderr).
+      The time taken by every compile request is measured, see stats().
+
+    Instance Variables:
+      session -- Session() object used by every request
+      running -- boolean containing False after the "shutdown" method, True otherwise
+      latencies -- list containing the milliseconds taken by every compile request
+
+    Public Methods:
+      __init__(self, options)
+      compile(self, params)
+      handle(self, request)
+      stats(self)
+    """
+
+    def __init__(self, options):
+        """
+        Initialise CompileServer object.
+
+        Arguments:
+          options -- dict containing the options of the compiler (see console.arguments())
+        """
+        self.options = options
+        self.session = Session.fromOptions(loadLanguage, options, exportImports=False)
+        self.running = True
+        self.latencies = []
+
+    def compile(self, params):
+        """
+        Compile a code file (or the given text of it) and return the result of the "compile" method (see the Protocol in the module docstring).
+
+        Arguments:
+          params -- dict containing the params of the request
+        """
+        start = time.perf_counter()
+        data = None
+        try:
+            result = compileFile(params["file"], self.session, output=self.options["output"], pretty=self.options["pretty"], importedArgs=params.get("args", {}), export=params.get("export", False), text=params.get("text"), stdout=sys.stderr)
+            data, diagnostics = result.data, result.diagnostics
+        except CompileError as error:
+            diagnostics = error.diagnostics
+        milliseconds = (time.perf_counter() - start) * 1000
+        self.latencies.append(milliseconds)
+        if data is not None and params.get("references", self.session.references):
+            data = referenceData(data)
+        success = data is not None and not any(diagnostic["severity"] == "error" for diagnostic in diagnostics)
+        return {"success": success, "diagnostics": diagnostics, "data": data if params.get("data", True) else None, "time": round(milliseconds, 3)}
+
+    def stats(self):
+        """ Return the result of the "stats" method: the number of compile requests and their latency (see the Protocol in the module docstring)"""
+        latencies = sorted(self.latencies) or [0.0]
+        percentile = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+        stats = {"requests": len(self.latencies), "mean": sum(latencies) / len(latencies), "p50": percentile(0.5), "p95": percentile(0.95), "max": latencies[-1]}
+        stats = {name: round(value, 3) for name, value in stats.items()}
+        stats["moduleCache"] = self.session.moduleCache.stats() if self.session.moduleCache else ""
+        return stats
+
+    def handle(self, request):
+        """
+        Answer a single JSON-RPC request.
+
+        Arguments:
+          request -- string containing the JSON-RPC request
+
+        Return:
+          dict containing the JSON-RPC response (None for notifications, i.e. requests without an id)
+        """
+        try:
+            request = json.loads(request)
+            method, params, requestId = request["method"], request.get("params", {}), request.get("id")
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Invalid request"}}
+        if not isinstance(params, dict):
+            return {"jsonrpc": "2.0", "id": requestId, "error": {"code": -32602, "message": "Invalid params: params must be an object"}}
+        if method == "shutdown":
+            self.running = False
+            result = None
+        elif method == "compile":
+            if "file" not in params:
+                return {"jsonrpc": "2.0", "id": requestId, "error": {"code": -32602, "message": "Missing param: file"}}
+            if not isinstance(params["file"], str):
+                return {"jsonrpc": "2.0", "id": requestId, "error": {"code": -32602, "message": "Invalid param: file must be a string"}}
+            result = self.compile(params)
+        elif method == "stats":
+            result = self.stats()
+        else:
+            return {"jsonrpc": "2.0", "id": requestId, "error": {"code": -32601, "message": "Unknown method: " + str(method)}}
+        if requestId is None:
+            return None
+        return {"jsonrpc": "2.0", "id": requestId, "result": result}
+
+def serve(options, instream=sys.stdin, outstream=sys.stdout):
+    """
+    Run a CompileServer() until the "shutdown" method or the end of the input, then print its latency stats to stderr.
+
+    Arguments:
+      options -- dict containing the options of the compiler (see console.arguments())
+      instream -- (optional) file object the requests are read from. Defaults to sys.stdin
+      outstream -- (optional) file object the responses are written to. Defaults to sys.stdout
+    """
+    server = CompileServer(options)
+    for line in instream:
+        if not line.strip():
+            continue
+        response = server.handle(line)
+        if response is not None:
+            writeJSON(response, outstream)
+            outstream.write("\n")
+            outstream.flush()
+        if not server.running:
+            break
+    stats = server.stats()
+    sys.stderr.write("Compile server: %d requests, mean %.3f ms, p50 %.3f ms, p95 %.3f ms, max %.3f ms\n" % (stats["requests"], stats["mean"], stats["p50"], stats["p95"], stats["max"]))
@@ -0,0 +1,108 @@
+"""
+Imports:
+  from transformer import InlineReduceTree
+  from cache import ModuleCache
+  from check_import import ImportGraph
+
+Classes:
+  Session() -- hold the state shared by every compilation of a single BPMML run
+"""
+from transformer import InlineReduceTree
+from cache import ModuleCache
+from check_import import ImportGraph
+
+class Session():
+    """
+    Hold the state shared by every compilation of a single BPMML run (a code file and all of its imports).
+
+    Description:
+      Session() owns a single parser so that the language is only loaded once per run, regardless of the number of imports.
+      The parser is shared, but the BPMML SCRIPT commands are handed out per code file so that the scripts of an imported file never leak into the importing file.
+      In single pass mode the parser reduces every process while parsing (see transformer.InlineReduceTree()), so parsing returns the compiled global processes instead of a tree.
+
+    Instance Variables:
+      parser -- Lark object used to parse every code file of the run
+      scripts -- list that the parser fills with BPMML SCRIPT commands while parsing (see popScripts())
+      singlePass -- boolean containing True if the processes are reduced while parsing, False otherwise
+      reducer -- InlineReduceTree() object used by the parser in single pass mode, None otherwise
+      exportImports -- boolean containing True if the json files of the imported code files are exported, False otherwise (they are always linked in memory)
+      moduleCache -- ModuleCache() object storing the compiled imported code files, None if imports are always recompiled
+      importGraph -- ImportGraph() object containing the imports of the current compilation and detecting import cycles
+      references -- boolean containing True if the json files are exported in the reference-based form (see references.py), False otherwise
+      lazy -- string containing "omit" (or "keep") if only the used processes are reduced and the rest are omitted (or kept untransformed), empty string if every process is reduced (see lazy.py)
+      processes -- list containing the names of the processes that are reduced in lazy mode apart from the ones reachable from "main"
+      reduceJobs -- integer containing the number of worker processes reducing independent global processes in parallel, 0 or 1 for none (see parallel.py)
+      positions -- string containing "map" if the positions are exported in a source map, "strip" if they are not exported, empty string if they are exported in the json files (see sourcemap.py)
+      importResolver -- function returning the contents of an imported code file instead of reading it from disk (see compiler.importstep()), None if imports are read from disk
+      compact -- boolean containing True if the json files are exported without spaces after the separators (see jsonio.writeJSON()), False otherwise
+      encoder -- string containing the name of the encoder the json files are exported with if it supports the output, empty string for the fastest one that does (see jsonio.dumpJSON())
+      binary -- boolean containing True if the compiled data is exported in the binary format instead of json (see binary.py), False otherwise
+
+    Public Methods:
+      __init__(self, loader, singlePass=False, exportImports=True, moduleCache=None, references=False, lazy='', processes=(), reduceJobs=0, positions='', importResolver=None, compact=False, encoder='', binary=False)
+      fromOptions(cls, loader, options, **overrides) (class method)
+      popScripts(self, mark)
+    """
+
+    def __init__(self, loader, singlePass=False, exportImports=True, moduleCache=None, references=False, lazy="", processes=(), reduceJobs=0, positions="", importResolver=None, compact=False, encoder="", binary=False):
+        """
+        Initialise Session object by loading the language.
+
+        Arguments:
+          loader -- function returning a turple of (parser, scripts list) that accepts a transformer keyword argument, see compiler.loadLanguage()
+          singlePass -- (optional) boolean containing True if the processes will be reduced while parsing, False otherwise. Defaults to False
+          exportImports -- (optional) boolean containing True if the json files of the imported code files will be exported, False otherwise. Defaults to True
+          moduleCache -- (optional) ModuleCache() object storing the compiled imported code files, False to always recompile imports. Defaults to a new in-memory ModuleCache()
+          references -- (optional) boolean containing True if the json files will be exported in the reference-based form, False otherwise. Defaults to False
+          lazy -- (optional) string containing "omit" or "keep" to reduce only the used processes (see Instance Variables). Defaults to empty string. Ignored in single pass mode, which reduces while parsing
+          processes -- (optional) iterable containing the names of the processes reduced in lazy mode apart from the ones reachable from "main". Defaults to none
+          reduceJobs -- (optional) integer containing the number of worker processes reducing global processes in parallel. Defaults to 0 (none). Ignored in single pass mode, which reduces while parsing
+          positions -- (optional) string containing "map" or "strip" to export the positions apart or not at all (see Instance Variables). Defaults to empty string
+          importResolver -- (optional) function of (imported name, importing codefile) returning the contents of the imported code file, None if it does not exist. Defaults to None (imports are read from disk)
+          compact -- (optional) boolean containing True if the json files will be exported without spaces after the separators, False otherwise. Defaults to False
+          encoder -- (optional) string containing the name of the encoder of the json files (see Instance Variables). Defaults to empty string
+          binary -- (optional) boolean containing True if the compiled data will be exported in the binary format instead of json, False otherwise. Defaults to False
+        """
+        self.singlePass = singlePass
+        self.exportImports = exportImports
+        self.moduleCache = ModuleCache() if moduleCache is None else (moduleCache or None)
+        self.importGraph = ImportGraph()
+        self.references = references
+        self.lazy = "" if singlePass else lazy
+        self.processes = list(processes)
+        self.reduceJobs = 0 if singlePass else reduceJobs
+        self.positions = positions
+        self.importResolver = importResolver
+        self.compact = compact
+        self.encoder = encoder
+        self.binary = binary
+        self.reducer = InlineReduceTree() if singlePass else None
+        self.parser, self.scripts = loader(transformer=self.reducer)
+
+    @classmethod
+    def fromOptions(cls, loader, options, **overrides):
+        """
+        Return a new Session object configured by the options of the compiler.
+
+        Arguments:
+          loader -- see __init__()
+          options -- dict containing the options of the compiler (see console.arguments())
+          overrides -- (optional) keyword arguments of __init__() that replace the ones given by the options
+        """
+        arguments = {"singlePass": options["singlePass"], "exportImports": options["importJSON"], "moduleCache": ModuleCache(options["moduleCache"]), "references": options["references"], "lazy": options["lazy"], "processes": options["processes"], "reduceJobs": options["reduceJobs"], "positions": options["positions"], "compact": options["compact"], "encoder": options["encoder"], "binary": options["binary"]}
+        arguments.update(overrides)
+        return cls(loader, **arguments)
+
+    def popScripts(self, mark):
+        """
+        Remove and return the BPMML SCRIPT commands collected after a point.
+
+        Arguments:
+          mark -- integer containing the length of the scripts list before the code file was parsed
+
+        Return:
+          list containing the SCRIPT commands of the code file parsed after the mark
+        """
+        scripts = self.scripts[mark:]
+        del self.scripts[mark:]
+        return scripts
@@ -0,0 +1,128 @@
+"""
+Usage:
+  Export the positions of the compiled steps (their "line" and the "file" of processes) apart from the json output (see compiler.exportJSON()).
+
+Source Maps:
+  Every step of the json output (every dict with a "type") is a node, and its id is its position in the order the nodes are written (the order they appear in the json file, parents before their steps).
+  When positions are mapped, the "line" and "file" keys are not written in the json output but in a source map file next to it (<codefile>.map.json):
+      {"version": 1, "output": <name of the json file>, "files": [<file>, ...], "lines": [<line of node 0>, <line of node 1>, ...], "processFiles": [<index in files>, ...]}
+  "lines" has an entry for every node and "processFiles" one for every process, in the same order (null if the node has no line, or the process no file).
+  restorePositions() puts the positions of a source map back into the json output it was written with. When positions are stripped, they are not written anywhere.
+
+Imports:
+  from pathlib import PurePath
+
+Global Variables:
+  POSITION_KEYS -- turple containing the keys of the nodes that hold positions
+  SOURCE_MAP_VERSION -- integer containing the version of the source map format
+
+Functions:
+  mapPath(jsonPath)
+  restorePositions(data, sourceMap)
+
+Classes:
+  SourceMap() -- collect the positions of the nodes while the json output is written
+"""
+from pathlib import PurePath
+
+POSITION_KEYS = ("line", "file")
+SOURCE_MAP_VERSION = 1
+
+class SourceMap():
+    """
+    Collect the positions of the nodes while the json output is written (see jsonio.writeJSON()).
+
+    Instance Variables:
+      record -- boolean containing True if the positions are collected, False if they are only stripped
+      files -- list containing the names of the files of the processes, once each
+      lines -- list containing the line of every node (None for none), in the order the nodes are written
+      processFiles -- list containing the index (in files) of the file of every process (None for none), in the order the nodes are written
+
+    Public Methods:
+      __init__(self, record=True)
+      add(self, node)
+      toData(self, output='')
+    """
+
+    def __init__(self, record=True):
+        """
+        Initialise SourceMap object.
+
+        Arguments:
+          record -- (optional) boolean containing True if the positions will be collected, False if they will only be stripped. Defaults to True
+        """
+        self.record = record
+        self.files = []
+        self.lines = []
+        self.processFiles = []
+        self._fileIndex = {}
+
+    def add(self, node):
+        """ Collect the positions of the next node written (a dict with a "type")"""
+        if not self.record:
+            return
+        self.lines.append(node.get("line"))
+        if node["type"] == "process":
+            file = node.get("file")
+            if file is not None and file not in self._fileIndex:
+                self._fileIndex[file] = len(self.files)
+                self.files.append(file)
+            self.processFiles.append(None if file is None else self._fileIndex[file])
+
+    def toData(self, output=""):
+        """ Return the source map as a dict (see the module docstring), output is the name of the json file it belongs to"""
+        return {"version": SOURCE_MAP_VERSION, "output": output, "files": self.files, "lines": self.lines, "processFiles": self.processFiles}
+
+def mapPath(jsonPath):
+    """ Return the path of the source map of a json file (<name>.map.json next to it)"""
+    return str(PurePath(jsonPath).with_suffix(".map.json"))
+
+def restorePositions(data, sourceMap):
+    """
+    Put the positions of a source map back into the json output it was written with, in-place, and return the data.
+
+    Arguments:
+      data -- dict containing the json output written with the source map (e.g. loaded from the json file)
+      sourceMap -- dict containing the source map (see the module docstring)
+
+    Exceptions:
+      ValueError if the source map does not belong to the data (it has a different number of nodes or processes)
+
+    Note:
+      The nodes are walked iteratively in the order they were written. Their keys are put back in the order the compiler writes them ("type", "file", "line", then the rest).
+    """
+    lines = iter(sourceMap["lines"])
+    processFiles = iter(sourceMap["processFiles"])
+    files = sourceMap["files"]
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+            continue
+        if not isinstance(node, dict):
+            continue
+        children = list(node.values())
+        if "type" in node:
+            positions = []
+            try:
+                if node["type"] == "process":
+                    index = next(processFiles)
+                    if index is not None:
+                        positions.append(("file", files[index]))
+                line = next(lines)
+            except StopIteration:
+                raise ValueError("The source map does not belong to the data (it has fewer nodes)") from None
+            if line is not None:
+                positions.append(("line", line))
+            if positions:
+                rest = [(key, value) for key, value in node.items() if key != "type"]
+                nodeType = node["type"]
+                node.clear()
+                node["type"] = nodeType
+                node.update(positions)
+                node.update(rest)
+        stack.extend(reversed(children))
+    if next(lines, stack) is not stack or next(processFiles, stack) is not stack: #the (empty) stack is never an entry of the source map
+        raise ValueError("The source map does not belong to the data (it has more nodes)")
+    return data
@@ -0,0 +1,228 @@
+"""
+Usage:
+  Compile very large code files with bounded memory (see launcher.py --stream).
+
+Streaming Compilation:
+  A normal compilation holds the whole code file, its whole tree and all of its compiled data at once. Global processes only depend on each other through "call",
+  so a code file can also be compiled one global process at a time:
+    1. The code file is memory-mapped and scanned for the lines that open and close blocks (see scanCode()), which splits it into the header (everything above the first
+       global process), the global processes and the closing "end". The names of the called processes are collected on the way.
+    2. The header ("start", the global arguments and the imports) is parsed. Every global process is then parsed on its own and its tree is dropped at once, so syntax errors
+       (and processes with the same name) are reported before anything is compiled, like in a normal compilation.
+    3. The header is handled like in a normal compilation (see compiler.handleRootChildren()).
+    4. Every global process is parsed again on its own, reduced, written to the json file (see jsonio.StreamWriter()) and freed. Only the processes that are called somewhere are kept,
+       and the "main" process, which is written last ("execute").
+  The json file (and its source map) is exactly the one of a normal compilation, and so are the lines of the messages. The pages of the code file that were already compiled
+  are given back to the operating system, so the memory used depends on the largest global process (and the called ones), not on the size of the code file.
+  Code files running BPMML SCRIPT commands need all of their compiled data at once, so they are compiled normally, and so is any code file with options that need every process
+  at once (--references, --lazy, --binary, whose string table comes first) or a single pass session (which already reduces while parsing).
+
+Imports:
+  import re
+  import mmap
+  from pathlib import Path
+  from lark import Tree, UnexpectedInput
+  from console import Console
+  from compiler import compileCode, loadLanguage, parseCode, handleRootChildren, outputPath, exportSourceMap
+  from transformer import ReduceTree
+  from session import Session
+  from jsonio import IncrementalExport
+  from sourcemap import SourceMap
+
+Global Variables:
+  SCAN_WINDOW -- integer containing the number of bytes of the code file scanned before their pages are given back
+
+Functions:
+  scanCode(buffer)
+  streamCode(codefile, console=Console(), output='', pretty=False, session=None)
+"""
+import re
+import mmap
+from pathlib import Path
+from lark import Tree, UnexpectedInput
+from console import Console
+from compiler import compileCode, loadLanguage, parseCode, handleRootChildren, outputPath, exportSourceMap
+from transformer import ReduceTree
+from session import Session
+from jsonio import IncrementalExport
+from sourcemap import SourceMap
+
+SCAN_WINDOW = 1 << 22
+# every line that opens or closes a block, calls a process of the code file or runs a BPMML SCRIPT command (the lines of every other step never do)
+_LINE = re.compile(rb"^[ \t]*(?:(?:(?P<process>process)[ \t]+\w+|users|parallel|try|yes|no|change users|(?P<end>end))[ \t]*(?:#[^\n]*)?\r?$"
+                   rb"|call[ \t]+(?P<call>[-.\w]+)[ \t]*(?:#[^\n]*)?\r?$|(?P<run>run))", re.M)
+_RUN = re.compile(rb"^[ \t]*run", re.M)
+
+def _release(buffer, released, offset):
+    """ Give the pages of the buffer between released and offset back to the operating system and return the offset they are released up to"""
+    offset -= offset % mmap.PAGESIZE
+    if offset > released and hasattr(mmap, "MADV_DONTNEED"):
+        buffer.madvise(mmap.MADV_DONTNEED, released, offset - released)
+        return offset
+    return released
+
+def scanCode(buffer):
+    """
+    Find the global processes of a code file without parsing it.
+
+    Arguments:
+      buffer -- bytes-like object (e.g. a memory-mapped file) containing the code file
+
+    Return:
+      turple containing [0] -> list containing the offset of the first line of every global process, in order,
+                        [1] -> integer containing the offset of the line closing the "start" block, None if it was not found,
+                        [2] -> set containing the names of the processes called (without "from"),
+                        [3] -> boolean containing True if the code file runs BPMML SCRIPT commands, False otherwise
+
+    Note:
+      The code file is scanned in windows of SCAN_WINDOW bytes, and the pages of every window are given back once it is scanned.
+    """
+    starts = []
+    called = set()
+    depth = 0
+    position = released = 0
+    while position < len(buffer):
+        window = buffer.find(b"\n", position + SCAN_WINDOW) + 1 or len(buffer) # windows end with a line
+        for match in _LINE.finditer(buffer, position, window):
+            kind = match.lastgroup
+            if kind == "run":
+                return starts, None, called, True
+            if kind == "call":
+                called.add(match.group("call").decode())
+            elif kind == "end":
+                depth -= 1
+                if depth < 0:
+                    return starts, match.start(), called, _RUN.search(buffer, match.end()) is not None
+            else:
+                if kind == "process" and depth == 0:
+                    starts.append(match.start())
+                depth += 1
+        position = window
+        released = _release(buffer, released, position)
+    return starts, None, called, False
+
+def _decode(chunk):
+    """ Return the text of a part of the code file, with the newlines read like open() reads them"""
+    text = chunk.decode("utf-8")
+    return text.replace("\r\n", "\n").replace("\r", "\n") if "\r" in text else text
+
+def _parseProcesses(session, buffer, start, stop, line, console, closing="end\n"):
+    """ Parse the part of the code file between start and stop, starting at line (global processes, or the closing "end" if closing is empty), and return its text and the trees of its global processes, with the lines of the code file"""
+    chunk = _decode(buffer[start:stop])
+    try:
+        tree = session.parser.parse("start\n" + chunk + closing)
+    except UnexpectedInput:
+        parseCode(session.parser, _decode(buffer[:stop]) + closing, console) # parsed again with everything above it, to print the error of a normal compilation
+        raise
+    offset = line - 2
+    stack = [tree]
+    while stack:
+        for child in stack.pop().children:
+            if isinstance(child, Tree):
+                stack.append(child)
+            else:
+                child.line += offset
+                if child.end_line is not None:
+                    child.end_line += offset
+    return chunk, [child for child in tree.children if isinstance(child, Tree)]
+
+def _checkProcesses(session, buffer, bounds, line, console):
+    """ Parse every global process of a scanned code file (and whatever follows the closing "end") without keeping the trees, and return the names of the global processes in order"""
+    names = []
+    released = 0
+    for start, stop in zip(bounds, bounds[1:]):
+        chunk, processTrees = _parseProcesses(session, buffer, start, stop, line, console)
+        names += [str(processTree.children[1]) for processTree in processTrees]
+        line += chunk.count("\n")
+        released = _release(buffer, released, stop)
+    _parseProcesses(session, buffer, bounds[-1], len(buffer), line, console, closing="") # nothing but comments may follow the closing "end"
+    return names
+
+def streamCode(codefile, console=Console(), output="", pretty=False, session=None):
+    """
+    Usage: Use in a separate script to compile a very large .bpmml with bounded memory, see the module docstring. Initialise the arguments like compileCode() (see compiler.py).
+
+    Compile a code file one global process at a time and export its json file.
+
+    Arguments:
+      codefile -- string containing the filename of the code file to be compiled (IMPORTANT: with extension)
+      console -- (optional) Console() object used to print data/info. Defaults to a new Console() instance
+      output -- (optional) pathlib.PosixPath object instance containing the output directory. Defaults to empty path (which makes the output directory the folder of the code file)
+      pretty -- (optional) boolean containing True if the json file will be exported using newlines, spacing and tabs, False otherwise. Defaults to False
+      session -- (optional) Session() object shared by every compilation of the run (see session.py). Defaults to a new Session()
+
+    Return:
+      True (the compiled data is never held at once, so unlike compileCode() it is not returned)
+
+    Notes:
+      The json file is written next to its final path and only replaces it once the code file is compiled, so an error never leaves half a json file behind.
+      The global processes are reduced one after the other, so --reduce-jobs is not used.
+      Every global process is parsed twice, once to find the syntax errors before anything is compiled and once to reduce it (see the module docstring).
+    """
+    if session is None:
+        session = Session(loadLanguage)
+    if ".bpmml" not in codefile:
+        console.invalidArg("Invalid Input")
+    if session.singlePass:
+        return bool(compileCode(codefile, console, output, pretty, session=session))
+    if session.references or session.lazy or session.binary:
+        console.warning("Streaming needs every process of the code file at once with --references, --lazy or --binary. Will compile without streaming")
+        return bool(compileCode(codefile, console, output, pretty, session=session))
+    try:
+        codeFile = open(codefile, "rb")
+    except FileNotFoundError:
+        console.error(console.colorName(codefile) + " does not exist!")
+    with codeFile:
+        try:
+            buffer = mmap.mmap(codeFile.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # an empty file cannot be mapped
+            return bool(compileCode(codefile, console, output, pretty, session=session))
+        with buffer:
+            starts, end, called, scripts = scanCode(buffer)
+            if scripts:
+                console.warning("BPMML SCRIPT commands need all of the compiled data at once. Will compile without streaming")
+            if scripts or not starts or end is None: # a code file that cannot be split is compiled normally, with the errors of a normal compilation
+                return bool(compileCode(codefile, console, output, pretty, session=session))
+            session.importGraph.enter(codefile)
+            try:
+                _streamProcesses(codefile, buffer, starts + [end], called, console, output, pretty, session)
+            finally:
+                session.importGraph.leave()
+    return True
+
+def _streamProcesses(codefile, buffer, bounds, called, console, output, pretty, session):
+    """ Compile the header and every global process of a scanned code file (the global processes are between the bounds) and export its json file"""
+    fileName = Path(codefile).stem
+    header = _decode(buffer[:bounds[0]])
+    tree = parseCode(session.parser, header + "end\n", console)
+    line = header.count("\n") + 1
+    processNames = _checkProcesses(session, buffer, bounds, line, console) # a normal compilation parses the whole code file first, so syntax errors come before any other message
+    processDict, globalArgs, importedProcessDict, importedMainDict = handleRootChildren(tree, codefile, output, console, {}, session)
+    del tree
+    names = set()
+    for name in processNames:
+        if name in names:
+            console.error("Two processes have the same name: " + console.colorName(name))
+        names.add(name)
+    jsonPath = outputPath(codefile, output)
+    sourceMap = SourceMap(record=session.positions == "map") if session.positions else None
+    keptProcessDict = {}
+    mainProcess = {}
+    released = 0
+    with IncrementalExport(jsonPath, fileName, pretty, sourceMap, session.compact, session.encoder) as exporter:
+        for start, stop in zip(bounds, bounds[1:]):
+            chunk, processTrees = _parseProcesses(session, buffer, start, stop, line, console)
+            for processTree in processTrees:
+                name = str(processTree.children[1])
+                process = ReduceTree(fileName, globalArgs, keptProcessDict, importedProcessDict, importedMainDict, console).transform(processTree)
+                if name in called:
+                    keptProcessDict[name] = process
+                if name == "main":
+                    mainProcess = process.copy(name=fileName)
+                else:
+                    exporter.add(process)
+            line += chunk.count("\n")
+            released = _release(buffer, released, stop)
+        exporter.finish(mainProcess)
+    if session.positions == "map":
+        exportSourceMap(jsonPath, sourceMap, session.compact, session.encoder)
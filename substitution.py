@@ -0,0 +1,70 @@
+"""
+Imports:
+  import re
+
+Classes:
+  ArgumentSubstitution() -- substitute the global arguments (&name) of a code file in any string
+"""
+import re
+
+class ArgumentSubstitution():
+    """
+    Substitute the global arguments (&name) of a code file in any string.
+
+    Description:
+      Every reference (& followed by a name) of a string is replaced in a single pass of a precompiled regular expression, so a string may contain any number of references.
+      Chained arguments (an argument whose value references another one) are resolved when they are defined (see compiler.withstep()), so every value is final and is never substituted again.
+      Code files repeat the same tokens many times, so the result of every string is remembered. Global arguments are only ever added, so the remembered results are dropped whenever the number of global arguments changes.
+
+    Instance Variables:
+      globalArgs -- dict containing the global arguments as pairs of (key)"&" + name - (value)value (the "#" line entries are ignored)
+
+    Public Methods:
+      __init__(self, globalArgs)
+      substitute(self, text)
+    """
+
+    PATTERN = re.compile(r"&\w*")
+
+    def __init__(self, globalArgs):
+        """
+        Initialise ArgumentSubstitution object.
+
+        Arguments:
+          globalArgs -- dict containing the global arguments (it is not copied, arguments added later are substituted too)
+        """
+        self.globalArgs = globalArgs
+        self._memo = {}
+        self._size = len(globalArgs)
+
+    def substitute(self, text):
+        """
+        Substitute every global argument referenced in a string.
+
+        Arguments:
+          text -- string (or lark Token) that may contain references to global arguments
+
+        Return:
+          turple of (substituted text, turple of the references that are not global arguments). The text itself is returned (e.g. keeping a Token) if nothing was substituted
+
+        Note:
+          References that are not global arguments are left as they are.
+        """
+        if "&" not in text:
+            return text, ()
+        if self._size != len(self.globalArgs):
+            self._memo.clear()
+            self._size = len(self.globalArgs)
+        key = str(text) #tokens compare to strings in Python (lark Token.__eq__), plain strings compare in C
+        result = self._memo.get(key)
+        if result is None:
+            missing = []
+            def replace(match):
+                reference = match.group()
+                if reference in self.globalArgs:
+                    return self.globalArgs[reference]
+                missing.append(reference)
+                return reference
+            substituted = self.PATTERN.sub(replace, key)
+            result = self._memo[key] = (None if substituted == key else substituted, tuple(missing))
+        return (text if result[0] is None else result[0]), result[1]
@@ -0,0 +1,68 @@
+"""
+Shared setup of the tests of the BPMML compiler (run with "python -m pytest" from the folder of the compiler).
+
+Imports:
+  import sys
+  import json
+  from pathlib import Path
+  import pytest
+
+Global Variables:
+  ROOT -- pathlib.Path object instance containing the folder of the compiler
+  GLOBAL_ARGUMENT -- string containing a code file whose "main" process runs a command with the global argument x (format it with the value of x)
+
+Functions:
+  argumentFile(folder, name, value)
+  argumentFiles(tmp_path) (fixture)
+  codeFile(folder, name, text)
+  compileFiles(argv)
+  exportedCommand(folder, name)
+  exportedJSON(folder, name)
+  inRoot(monkeypatch) (fixture)
+"""
+import sys
+import json
+from pathlib import Path
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+GLOBAL_ARGUMENT = "start with x = {value}\n    process main\n        command1 &x\n    end\nend\n"
+
+@pytest.fixture(autouse=True)
+def inRoot(monkeypatch):
+    """ Run every test in the folder of the compiler, where the language file is loaded from (see compiler.loadLanguage())"""
+    monkeypatch.chdir(ROOT)
+
+def codeFile(folder, name, text):
+    """ Write a code file (name without extension) to a folder and return its path as a string"""
+    path = Path(folder) / (name + ".bpmml")
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+def compileFiles(argv):
+    """ Compile the code files of a command line of the launcher (options first, see console.arguments()) in this process, assert they all compiled and return the results (see batch.compileBatch())"""
+    from console import arguments
+    from batch import compileBatch
+    options = arguments(argv)
+    results = compileBatch(options["files"], options)
+    assert [result[1] for result in results] == ["compiled"] * len(results), [result[3] for result in results]
+    return results
+
+def exportedJSON(folder, name):
+    """ Return the data of the json file a code file (name without extension) was exported to in a folder"""
+    return json.loads((Path(folder) / (name + ".json")).read_text(encoding="utf-8"))
+
+def argumentFile(folder, name, value):
+    """ Write a GLOBAL_ARGUMENT code file with the given value of x and return its path as a string"""
+    return codeFile(folder, name, GLOBAL_ARGUMENT.format(value=value))
+
+def exportedCommand(folder, name):
+    """ Return the command of the "main" process of an exported GLOBAL_ARGUMENT code file (e.g. "command1 value_one")"""
+    return exportedJSON(folder, name)["execute"]["commands"][0]["commands"]
+
+@pytest.fixture
+def argumentFiles(tmp_path):
+    """ Write two GLOBAL_ARGUMENT code files giving x different values ("one" -> value_one, "two" -> value_two) and return their paths"""
+    return [argumentFile(tmp_path, "one", "value_one"), argumentFile(tmp_path, "two", "value_two")]
@@ -0,0 +1,13 @@
+"""
+Tests of batch.py (compiling many code files from one launcher run).
+"""
+from console import arguments
+from batch import compileBatch
+from conftest import exportedCommand
+
+def testGlobalArgumentsAreNotShared(tmp_path, argumentFiles):
+    """ Code files compiled one after the other in the same process never see the global arguments of the previous ones"""
+    results = compileBatch(argumentFiles, arguments(argumentFiles), jobs=1)
+    assert [result[1] for result in results] == ["compiled", "compiled"]
+    assert exportedCommand(tmp_path, "one") == "command1 value_one"
+    assert exportedCommand(tmp_path, "two") == "command1 value_two"
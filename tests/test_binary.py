@@ -0,0 +1,72 @@
+"""
+Tests of the binary output (see binary.py and --binary).
+"""
+import pytest
+from conftest import codeFile, compileFiles
+from binary import MAGIC, isBinary, readBinary, jsonToBinary, binaryToJSON
+
+LIBRARY = """start with who = bob
+    process helper
+        users
+            (div, dep, pos) &who
+        end
+        send café &who
+    end
+end
+"""
+
+APPLICATION = """start
+    import lib with who = alice
+    process local
+        users
+            (div, dep, pos) alice
+        end
+        parallel
+            command1 first
+            call helper from lib
+        end
+    end
+    process main
+        call local
+        call local
+        call helper from lib
+    end
+end
+"""
+
+@pytest.mark.parametrize("options", [[], ["--compact"], ["--pretty"]])
+def testBinaryRoundTrip(tmp_path, options):
+    """ A json file converted to binary and back is the same json file, and so is the one converted from the binary file the compiler exports"""
+    codeFile(tmp_path, "lib", LIBRARY)
+    application = codeFile(tmp_path, "app", APPLICATION)
+    compileFiles(options + [application])
+    exported = (tmp_path / "app.json").read_bytes()
+    binaryFile = jsonToBinary(str(tmp_path / "app.json"))
+    assert isBinary(binaryFile)
+    compact, pretty = "--compact" in options, "--pretty" in options
+    assert open(binaryToJSON(binaryFile, str(tmp_path / "back.json"), pretty, compact), "rb").read() == exported
+    compileFiles(options + ["--binary", application])
+    assert open(binaryToJSON(str(tmp_path / "app.bpmb"), str(tmp_path / "compiled.json"), pretty, compact), "rb").read() == exported
+
+def testDamagedFilesAreRejected(tmp_path):
+    """ Truncated and foreign files are rejected with a ValueError telling what is wrong with them"""
+    codeFile(tmp_path, "lib", LIBRARY)
+    compileFiles(["--binary", codeFile(tmp_path, "app", APPLICATION)])
+    contents = (tmp_path / "app.bpmb").read_bytes()
+    assert contents.startswith(MAGIC)
+    truncated = tmp_path / "truncated.bpmb"
+    for length in range(len(MAGIC) + 1, len(contents)):
+        truncated.write_bytes(contents[:length])
+        assert isBinary(str(truncated))
+        with open(truncated, "rb") as stream, pytest.raises(ValueError, match="truncated"):
+            readBinary(stream)
+    foreign = tmp_path / "foreign.bpmb"
+    foreign.write_bytes(b"PK\x03\x04 not a binary file of the compiler")
+    assert not isBinary(str(foreign))
+    assert not isBinary(str(tmp_path / "app.json"))
+    with open(foreign, "rb") as stream, pytest.raises(ValueError, match="Not a BPMML binary file"):
+        readBinary(stream)
+    unknown = tmp_path / "unknown.bpmb"
+    unknown.write_bytes(MAGIC + bytes([99]) + contents[len(MAGIC) + 1:])
+    with open(unknown, "rb") as stream, pytest.raises(ValueError, match="version: 99"):
+        readBinary(stream)
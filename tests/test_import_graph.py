@@ -0,0 +1,63 @@
+"""
+Tests of the detection of import cycles (see check_import.ImportGraph()).
+"""
+import pytest
+from conftest import codeFile
+from console import CompileError
+from compiler import loadLanguage
+from session import Session
+from library import compileFile
+
+IMPORTER = """start
+    import {imported}
+    process main
+        command1 {name}
+    end
+end
+"""
+
+LEAF = """start
+    process main
+        command1 leaf
+    end
+end
+"""
+
+DIAMOND = """start
+    import left
+    import right
+    process main
+        call left
+        call right
+    end
+end
+"""
+
+def testImportCycleIsReported(tmp_path):
+    """ A code file importing a file that imports it back fails with the import cycle, and once the cycle is broken the same session compiles it"""
+    session = Session(loadLanguage, exportImports=False)
+    first = codeFile(tmp_path, "first", IMPORTER.format(imported="second", name="first"))
+    codeFile(tmp_path, "second", IMPORTER.format(imported="third", name="second"))
+    codeFile(tmp_path, "third", IMPORTER.format(imported="first", name="third"))
+    with pytest.raises(CompileError) as error:
+        compileFile(first, session)
+    assert "import cycle" in error.value.message
+    assert error.value.message.count("->") == 3
+    assert error.value.line == 2
+    codeFile(tmp_path, "leaf", LEAF)
+    codeFile(tmp_path, "third", IMPORTER.format(imported="leaf", name="third"))
+    assert compileFile(first, session).data["execute"]["commands"][0]["commands"] == "command1 first"
+
+def testSelfImportIsReported(tmp_path):
+    """ A code file importing itself is an import cycle"""
+    alone = codeFile(tmp_path, "alone", IMPORTER.format(imported="alone", name="alone"))
+    with pytest.raises(CompileError, match="import cycle"):
+        compileFile(alone)
+
+def testSharedImportIsNotCycle(tmp_path):
+    """ Two imports of the same code file through different paths (a diamond) are not an import cycle"""
+    codeFile(tmp_path, "leaf", LEAF)
+    codeFile(tmp_path, "left", IMPORTER.format(imported="leaf", name="left"))
+    codeFile(tmp_path, "right", IMPORTER.format(imported="leaf", name="right"))
+    result = compileFile(codeFile(tmp_path, "diamond", DIAMOND))
+    assert [command["name"] for command in result.data["execute"]["commands"]] == ["left", "right"]
@@ -0,0 +1,186 @@
+"""
+Tests of jsonio.py (the encoders and the atomic writes that leave unchanged files untouched).
+"""
+import io
+import os
+import threading
+import pytest
+from jsonio import OutputFile, IncrementalExport, writeFile, writeJSON, dumpJSON, ENCODERS, orjson
+from roster import jsonDefault
+from sourcemap import SourceMap
+from console import arguments
+from compiler import exportJSON, loadLanguage
+from session import Session
+from library import compileFile, compileString
+from conftest import codeFile, compileFiles
+
+def testUnchangedFileIsLeftUntouched(tmp_path):
+    """ Writing the contents a file already has keeps its modification time, writing other contents replaces it"""
+    path = str(tmp_path / "out.json")
+    assert writeFile(path, b'{"a": 1}')
+    os.utime(path, ns=(0, 0))
+    assert not writeFile(path, b'{"a": 1}')
+    with OutputFile(path) as stream:
+        stream.write('{"a": 1}')
+    assert stream.changed is False and os.stat(path).st_mtime_ns == 0
+    assert writeFile(path, b'{"a": 2}')
+    assert open(path, "rb").read() == b'{"a": 2}'
+    assert os.listdir(tmp_path) == ["out.json"]
+
+def testInterleavedWriters(tmp_path):
+    """ Two writers of one file get temporary files of their own, so closing (or aborting) one never touches the other"""
+    path = str(tmp_path / "out.json")
+    first, second, third = OutputFile(path), OutputFile(path), OutputFile(path)
+    assert len({first.temporary, second.temporary, third.temporary}) == 3
+    first.write("first")
+    second.write("second")
+    third.write("third")
+    assert first.close()
+    third.abort()
+    assert second.close()
+    assert open(path).read() == "second"
+    assert os.listdir(tmp_path) == ["out.json"]
+
+def testConcurrentWriters(tmp_path):
+    """ Two writers writing one file at the same time never fail, the file always has the complete contents of one of them and no temporary file is left"""
+    path = str(tmp_path / "out.json")
+    contents = [("[%d]" % writer).encode() * (50000 + writer) for writer in range(2)]
+    errors = []
+    def write(writer):
+        try:
+            for attempt in range(200):
+                if attempt % 2:
+                    writeFile(path, contents[writer])
+                else:
+                    with OutputFile(path, text=False) as stream:
+                        stream.write(contents[writer])
+                assert open(path, "rb").read() in contents
+        except BaseException as error:
+            errors.append(error)
+    threads = [threading.Thread(target=write, args=(writer,)) for writer in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert open(path, "rb").read() in contents
+    assert os.listdir(tmp_path) == ["out.json"]
+
+MODEL = """start
+    process helper
+        users
+            (div, dep, pos) Zoe
+        end
+        send café "quoted" ü
+    end
+    process main
+        call helper
+        change users
+            add (a, b, c) New Person
+        end
+        call helper
+    end
+end
+"""
+
+def compiledData():
+    """ Return the compiled data of MODEL, with its nodes and user snapshots (see nodes.py and roster.py)"""
+    return compileString(MODEL, name="model").data
+
+def encodedBytes(folder, data, encoder, **options):
+    """ Write data with an encoder to a json file of its own and return a turple of (name of the encoder used, bytes of the json file)"""
+    path = str(folder / (encoder + "-" + "-".join(sorted(options)) + ".json"))
+    name = dumpJSON(data, path, encoder=encoder, **options)
+    return name, open(path, "rb").read()
+
+@pytest.mark.parametrize("options", [{}, {"compact": True}, {"pretty": True}])
+def testEncodersWriteTheSameBytes(tmp_path, options):
+    """ Every encoder writes the same json file as writeJSON(), and the ones that do not support the options give way to one that does"""
+    data = compiledData()
+    stream = io.StringIO()
+    writeJSON(data, stream, compact=options.get("compact", False), pretty=options.get("pretty", False))
+    expected = stream.getvalue().encode("utf-8")
+    written = {encoder: encodedBytes(tmp_path, data, encoder, **options) for encoder in ENCODERS}
+    assert {contents for _, contents in written.values()} == {expected}
+    supported = [encoder for encoder in ENCODERS if ENCODERS[encoder][1](options.get("pretty", False), options.get("compact", False), None)]
+    assert [encoder for encoder, (name, _) in written.items() if name == encoder] == supported
+    assert ("café" in expected.decode("utf-8")) == bool(options.get("compact"))
+
+@pytest.mark.skipif(orjson is None, reason="orjson is not installed")
+def testCompactJSONIsOrjsonJSON(tmp_path):
+    """ Compact json is exactly what orjson writes, and the stdlib and stream encoders write it too"""
+    data = compiledData()
+    expected = orjson.dumps(data, default=jsonDefault)
+    assert all(encodedBytes(tmp_path, data, encoder, compact=True)[1] == expected for encoder in ENCODERS)
+
+def testTooDeepFallsBackToStream(tmp_path):
+    """ Data nested too deeply for an encoder is written by writeJSON(), with the same bytes"""
+    data = inner = {}
+    for level in range(5000):
+        inner["next"] = inner = {"level": level}
+    names = {encoder: encodedBytes(tmp_path, data, encoder, compact=True) for encoder in ENCODERS}
+    assert {name for name, _ in names.values()} == {"stream"}
+    assert len({contents for _, contents in names.values()}) == 1
+
+LIBRARY = """start with who = bob
+    process helper
+        users
+            (div, dep, pos) &who
+        end
+        send café &who
+    end
+end
+"""
+
+APPLICATION = """start
+    import lib with who = alice
+    process local
+        parallel
+            command1 first
+            call helper from lib
+        end
+    end
+    process unused
+        parallel
+            command1 attempt
+            command2 other
+        end
+    end
+    process main
+        call local
+        call local
+        call helper from lib
+    end
+end
+"""
+
+@pytest.mark.parametrize("positions", ["", "--source-map", "--strip-positions"])
+@pytest.mark.parametrize("format", ["", "--pretty", "--compact"])
+def testIncrementalExportMatchesExportJSON(tmp_path, format, positions):
+    """ The json file (and source map) written while the processes are reduced is the one exportJSON() writes for the whole data"""
+    argv = [option for option in (format, positions) if option]
+    codeFile(tmp_path, "lib", LIBRARY)
+    application = codeFile(tmp_path, "app", APPLICATION)
+    compileFiles(argv + [application])
+    options = arguments(argv + [application])
+    data = compileFile(application, Session.fromOptions(loadLanguage, options, exportImports=False)).data
+    (tmp_path / "whole").mkdir()
+    exportJSON(application, data, tmp_path / "whole", options["pretty"], positions=options["positions"], compact=options["compact"])
+    names = ["app.json", "app.map.json"] if positions == "--source-map" else ["app.json"]
+    assert sorted(path.name for path in (tmp_path / "whole").iterdir()) == names
+    for name in names:
+        assert (tmp_path / name).read_bytes() == (tmp_path / "whole" / name).read_bytes()
+
+@pytest.mark.parametrize("options", [{}, {"compact": True}, {"pretty": True}])
+def testIncrementalExportMatchesDumpJSON(tmp_path, options):
+    """ IncrementalExport() writes the same json file and source map as dumpJSON() with every encoder"""
+    data = compiledData()
+    for encoder in ENCODERS:
+        wholeMap, incrementalMap = SourceMap(), SourceMap()
+        dumpJSON(data, str(tmp_path / "whole.json"), sourceMap=wholeMap, encoder=encoder, **options)
+        with IncrementalExport(str(tmp_path / "incremental.json"), data["title"], options.get("pretty", False), incrementalMap, options.get("compact", False), encoder) as exporter:
+            for process in data["globalProcesses"]:
+                exporter.add(process)
+            exporter.finish(data["execute"])
+        assert (tmp_path / "incremental.json").read_bytes() == (tmp_path / "whole.json").read_bytes()
+        assert incrementalMap.toData("out.json") == wholeMap.toData("out.json")
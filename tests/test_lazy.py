@@ -0,0 +1,89 @@
+"""
+Tests of lazy reduction (see lazy.py and --lazy, --lazy-keep and --process).
+"""
+from conftest import codeFile, compileFiles, exportedJSON
+
+LIBRARY = """start
+    process used
+        command1 used
+    end
+    process unused
+        command1 unused
+    end
+    process main
+        call used
+    end
+end
+"""
+
+IMPORTER = """start
+    import lib2
+    process main
+        call used from lib2
+    end
+end
+"""
+
+def testLazyImportKeepsLibraryJSON(tmp_path):
+    """ An import reduced lazily never replaces the json file of the whole library"""
+    library = codeFile(tmp_path, "lib2", LIBRARY)
+    importer = codeFile(tmp_path, "top2", IMPORTER)
+    compileFiles([library])
+    before = (tmp_path / "lib2.json").read_bytes()
+    assert [process["name"] for process in exportedJSON(tmp_path, "lib2")["globalProcesses"]] == ["used", "unused"]
+    compileFiles(["--lazy", importer])
+    assert (tmp_path / "lib2.json").read_bytes() == before
+    assert exportedJSON(tmp_path, "top2")["execute"]["commands"][0]["name"] == "used"
+
+MODEL = """start
+    process helper
+        command2 helper
+    end
+    process used
+        command1 used
+        call helper
+    end
+    process asked
+        command1 asked
+    end
+    process unused
+        command1 unused
+    end
+    process main
+        call used
+    end
+end
+"""
+
+def globalProcesses(folder, name):
+    """ Return the global processes of an exported json file by name"""
+    return {process["name"]: process for process in exportedJSON(folder, name)["globalProcesses"]}
+
+def testLazyReducesReachableProcesses(tmp_path):
+    """ --lazy only exports the processes reachable from "main" (transitively) and from --process"""
+    model = codeFile(tmp_path, "model", MODEL)
+    compileFiles(["--lazy", model])
+    assert list(globalProcesses(tmp_path, "model")) == ["helper", "used"]
+    compileFiles(["--process", "asked", model])
+    processes = globalProcesses(tmp_path, "model")
+    assert list(processes) == ["helper", "used", "asked"]
+    assert processes["asked"]["commands"][0]["commands"] == "command1 asked"
+
+def testLazyKeepListsUnreachedProcesses(tmp_path):
+    """ --lazy-keep lists the processes that are not reached untransformed, with "reduced" False"""
+    model = codeFile(tmp_path, "model", MODEL)
+    compileFiles(["--lazy-keep", model])
+    processes = globalProcesses(tmp_path, "model")
+    assert list(processes) == ["helper", "used", "asked", "unused"]
+    for name in ("asked", "unused"):
+        assert processes[name]["reduced"] == "False" and processes[name]["users"] == [] and processes[name]["commands"] == []
+    assert "reduced" not in processes["used"] and processes["used"]["commands"][0]["commands"] == "command1 used"
+
+def testCallReducesUnreachedProcessOnDemand(tmp_path):
+    """ A process of an import that its own "main" never reaches is reduced as soon as the importer calls it"""
+    codeFile(tmp_path, "library", MODEL)
+    importer = codeFile(tmp_path, "importer", "start\n    import library\n    process main\n        call unused from library\n    end\nend\n")
+    compileFiles(["--lazy", importer])
+    called = exportedJSON(tmp_path, "importer")["execute"]["commands"][0]
+    assert called["name"] == "unused" and called["commands"][0]["commands"] == "command1 unused"
+    assert not (tmp_path / "library.json").exists()
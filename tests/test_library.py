@@ -0,0 +1,128 @@
+"""
+Tests of the library mode of the compiler (see library.py).
+"""
+import io
+import os
+import json
+import builtins
+import pytest
+from conftest import codeFile
+from console import CompileError
+from compiler import loadLanguage
+from session import Session
+from library import compileFile, checkFiles, compileString
+
+WARNING = """start
+    process main
+        command1 &missing
+    end
+end
+"""
+
+SEMANTIC_ERROR = """start
+    process main
+        command1 &missing
+        call nowhere
+    end
+end
+"""
+
+SYNTAX_ERROR = """start
+    process main
+        users
+            (div, dep) Nobody
+        end
+    end
+end
+"""
+
+IMPORT_ERROR = """start
+    import broken
+    process main
+        command1 imported
+    end
+end
+"""
+
+def testWarningsAreCollected(tmp_path):
+    """ A successful compilation returns the data with its warnings, without writing any json file"""
+    result = compileFile(codeFile(tmp_path, "warning", WARNING))
+    assert result.data["execute"]["commands"][0]["commands"] == "command1 &missing"
+    assert [(diagnostic["severity"], diagnostic["line"]) for diagnostic in result.warnings] == [("warning", 3)]
+    assert "&missing" in result.warnings[0]["message"]
+    assert not list(tmp_path.glob("*.json"))
+
+def testErrorRaisesCompileError(tmp_path):
+    """ An error raises a CompileError carrying its file, line and every diagnostic before it, instead of exiting"""
+    codefile = codeFile(tmp_path, "semantic", SEMANTIC_ERROR)
+    with pytest.raises(CompileError) as error:
+        compileFile(codefile)
+    assert (error.value.file, error.value.line) == (codefile, 4)
+    assert "nowhere" in error.value.message
+    assert [diagnostic["severity"] for diagnostic in error.value.diagnostics] == ["warning", "error"]
+    assert str(error.value).startswith(codefile + ":4: ")
+
+def testSyntaxErrorRaisesCompileError(tmp_path):
+    """ A syntax error raises a CompileError with the invalid line of the code file as its context"""
+    with pytest.raises(CompileError) as error:
+        compileFile(codeFile(tmp_path, "syntax", SYNTAX_ERROR))
+    assert error.value.line == 4
+    assert "(div, dep) Nobody" in error.value.context
+
+def testImportErrorNamesImportedFile(tmp_path):
+    """ The error of an imported code file names the imported file"""
+    codeFile(tmp_path, "broken", SEMANTIC_ERROR)
+    with pytest.raises(CompileError) as error:
+        compileFile(codeFile(tmp_path, "importer", IMPORT_ERROR))
+    assert error.value.file.endswith("broken.bpmml")
+    assert error.value.line == 4
+
+def testFailuresNeverStopTheRest(tmp_path):
+    """ checkFiles() compiles every code file with one session, whatever the ones before it did"""
+    codefiles = [codeFile(tmp_path, "semantic", SEMANTIC_ERROR), codeFile(tmp_path, "syntax", SYNTAX_ERROR), codeFile(tmp_path, "warning", WARNING)] * 2
+    results = list(checkFiles(codefiles, Session(loadLanguage, exportImports=False)))
+    assert [codefile for codefile, _ in results] == codefiles
+    assert [type(outcome).__name__ for _, outcome in results] == ["CompileError", "CompileError", "CompileResult"] * 2
+    assert results[2][1].data == results[5][1].data
+
+LIBRARY = """start with who = bob
+    process helper
+        send &who
+    end
+end
+"""
+
+APPLICATION = """start with person = carol
+    import lib with who = alice
+    process main
+        call helper from lib
+        command1 &person
+    end
+end
+"""
+
+def testCompileStringNeverTouchesTheDisk(monkeypatch):
+    """ compileString() compiles code and its imports from strings, without opening any file"""
+    session = Session(loadLanguage, exportImports=False, moduleCache=False)
+    def noFiles(*args, **kwargs):
+        raise AssertionError("a file was opened: " + str(args[0]))
+    for module in (builtins, io, os):
+        monkeypatch.setattr(module, "open", noFiles)
+    result = compileString(APPLICATION, name="app", importResolver={"lib": LIBRARY}, session=session, plain=True)
+    monkeypatch.undo()
+    commands = result.data["execute"]["commands"]
+    assert commands[0]["commands"][0]["commands"] == "send alice"
+    assert commands[1]["commands"] == "command1 carol"
+    assert json.loads(json.dumps(result.data)) == result.data
+
+def testCompileStringErrorsKeepTheProcessRunning():
+    """ Errors of compileString() are raised as CompileError, and the next call compiles normally with the same default session"""
+    with pytest.raises(CompileError, match="nowhere") as error:
+        compileString(SEMANTIC_ERROR, name="first")
+    assert error.value.file == "first.bpmml"
+    with pytest.raises(CompileError) as error:
+        compileString(APPLICATION)
+    assert "lib" in error.value.message
+    result = compileString(WARNING, args={"&missing": "found"})
+    assert result.data["execute"]["commands"][0]["commands"] == "command1 found"
+    assert result.warnings == []
@@ -0,0 +1,16 @@
+"""
+Tests of make.py (only recompiling the code files that changed).
+"""
+from console import arguments
+from batch import compileBatch
+from conftest import argumentFile, exportedCommand
+
+def testGlobalArgumentsAreNotRecorded(tmp_path, argumentFiles):
+    """ Code files made one after the other never see the global arguments of the previous ones, so no stale json file is recorded as up to date"""
+    options = arguments(["--make", "--module-cache", str(tmp_path / "cache")] + argumentFiles)
+    assert [result[1] for result in compileBatch(argumentFiles, options)] == ["compiled", "compiled"]
+    assert [result[1] for result in compileBatch(argumentFiles, options)] == ["up to date", "up to date"]
+    argumentFile(tmp_path, "one", "value_edited")
+    assert [result[1] for result in compileBatch(argumentFiles, options)] == ["compiled", "up to date"]
+    assert exportedCommand(tmp_path, "one") == "command1 value_edited"
+    assert exportedCommand(tmp_path, "two") == "command1 value_two"
@@ -0,0 +1,47 @@
+"""
+Tests of the cache of the compiled imports (see cache.py and --module-cache).
+"""
+from conftest import codeFile, compileFiles, exportedJSON
+
+LEAF = """start
+    process leaf
+        command1 {value}
+    end
+end
+"""
+
+MIDDLE = """start
+    import leaf
+    process middle
+        call leaf from leaf
+    end
+end
+"""
+
+TOP = """start
+    import middle
+    process main
+        call middle from middle
+    end
+end
+"""
+
+def leafCommand(folder):
+    """ Return the command of the leaf process as called (through the middle process) by the "main" process of the exported top file"""
+    middle = exportedJSON(folder, "top")["execute"]["commands"][0]
+    return middle["commands"][0]["commands"][0]["commands"]
+
+def testCachedImportFollowsItsImports(tmp_path):
+    """ A cached import is recompiled when one of its own imports changes, even though the import itself did not"""
+    cache = str(tmp_path / "cache")
+    codeFile(tmp_path, "leaf", LEAF.format(value="before"))
+    codeFile(tmp_path, "middle", MIDDLE)
+    top = codeFile(tmp_path, "top", TOP)
+    compileFiles(["--module-cache", cache, top])
+    assert leafCommand(tmp_path) == "command1 before"
+    assert any((tmp_path / "cache").iterdir())
+    compileFiles(["--module-cache", cache, top])
+    assert leafCommand(tmp_path) == "command1 before"
+    codeFile(tmp_path, "leaf", LEAF.format(value="after"))
+    compileFiles(["--module-cache", cache, top])
+    assert leafCommand(tmp_path) == "command1 after"
@@ -0,0 +1,37 @@
+"""
+Tests of the nodes of the compiled data (see nodes.py).
+"""
+import copy
+import json
+import pytest
+from library import compileFile
+from roster import plainData, jsonDefault
+from toolset import Toolset
+from nodes import Node, CommandNode, nodeType, copyStep
+
+def testNodesBehaveLikeTheirDicts():
+    """ Every node of compiled data reads like the dict of its json form, and the data is written like its plain form"""
+    data = compileFile("example.bpmml").data
+    nodes = list(Toolset(data, {}).walk(users=True))
+    assert {type(node).__name__ for node in nodes} >= {"CommandNode", "ProcessNode", "UserNode"}
+    for node in nodes:
+        form = node.toData()
+        assert node == form and dict(node.items()) == form and list(node) == list(form) and len(node) == len(form)
+        assert all(node[key] is form[key] and key in node for key in form)
+        assert node.get("missing", "default") == "default" and "missing" not in node
+        if "type" in form:
+            assert nodeType(node) == nodeType(form) == form["type"]
+    assert json.dumps(data, default=jsonDefault) == json.dumps(plainData(copy.deepcopy(data)))
+
+def testCopiesAndChanges():
+    """ Copies (of nodes and dicts alike) change only the copy, and keys outside the json form cannot be set"""
+    node = CommandNode(3, "command1 value")
+    changed = copyStep(node, commands="command2 value")
+    assert isinstance(changed, Node) and changed["commands"] == "command2 value" and node["commands"] == "command1 value"
+    assert copyStep(node.toData(), line=4) == {"type": "singleCommand", "line": 4, "commands": "command1 value"}
+    node["line"] = 5
+    assert node.toData() == {"type": "singleCommand", "line": 5, "commands": "command1 value"}
+    with pytest.raises(KeyError):
+        node["unknown"] = 1
+    with pytest.raises(TypeError):
+        hash(node)
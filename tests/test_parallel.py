@@ -0,0 +1,57 @@
+"""
+Tests of the parallel reduction of the global processes (see parallel.py and --reduce-jobs).
+"""
+import os
+import parallel
+from string import ascii_lowercase
+from conftest import codeFile, compileFiles
+
+def modelCode(depth):
+    """ Return a code file with enough processes for the workers, reduced in waves: bases, middles and deep (calling bases, deep with depth nested processes), then tops (calling all of them)"""
+    lines = ["start"]
+    for letter in ascii_lowercase[:20]:
+        lines += ["    process base" + letter, "        command1 base " + letter, "    end"]
+    for index, letter in enumerate(ascii_lowercase[:20]):
+        lines += ["    process middle" + letter, "        call base" + letter, "        call base" + ascii_lowercase[(index + 1) % 20], "    end"]
+    lines += ["    process deep", "        call basea"]
+    for level in range(depth):
+        lines += ["process nested" + "".join(ascii_lowercase[int(digit)] for digit in str(level)), "command1 level " + str(level)]
+    lines += ["end"] * depth + ["    end"]
+    for letter in ascii_lowercase[:20]:
+        lines += ["    process top" + letter, "        call deep", "        call middle" + letter, "        call basea", "    end"]
+    lines += ["    process main", "        call topa", "        call middleb", "    end", "end"]
+    return "\n".join(lines) + "\n"
+
+def reducedHere(monkeypatch):
+    """ Count the processes reduced by this process instead of the workers and return the counter (a list of their reductions)"""
+    parent = os.getpid()
+    reductions = []
+    class CountingReduceTree(parallel.ReduceTree):
+        def transform(self, tree):
+            if os.getpid() == parent:
+                reductions.append(tree)
+            return super().transform(tree)
+    monkeypatch.setattr(parallel, "ReduceTree", CountingReduceTree)
+    return reductions
+
+def compiledBytes(folder, code, argv):
+    """ Compile a code file in a new folder and return the bytes of its json file"""
+    folder.mkdir()
+    compileFiles(argv + [codeFile(folder, "model", code)])
+    return (folder / "model.json").read_bytes()
+
+def testParallelMatchesSerial(tmp_path, monkeypatch):
+    """ The workers reduce every wave and the json file is the same as the serial one, processes called across waves included"""
+    code = modelCode(3)
+    serial = compiledBytes(tmp_path / "serial", code, [])
+    reductions = reducedHere(monkeypatch)
+    assert compiledBytes(tmp_path / "parallel", code, ["--reduce-jobs", "2"]) == serial
+    assert len(reductions) == 1 # only "main", its wave is smaller than the number of workers
+
+def testTooDeepFallsBackToSerial(tmp_path, monkeypatch):
+    """ A process nested too deeply to be pickled makes the rest of the processes be reduced serially, with the same json file"""
+    code = modelCode(300)
+    serial = compiledBytes(tmp_path / "serial", code, [])
+    reductions = reducedHere(monkeypatch)
+    assert compiledBytes(tmp_path / "parallel", code, ["--reduce-jobs", "2"]) == serial
+    assert len(reductions) == 42 # the bases are reduced by the workers, the rest (20 middles, deep, 20 tops and main) serially
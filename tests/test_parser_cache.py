@@ -0,0 +1,33 @@
+"""
+Tests of the cached parser of the BPMML language (see compiler.loadLanguage()).
+"""
+from pathlib import Path
+import pytest
+from lark import UnexpectedInput
+from compiler import loadLanguage, parserCachePath, CACHE_PATH
+from conftest import ROOT
+
+CODE = "start\n    process main\n        {command} x\n    end\nend\n"
+
+def testParserCacheRebuiltOnGrammarChange(tmp_path):
+    """ Editing the language file makes loadLanguage() build (and cache) a new parser of the edited grammar and remove the stale cached one"""
+    language = tmp_path / "cachetest.lark"
+    grammar = (ROOT / "language.lark").read_text(encoding="utf-8")
+    language.write_text(grammar, encoding="utf-8")
+    try:
+        first = parserCachePath(str(language))
+        parser = loadLanguage(str(language))[0]
+        assert Path(first).is_file()
+        parser.parse(CODE.format(command="command1"))
+        language.write_text(grammar.replace('"command1"', '"commandone"'), encoding="utf-8")
+        second = parserCachePath(str(language))
+        assert second != first
+        parser = loadLanguage(str(language))[0]
+        assert Path(second).is_file() and not Path(first).exists()
+        parser.parse(CODE.format(command="commandone"))
+        with pytest.raises(UnexpectedInput):
+            parser.parse(CODE.format(command="command1"))
+        assert loadLanguage(str(language))[0].parse(CODE.format(command="commandone")) # served from the cache
+    finally:
+        for cached in Path(CACHE_PATH).glob("cachetest-*.lark"):
+            cached.unlink()
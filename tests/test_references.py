@@ -0,0 +1,60 @@
+"""
+Tests of the reference-based output (see references.py and --references).
+"""
+import json
+from conftest import codeFile, compileFiles, exportedJSON
+from library import compileString
+from references import referenceData, expandReferences
+
+LIBRARY = """start with who = bob
+    process helper
+        send &who
+    end
+    process main
+        call helper
+    end
+end
+"""
+
+APPLICATION = """start
+    import lib with who = alice
+    import lib as other
+    process shared
+        command1 shared
+    end
+    process first
+        call shared
+        call helper from lib
+    end
+    process main
+        call shared
+        call first
+        call helper from lib
+        from other call helper
+        from other call helper
+    end
+end
+"""
+
+def testReferencesExpandToCompiledData():
+    """ Expanding the reference-based data gives back the compiled data, for processes called from many places and for different processes with the same key"""
+    data = compileString(APPLICATION, name="app", importResolver={"lib": LIBRARY}, plain=True).data
+    referenced = referenceData(data)
+    table = referenced["processTable"]
+    assert sorted(table) == ["app.bpmml:first", "app.bpmml:shared", "lib.bpmml:helper", "lib.bpmml:helper#2"]
+    assert sorted(table[key]["commands"][0]["commands"] for key in ("lib.bpmml:helper", "lib.bpmml:helper#2")) == ["send alice", "send bob"]
+    assert [command["ref"] for command in referenced["execute"]["commands"]] == ["app.bpmml:shared", "app.bpmml:first", "lib.bpmml:helper", "lib.bpmml:helper#2", "lib.bpmml:helper#2"]
+    expanded = expandReferences(referenced)
+    assert expanded == data
+    assert json.dumps(expanded) == json.dumps(data)
+
+def testExportedReferencesExpandToDefaultOutput(tmp_path):
+    """ The json file exported with --references expands to the one exported without it"""
+    codeFile(tmp_path, "lib", LIBRARY)
+    application = codeFile(tmp_path, "app", APPLICATION)
+    compileFiles([application])
+    default = exportedJSON(tmp_path, "app")
+    compileFiles(["--references", application])
+    referenced = exportedJSON(tmp_path, "app")
+    assert "processTable" in referenced
+    assert expandReferences(referenced) == default
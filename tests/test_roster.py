@@ -0,0 +1,53 @@
+"""
+Tests of the hashed roster of the users of a process (see roster.py).
+"""
+import json
+import random
+from nodes import UserNode
+from roster import UserRoster, userKey, jsonDefault, plainData
+
+def user(name, line=None):
+    """ Return a user of the same division, department and position named name"""
+    return UserNode("div", "dep", "pos", name, line)
+
+def testRosterBehavesLikeList():
+    """ Adds, removes and snapshots give the users the list of users they replace would have, across rebuilds of the base"""
+    rng = random.Random(0)
+    names = ["user" + letter for letter in "abcdefghijklmnop"]
+    initial = [user(name) for name in names[:6]] + [user(names[0], 7)] # a duplicate of the first user (another line)
+    roster = UserRoster(initial)
+    users = list(initial)
+    snapshots = []
+    for _ in range(2000):
+        current = user(rng.choice(names), rng.randint(1, 50))
+        present = any(userKey(other) == userKey(current) for other in users)
+        if rng.random() < 0.5:
+            assert roster.add(current) is not present
+            if not present:
+                users.append(current)
+        else:
+            assert roster.remove(current) is present
+            if present:
+                users.remove(next(other for other in users if userKey(other) == userKey(current)))
+        assert (current in roster) == any(userKey(other) == userKey(current) for other in users)
+        assert len(roster) == len(users)
+        if rng.random() < 0.2:
+            snapshots.append((roster.snapshot(), [userKey(other) + (other.line,) for other in users]))
+    for snapshot, expected in snapshots:
+        assert [userKey(other) + (other.line,) for other in snapshot.toList()] == expected
+        assert len(snapshot) == len(expected)
+
+def testSnapshotsAreSharedAndExportedAsLists():
+    """ Snapshots without changes in between are the same object, and they are written (and converted) as lists of users"""
+    roster = UserRoster([user("usera")])
+    first = roster.snapshot()
+    assert roster.snapshot() is first
+    roster.add(user("userb"))
+    second = roster.snapshot()
+    assert second is not first and first == [user("usera")] and len(second) == 2
+    data = {"currentUsers": [first, second, second]}
+    written = json.loads(json.dumps(data, default=jsonDefault))
+    assert [[other["name"] for other in users] for users in written["currentUsers"]] == [["usera"], ["usera", "userb"], ["usera", "userb"]]
+    plainData(data)
+    assert data["currentUsers"][1] is data["currentUsers"][2] # a shared snapshot stays shared
+    assert json.loads(json.dumps(data)) == written
@@ -0,0 +1,23 @@
+"""
+Tests of server.py (the local JSON-RPC compile server).
+"""
+import io
+import json
+import pytest
+from console import arguments
+from server import CompileServer, serve
+
+@pytest.mark.parametrize("params", [["example.bpmml"], "example.bpmml", 3, None])
+def testParamsMustBeAnObject(params):
+    """ Params that are not an object are answered with an invalid params error, and the server keeps serving"""
+    requests = [{"jsonrpc": "2.0", "id": 1, "method": "compile", "params": params}, {"jsonrpc": "2.0", "id": 2, "method": "stats"}]
+    outstream = io.StringIO()
+    serve(arguments(["--server"]), io.StringIO("".join(json.dumps(request) + "\n" for request in requests)), outstream)
+    first, second = [json.loads(line) for line in outstream.getvalue().splitlines()]
+    assert first["id"] == 1 and first["error"]["code"] == -32602
+    assert second["id"] == 2 and "result" in second
+
+def testFileMustBeAString():
+    """ A compile request whose file is not a string is answered with an invalid params error"""
+    response = CompileServer(arguments(["--server"])).handle(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "compile", "params": {"file": ["example.bpmml"]}}))
+    assert response["error"]["code"] == -32602
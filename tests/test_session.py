@@ -0,0 +1,47 @@
+"""
+Tests of the state shared by every compilation of a run (see session.py).
+"""
+from conftest import codeFile, compileFiles, exportedJSON
+
+LEAF = """start
+    process leaf
+        command1 leaf
+    end
+end
+"""
+
+MIDDLE = """start
+    import leaf
+    process middle
+        call leaf from leaf
+    end
+end
+"""
+
+TOP = """start
+    import middle
+    import leaf
+    process main
+        call middle from middle
+        call leaf from leaf
+    end
+end
+"""
+
+def testImportsShareOneParser(tmp_path, monkeypatch):
+    """ The language is loaded once per run, however many code files are imported"""
+    import batch
+    import compiler
+    load = compiler.loadLanguage
+    loads = []
+    def loader(*args, **kwargs):
+        loads.append(args)
+        return load(*args, **kwargs)
+    monkeypatch.setattr(batch, "loadLanguage", loader)
+    monkeypatch.setattr(compiler, "loadLanguage", loader)
+    codeFile(tmp_path, "leaf", LEAF)
+    codeFile(tmp_path, "middle", MIDDLE)
+    compileFiles([codeFile(tmp_path, "top", TOP)])
+    assert len(loads) == 1
+    commands = exportedJSON(tmp_path, "top")["execute"]["commands"]
+    assert [command["name"] for command in commands] == ["middle", "leaf"]
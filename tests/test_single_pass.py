@@ -0,0 +1,57 @@
+"""
+Tests of the single pass mode, which reduces the processes while parsing (see --single-pass and transformer.InlineReduceTree()).
+"""
+from conftest import codeFile, compileFiles
+
+LIBRARY = """start with who = bob
+    process helper
+        users
+            (div, dep, pos) &who
+        end
+        send &who
+    end
+    process _quiet
+        command1 quiet
+    end
+    process main
+        command1 lib_main
+        call helper
+    end
+end
+"""
+
+APPLICATION = """start with person = alice
+    import lib with who = &person
+    import lib as other
+    process local
+        command2 local &person
+    end
+    process main
+        users
+            (d, e, f) Some One
+        end
+        call local
+        call helper from lib
+        from other call _quiet
+        call lib
+        change users
+            add (a, b, c) New Person
+            remove (d, e, f) Some One
+        end
+    end
+end
+"""
+
+def compiledFolder(folder, argv):
+    """ Compile the application and its library in a folder and return the bytes of every exported json file by name"""
+    folder.mkdir()
+    codeFile(folder, "lib", LIBRARY)
+    compileFiles(argv + [codeFile(folder, "app", APPLICATION)])
+    return {path.name: path.read_bytes() for path in folder.glob("*.json")}
+
+def testSinglePassMatchesTreeReduction(tmp_path):
+    """ Reducing while parsing exports the same json files as reducing the tree"""
+    tree = compiledFolder(tmp_path / "tree", [])
+    singlePass = compiledFolder(tmp_path / "single", ["--single-pass"])
+    assert sorted(tree) == ["app.json", "lib.json"]
+    assert singlePass == tree
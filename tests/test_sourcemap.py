@@ -0,0 +1,67 @@
+"""
+Tests of the source maps (see sourcemap.py and --source-map).
+"""
+import json
+import pytest
+from conftest import codeFile, compileFiles, exportedJSON
+from sourcemap import restorePositions, mapPath
+
+LIBRARY = """start with who = bob
+    process helper
+        users
+            (div, dep, pos) &who
+        end
+        send &who
+    end
+    process main
+        command1 lib_main
+        call helper
+    end
+end
+"""
+
+APPLICATION = """start
+    import lib with who = alice
+    process local
+        command2 local
+        parallel
+            command1 first
+            command1 second
+        end
+    end
+    process main
+        call local
+        call helper from lib
+        call lib
+    end
+end
+"""
+
+def compiledFolder(folder, argv):
+    """ Compile the application and its library in a folder and return the path of the json file of the application"""
+    folder.mkdir()
+    codeFile(folder, "lib", LIBRARY)
+    compileFiles(argv + [codeFile(folder, "app", APPLICATION)])
+    return folder / "app.json"
+
+def testSourceMapRestoresDefaultOutput(tmp_path):
+    """ The json file exported with --source-map, with the positions of its source map put back, is the default json file"""
+    default = compiledFolder(tmp_path / "default", []).read_text(encoding="utf-8")
+    mapped = compiledFolder(tmp_path / "mapped", ["--source-map"])
+    data = json.loads(mapped.read_text(encoding="utf-8"))
+    assert '"line"' not in mapped.read_text(encoding="utf-8")
+    sourceMap = json.loads(open(mapPath(mapped), encoding="utf-8").read())
+    assert sourceMap["output"] == "app.json"
+    assert json.dumps(restorePositions(data, sourceMap)) == json.dumps(json.loads(default))
+
+def testForeignSourceMapIsRejected(tmp_path):
+    """ The source map of another json file raises ValueError"""
+    mapped = compiledFolder(tmp_path / "mapped", ["--source-map"])
+    data = exportedJSON(mapped.parent, "app")
+    libraryMap = json.loads(open(mapPath(mapped.parent / "lib.json"), encoding="utf-8").read())
+    with pytest.raises(ValueError, match="does not belong"):
+        restorePositions(data, libraryMap)
+    libraryData = exportedJSON(mapped.parent, "lib")
+    applicationMap = json.loads(open(mapPath(mapped), encoding="utf-8").read())
+    with pytest.raises(ValueError, match="does not belong"):
+        restorePositions(libraryData, applicationMap)
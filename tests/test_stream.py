@@ -0,0 +1,85 @@
+"""
+Tests of the streaming compilation (see stream.py and --stream).
+"""
+import pytest
+from conftest import codeFile
+from console import Console
+from compiler import compileCode, loadLanguage
+from session import Session
+from stream import streamCode
+
+LIBRARY = """start with who = bob
+    process helper
+        users
+            (div, dep, pos) &who
+        end
+        send &who
+    end
+    process main
+        command1 lib_main
+        call helper
+    end
+end
+"""
+
+APPLICATION = """start with person = alice
+    import lib with who = &person
+    process first
+        command1 first &person
+    end
+    process second
+        call first
+        call helper from lib
+        command2 &missing
+    end
+{middle}
+    process third
+        parallel
+            command1 one
+            call second
+        end
+    end
+    process main
+        call third
+        call lib
+    end
+end
+"""
+
+MIDDLES = {
+    "valid": "",
+    "called below": "    process caller\n        call third\n    end\n",
+    "same name": "    process first\n        command1 again\n    end\n",
+    "syntax error": "    process broken\n        users\n            (div, dep) Nobody\n        end\n    end\n"
+}
+
+def compiled(folder, middle, stream, capsys, pretty=False):
+    """ Compile the application (with a middle process) in a new folder and return a turple of (bytes of every exported json file by name, printed output, exit code or None)"""
+    folder.mkdir()
+    codeFile(folder, "lib", LIBRARY)
+    application = codeFile(folder, "app", APPLICATION.format(middle=middle))
+    console = Console(logdir=str(folder), open_for="w")
+    session = Session(loadLanguage)
+    capsys.readouterr()
+    code = None
+    try:
+        if stream:
+            streamCode(application, console=console, pretty=pretty, session=session)
+        else:
+            compileCode(application, console=console, pretty=pretty, session=session)
+    except SystemExit as exit:
+        code = exit.code
+    finally:
+        console.closeLog()
+    output = capsys.readouterr().out.replace(str(folder), "<folder>")
+    return {path.name: path.read_bytes() for path in folder.glob("*.json")}, output, code
+
+@pytest.mark.parametrize("middle", MIDDLES)
+@pytest.mark.parametrize("pretty", [False, True])
+def testStreamMatchesCompilation(tmp_path, capsys, middle, pretty):
+    """ Streaming exports the same json file and prints the same messages as a normal compilation, errors in the middle of the code file included"""
+    normal = compiled(tmp_path / "normal", MIDDLES[middle], False, capsys, pretty)
+    streamed = compiled(tmp_path / "streamed", MIDDLES[middle], True, capsys, pretty)
+    assert streamed == normal
+    assert sorted(normal[0]) == {"valid": ["app.json", "lib.json"], "called below": ["lib.json"], "same name": ["lib.json"], "syntax error": []}[middle]
+    assert ("&missing" in normal[1]) == (middle in ("valid", "called below")) # errors found before the processes are reduced come before their warnings
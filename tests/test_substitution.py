@@ -0,0 +1,48 @@
+"""
+Tests of the substitution of the global arguments (see substitution.py).
+"""
+from substitution import ArgumentSubstitution
+from library import compileString
+from compiler import loadLanguage
+from session import Session
+
+def testSubstituteReferences():
+    """ Every reference of a string is substituted in one pass, next to punctuation too, and missing references are returned as they are"""
+    engine = ArgumentSubstitution({"&first": "one", "&second": "two", "#first": 1})
+    assert engine.substitute("no references") == ("no references", ())
+    assert engine.substitute("&first&second (&first), &missing!") == ("onetwo (one), &missing!", ("&missing",))
+    assert engine.substitute("&missing") == ("&missing", ("&missing",))
+
+def testMemoFollowsNewArguments():
+    """ Arguments added after a string was substituted are substituted the next time"""
+    globalArgs = {"&first": "one"}
+    engine = ArgumentSubstitution(globalArgs)
+    assert engine.substitute("&first &later") == ("one &later", ("&later",))
+    globalArgs["&later"] = "two"
+    assert engine.substitute("&first &later") == ("one two", ())
+
+CODE = """start with first = one, second = &first two, third = &second
+    process helper
+        users
+            (div, dep, pos) &first
+        end
+        send &first&second
+    end
+    process main
+        command1 (&third) &missing
+        call helper
+    end
+end
+"""
+
+def testCompiledArguments():
+    """ Chained arguments, several references in a token and missing references compile the same way in tree and single pass mode"""
+    results = [compileString(CODE, session=Session(loadLanguage, exportImports=False, moduleCache=False, singlePass=singlePass), plain=True) for singlePass in (False, True)]
+    data = results[0].data
+    commands = data["execute"]["commands"]
+    assert commands[0]["commands"] == "command1 (one two) &missing"
+    assert commands[1]["commands"][0]["commands"] == "send oneone two"
+    assert commands[1]["users"][0]["name"] == "one"
+    assert [warning["line"] for warning in results[0].warnings] == [9]
+    assert results[1].data == data
+    assert results[1].warnings == results[0].warnings
@@ -0,0 +1,19 @@
+"""
+Tests of toolset.py (the tools of BPMML SCRIPT commands).
+"""
+import copy
+from library import compileFile
+from roster import plainData
+from toolset import Toolset
+from nodes import Node
+
+def testWalkNodesLikeDicts():
+    """ Walking compiled data as nodes gives the same steps, in the same order, as walking its plain dicts, and every one of them is valid"""
+    data = compileFile("example.bpmml").data
+    plain = plainData(copy.deepcopy(data))
+    nodes = list(Toolset(data, {}).walk(users=True))
+    dicts = list(Toolset(plain, {}).walk(users=True))
+    assert nodes and all(isinstance(step, Node) for step in nodes)
+    assert [step.toData() for step in nodes] == dicts
+    toolset = Toolset(data, {})
+    assert all(toolset.isStep(step) or toolset.isUser(step) for step in nodes)
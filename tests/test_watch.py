@@ -0,0 +1,30 @@
+"""
+Tests of watch.py (recompiling code files as soon as they change).
+"""
+import watch
+from console import arguments
+from conftest import argumentFile, exportedCommand
+
+def testEditedGlobalArgument(tmp_path, argumentFiles):
+    """ A recompiled code file gets its edited global arguments, not the ones of its previous compilation"""
+    one = argumentFiles[0]
+    watcher = watch.Watcher([one], arguments([one]))
+    assert watcher.poll() == [one]
+    argumentFile(tmp_path, "one", "value_EDITED")
+    assert watcher.poll() == [one]
+    assert exportedCommand(tmp_path, "one") == "command1 value_EDITED"
+
+def testUnexpectedExceptionKeepsWatching(tmp_path, argumentFiles, monkeypatch, capsys):
+    """ An unexpected exception of one compilation is reported and the next code files are still compiled"""
+    one, two = argumentFiles
+    compileCode = watch.compileCode
+    def failOne(codefile, **kwargs):
+        if codefile == one:
+            raise ValueError("broken")
+        return compileCode(codefile, **kwargs)
+    monkeypatch.setattr(watch, "compileCode", failOne)
+    watcher = watch.Watcher(argumentFiles, arguments(argumentFiles))
+    assert watcher.poll() == argumentFiles
+    assert "Unexpected ValueError: broken" in capsys.readouterr().out
+    assert not (tmp_path / "one.json").exists()
+    assert exportedCommand(tmp_path, "two") == "command1 value_two"
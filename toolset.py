@@ -1,7 +1,18 @@
 """
+Imports:
+  from nodes import Node, CommandNode, UserNode, ProcessNode, ParallelNode, ConditionNode, ChangeUsersNode
+  from roster import UserSnapshot
+  from jsonio import loadJSON
+  from binary import readBinary, isBinary
+
 Classes:
   Toolset() -- tools to edit BPMML's json output.
 """
+from nodes import Node, CommandNode, UserNode, ProcessNode, ParallelNode, ConditionNode, ChangeUsersNode
+from roster import UserSnapshot
+from jsonio import loadJSON
+from binary import readBinary, isBinary
+
 class Toolset():
     """ 
     Use pre-made methods to manually edit the BPMML's json output file (using Python 3.x).
@@ -17,12 +28,14 @@ class Toolset():
 
     Public Methods:
       __init__(self, root, glabalArgs)
+      fromFile(cls, path, globalArgs=None) (class method)
       add(self, command, data, block='commands', pos='')
       isChangeUsers(self, change)
       isCommand(self, command)
       isConditional(self, conditional)
       isParallel(self, parallel)
       isProcess(self, process)
+      isStep(self, step)
       isUser(self, user)
       newChangeUsers(self, users=[])
       newCommand(self, command, cmdstring)
@@ -32,12 +45,18 @@ class Toolset():
       newUser(self, name, div='General Division', dep='General Department', pos='General Position')
       pop(self, item, data, block='commands')
       search(self, command, data)
+      walk(self, steps=None, users=False)
 
-    Note:
+    Notes:
+      The is...() methods also accept the nodes of compiled data (see nodes.py), which are checked by their class instead of their keys.
+      walk() and isStep() read the attributes of nodes directly (never through their dict form), so compiled data is walked faster as nodes than as plain dicts.
       Code is still in develpment which could be dropped as manually editting the json file is not recommended.
     """
 
     _CMD_LIST = ("command1", "command2", "command3", "compose", "sign", "send", "receive", "archive", "execute")
+    _STEP_KEYS = ("commands", "try", "yes", "no")
+    _CHECKS = {CommandNode: "isCommand", ParallelNode: "isParallel", ConditionNode: "isConditional", ChangeUsersNode: "isChangeUsers", ProcessNode: "isProcess",
+               "singleCommand": "isCommand", "parallelSteps": "isParallel", "conditionSteps": "isConditional", "changeUsers": "isChangeUsers", "process": "isProcess"}
     def __init__(self, root, globalArgs):
         """Intialise Toolset object""" 
         self.ROOT = root
@@ -45,6 +64,26 @@ class Toolset():
         self.GLOBAL_PROCS = root["globalProcesses"]
         self.MAIN = root["execute"]
 
+    @classmethod
+    def fromFile(cls, path, globalArgs=None):
+        """
+        Return a new Toolset object for an exported json file or binary file (see binary.py).
+
+        Arguments:
+          path -- string containing the path of the json file (.json) or binary file (.bpmb)
+          globalArgs -- (optional) dict containing the name (key) and value (value) of every BPMML Global Argument. Defaults to none
+
+        Exceptions:
+          ValueError if the file is neither valid json nor a valid binary file (json.JSONDecodeError is a ValueError)
+        """
+        if isBinary(path):
+            with open(path, "rb") as stream:
+                root = readBinary(stream)
+        else:
+            with open(path, encoding="utf-8") as stream:
+                root = loadJSON(stream)
+        return cls(root, dict(globalArgs or {}))
+
     def isCommand(self, command):
         """
         Check if a dict is a valid "command" element and return True/False depending on the result.
@@ -59,6 +98,8 @@ class Toolset():
         Note:
           TypeErrors of the command argument is automatically handled.
         """
+        if isinstance(command, CommandNode):
+            return isinstance(command.commands, str)
         if isinstance(command, dict):
             if "type" in command.keys():
                 if command["type"] == "singleCommand" and isinstance(command["commands"], str):
@@ -79,6 +120,8 @@ class Toolset():
         Note:
           TypeErrors of the user argument is automatically handled.
         """
+        if isinstance(user, UserNode):
+            return isinstance(user.div, str) and isinstance(user.dep, str) and isinstance(user.pos, str) and isinstance(user.name, str)
         if isinstance(user, dict):
             if "div" in user.keys() and "dep" in user.keys() and "pos" in user.keys() and "name" in user.keys():
                 if isinstance(user["div"], str) and isinstance(user["dep"], str) and isinstance(user["pos"], str) and isinstance(user["name"], str):
@@ -99,6 +142,8 @@ class Toolset():
         Note:
           TypeErrors of the process argument is automatically handled.
         """
+        if isinstance(process, ProcessNode):
+            return process.visible in ("True", "False") and isinstance(process.name, str) and isinstance(process.file, str) and isinstance(process.users, list) and isinstance(process.commands, list)
         if isinstance(process, dict):
             if "type" in process.keys() and "name" in process.keys() and "file" in process.keys() and "visible" in process.keys() and "users" in process.keys() and "commands" in process.keys():
                 if process["type"] == "process" and process["visible"] in ("True", "False") and isinstance(process["name"], str) and isinstance(process["file"], str) and isinstance(process["users"], list) and isinstance(process["commands"], list):
@@ -119,6 +164,8 @@ class Toolset():
         Note:
           TypeErrors of the parallel argument is automatically handled.
         """
+        if isinstance(parallel, ParallelNode):
+            return isinstance(parallel.commands, list)
         if isinstance(parallel, dict):
             if "type" in parallel.keys() and "commands" in parallel.keys():
                 if parallel["type"] == "parallelSteps" and isinstance(parallel["commands"], list):
@@ -139,6 +186,8 @@ class Toolset():
         Note:
           TypeErrors of the conditional argument is automatically handled.
         """
+        if isinstance(conditional, ConditionNode):
+            return isinstance(conditional.condition, str) and isinstance(conditional.tryCommands, list) and isinstance(conditional.yes, list) and isinstance(conditional.no, list)
         if isinstance(conditional, dict):
             if "type" in conditional.keys() and "condition" in conditional.keys() and "try" in conditional.keys() and "yes" in conditional.keys() and "no" in conditional.keys():
                 if conditional["type"] == "conditionSteps" and isinstance(conditional["condition"], str) and isinstance(conditional["try"], list) and isinstance(conditional["yes"], list) and isinstance(conditional["no"], list):
@@ -159,12 +208,65 @@ class Toolset():
         Note:
           TypeErrors of the change argument is automatically handled.
         """
+        if isinstance(change, ChangeUsersNode):
+            return isinstance(change.add, list) and isinstance(change.remove, list) and isinstance(change.currentUsers, (list, UserSnapshot))
         if isinstance(change, dict):
             if "type" in change.keys() and "add" in change.keys() and "remove" in change.keys() and "currentUsers" in change.keys():
                 if change["type"] == "changeUsers" and isinstance(change["add"], list) and isinstance(change["remove"], list) and isinstance(change["currentUsers"], list):
                     return True
         return False
 
+    def isStep(self, step):
+        """
+        Check if a dict is a valid element of any kind of step ("command", "parallel", "conditional", "change users" or "process") and return True/False depending on the result.
+
+        Arguments:
+          step -- dict containing a potential step element
+
+        Return:
+          True if step argument is a valid element of its "type"
+          False otherwise
+
+        Note:
+          Only the is...() method of the type of the step is called (nodes by their class, dicts by their "type").
+        """
+        check = self._CHECKS.get(type(step))
+        if check is None and isinstance(step, dict):
+            check = self._CHECKS.get(step.get("type"))
+        return check is not None and getattr(self, check)(step)
+
+    def walk(self, steps=None, users=False):
+        """
+        Iterate over every step nested within a list of steps (the steps themselves included), depth first and in order.
+
+        Arguments:
+          steps -- (optional) list containing steps (dicts or nodes). Defaults to None (the global processes and the "main" process)
+          users -- (optional) boolean containing True if the users of every process are also given (right after the process), False otherwise. Defaults to False
+
+        Note:
+          The nested steps of nodes are found through their attributes (see nodes.Node().STEPS), the ones of dicts through their "commands", "try", "yes" and "no" lists.
+          The "retry" and "abort" strings ending yes/no blocks are skipped, and so is anything that is neither a dict nor a node.
+        """
+        stack = list(reversed(steps if steps is not None else self.GLOBAL_PROCS + [self.MAIN]))
+        while stack:
+            step = stack.pop()
+            if isinstance(step, Node):
+                yield step
+                if users and isinstance(step, ProcessNode):
+                    yield from step.users
+                for attribute in reversed(step.STEPS):
+                    block = getattr(step, attribute)
+                    if block:
+                        stack.extend(reversed(block[:-1] if isinstance(block[-1], str) else block))
+            elif isinstance(step, dict):
+                yield step
+                if users and step.get("type") == "process" and isinstance(step.get("users"), list):
+                    yield from step["users"]
+                for key in reversed(self._STEP_KEYS):
+                    block = step.get(key)
+                    if isinstance(block, list) and block:
+                        stack.extend(reversed(block[:-1] if isinstance(block[-1], str) else block))
+
     def newCommand(self, command, cmdstring):
         """
         Create a new "command" element and return it.
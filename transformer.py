@@ -1,22 +1,33 @@
 """
 Imports:
   from lark import Tree,Transformer, Lark
+  from lark.exceptions import VisitError
   import json
   import time
   from pathlib import Path, PurePath
-  from console import Console
+  from console import Console, CompileError
+  from roster import UserRoster
+  from substitution import ArgumentSubstitution
+  from lazy import callTarget
+  from nodes import CommandNode, ParallelNode, ConditionNode, ChangeUsersNode, ProcessNode, UserNode, copyStep
   
 Classes:
   ReduceTree(Transformer) -- transform the grammar tree by reducing the nodes one by one bottom-up
+  InlineReduceTree(ReduceTree) -- reduce the grammar nodes while they are being parsed (single pass)
 
 Note:
   The Transformer Class handles the nodes of the tree by naming its methods after the grammar rules therefore writting a docstring for each one is needlessly repetitive.
 """
 from lark import Tree,Transformer, Lark
+from lark.exceptions import VisitError
 import json
 import time
 from pathlib import Path, PurePath
-from console import Console
+from console import Console, CompileError
+from roster import UserRoster
+from substitution import ArgumentSubstitution
+from lazy import callTarget
+from nodes import CommandNode, ParallelNode, ConditionNode, ChangeUsersNode, ProcessNode, UserNode, copyStep
 
 class ReduceTree(Transformer):
     """
@@ -26,81 +37,98 @@ class ReduceTree(Transformer):
       Transformer() is Parent class.
       Transformer class handles the nodes of the tree by naming its methods after the grammar rules.
       Those grammar methods will be excluded from the docstring but will be commented. Study their usage at https://lark-parser.readthedocs.io/en/latest/classes/
+      The nodes are reduced to node objects (see nodes.py), which are converted to the json schema only when the data is exported.
 
     Instance Variables:
       fileName -- string containing the name of the code file being compiled
       globalArgs -- dict containing the global arguments of the code file as pairs of (key)name - (value)value
-      readyProcessDict -- dict containing the already compiled global processes of the code file. Compiled global processes are dicts 
-      importedProcessDict -- dict containing the already compiled imported processes of the code file. Compiled imported processes are dicts
-      importedMainDict -- dict containing the already compiled imported main process of the code file. Compiled imported main process is a dict
+      readyProcessDict -- dict containing the already compiled global processes of the code file. Compiled global processes are ProcessNode() objects (see nodes.py)
+      importedProcessDict -- dict containing the already compiled imported processes of the code file. Compiled imported processes are ProcessNode() objects (or dicts, if a script edited them)
+      importedMainDict -- dict containing the already compiled imported main process of the code file. Compiled imported main process is a ProcessNode() object (or a dict)
       console -- Console() object used to print data/info
+      arguments -- ArgumentSubstitution() object substituting the global arguments (built once from globalArgs)
 
     Public Methods (excluding tree reduction):
       __init__(self, fileName, globalArgs, readyProcessDict, importedProcessDict, importedMainDict, console=Console())
       argumentCheck(self, data)
+      transform(self, tree)
     """
 
     def __init__(self, fileName, globalArgs, readyProcessDict, importedProcessDict, importedMainDict, console=Console()):
         """ Initialise """
         self.fileName = fileName
         self.globalArgs = globalArgs
+        self.arguments = ArgumentSubstitution(globalArgs)
         self.readyProcessDict = readyProcessDict
         self.importedProcessDict = importedProcessDict
         self.importedMainDict = importedMainDict
         self.console = console
-        super().__init__()
+        super().__init__(visit_tokens=False) #there are no token callbacks (InlineReduceTree() gets its ones from the parser as lexer callbacks), so tokens are not visited
+
+    def transform(self, tree):
+        """
+        Reduce a tree bottom-up and return the result of its root node (see Transformer.transform()).
+
+        Note:
+          The tree is walked with an explicit stack instead of recursion, so nesting (processes, parallel and try/check blocks) is not limited by the recursion limit.
+          A CompileError() (see console.py) raised while reducing is raised as it is, not wrapped in a VisitError() like the other exceptions.
+          Nodes are still reduced in the same order as Transformer() does (children left to right, before their parent), so messages are printed in the same order.
+        """
+        order = [] #every subtree, parents before children and the children of a parent from last to first
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(child for child in node.children if isinstance(child, Tree))
+        reduced = {}
+        try:
+            for node in reversed(order):
+                reduced[id(node)] = self._call_userfunc(node, [reduced.pop(id(child)) if isinstance(child, Tree) else child for child in node.children])
+        except VisitError as error:
+            if isinstance(error.orig_exc, CompileError): # errors of the compiler reach the caller as they are, not wrapped by lark
+                raise error.orig_exc from None
+            raise
+        return reduced[id(tree)]
 
     def argumentCheck(self, data):
-        """ Check if data contains an argument included in the globalArgs dict"""
-        ampersand = data.find('&')
-        if ampersand != -1:
-            if data[ampersand:] in self.globalArgs.keys():
-                return data[:ampersand] + self.globalArgs[data[ampersand:]]
-            else:
-                self.console.warning("You are using & without referencing a valid global argument. " + self.console.colorName(data[ampersand:]) + " will be printed as a string.", line=data.line)
-        return data
+        """ Substitute every global argument referenced in data (a token), warning about the references that are not global arguments"""
+        if "&" not in data:
+            return data
+        substituted, missing = self.arguments.substitute(data)
+        for reference in missing:
+            self.console.warning("You are using & without referencing a valid global argument. " + self.console.colorName(reference) + " will be printed as a string.", line=data.line)
+        return substituted
 
-    # if a command node is read, we transform the command subtree to a dictionary for later json conversion
+    # if a command node is read, we transform the command subtree to a CommandNode() for later json conversion
+    # only tokens containing "&" can reference global arguments, so the rest skip argumentCheck()
     def command(self, args):
-        command = ""
-        for token in args:
-            token = self.argumentCheck(token)
-            command += " " + token
-        return {"type":"singleCommand", "line":args[0].line, "commands":command.lstrip()}
+        argumentCheck = self.argumentCheck
+        command = " ".join([argumentCheck(token) if "&" in token else token for token in args])
+        return CommandNode(args[0].line, command.lstrip())
 
-    # if a user node is read, we transform the user subtree to a dictionary for later json conversion
+    # if a user node is read, we transform the user subtree to a UserNode() for later json conversion
     def user(self, args):
         div = self.argumentCheck(args[0]) #this is the division
         dep = self.argumentCheck(args[1]) #this is the department
         pos = self.argumentCheck(args[2]) #this is the position
-        name = ""
-        for token in args[3:]:
-            token = self.argumentCheck(token)
-            name+= " " + token
-        return {"div":div, "dep":dep, "pos":pos, "name":name.lstrip(), "line":args[0].line}
+        argumentCheck = self.argumentCheck
+        name = " ".join([argumentCheck(token) if "&" in token else token for token in args[3:]])
+        return UserNode(div, dep, pos, name.lstrip(), args[0].line)
 
 
     # if a steps node is read, we transform the steps subtree to a list. Note that we work bottom up so all the sub nodes are already transformed
     def steps(self, args):
         steps = []
         for token in args:
-            if str(token) != '\n' and str(token) != "continue": #discarding the line change character
+            if token != '\n' and token != "continue": #discarding the line change character
                 steps.append(token)
         return steps
 
     # if a callstep node is read (call command), we check the readyProcessList (which contains all the processes we already transformed) and
     # we transform the node by replacing it with the called process
     def callstep(self, args):
-        if args[0] == "call":
-            name = args[1]
-            if len(args) > 2:
-                parentName = args[3]
-        else:
-            name = args[3]
-            if len(args) > 2:
-                parentName = args[1]
-
-        if len(args) > 2:
+        name, parentName = callTarget(args)
+        if parentName is not None:
             if parentName[-6:] == ".bpmml":
                 parentName = parentName[:-6]
             if parentName not in self.importedProcessDict.keys():
@@ -115,69 +143,69 @@ class ReduceTree(Transformer):
         if name not in self.readyProcessDict.keys():
             if name in self.importedMainDict.keys():
                 if self.importedMainDict[name]:
-                    self.importedMainDict[name]["name"] = name
-                    return self.importedMainDict[name]
+                    # the imported processes are shared with the imported compilation, so the renamed "main" process is a copy
+                    return copyStep(self.importedMainDict[name], name=name)
                 else:
                     self.console.error("Import " + self.console.colorName(name) + " is not callable as it has no 'main' process", line=name.line)
             self.console.error("Process " + self.console.colorName(name) + " does not exist or is defined bellow the call", line=name.line)
-        if not self.readyProcessDict[name]["commands"]:
+        if not self.readyProcessDict[name].commands:
                 return '\n'
         return self.readyProcessDict[name]
 
-    # if a parallelstep node is read, we transform the parallelstep subtree to a dictionary.
+    # if a parallelstep node is read, we transform the parallelstep subtree to a ParallelNode().
     def parallelstep(self, args):
         # we need to check and return the first node that is not a linechange as we allow empty lines
         line = args[0].line + 1
         for data in args[2:-1]:
             line+=1
-            if str(data) != '\n':
+            if data != '\n':
                 for step in data:
-                    if step["type"] == "changeUsers": #changing users directly in a parallel block (no process) makes no sense therefore we print an error 
-                        self.console.error("You are changing users directly within a 'parallel' node.", line=step["line"]) 
-                return {"type":"parallelSteps", "line":args[0].line, "commands":data}
+                    if isinstance(step, ChangeUsersNode): #changing users directly in a parallel block (no process) makes no sense therefore we print an error 
+                        self.console.error("You are changing users directly within a 'parallel' node.", line=step.line) 
+                return ParallelNode(args[0].line, data)
 
     # if a yes node is read, we replace it with the already transform children as commands of the yes block (replace it with a dictionary)
     def yes(self, args):
         dataList = []
         for data in args[2:-1]:
-            if str(data) != '\n': 
-                if str(data) == "abort" or str(data) == "retry": #if the data is abort or retry we can return as those are always the last commands in a yes/no block
+            if data != '\n': 
+                if data == "abort" or data == "retry": #if the data is abort or retry we can return as those are always the last commands in a yes/no block
                     dataList.append(str(data))
                     return dataList
                 for step in data:
-                    if step["type"] == "changeUsers": #changing users directly in a yes block (no process) can cause instability so we don't allow it (might change code to allow it later)
-                        self.console.error("You are changing users directly within a 'yes' node. Use a process or change users afterwards", line=step["line"])
+                    if isinstance(step, ChangeUsersNode): #changing users directly in a yes block (no process) can cause instability so we don't allow it (might change code to allow it later)
+                        self.console.error("You are changing users directly within a 'yes' node. Use a process or change users afterwards", line=step.line)
                 dataList = data
         return dataList
     # the exact same code as yes trasformation, will beautify the code on a later date
     def no(self, args):
         dataList = []
         for data in args[2:-1]:
-            if str(data) != '\n': 
-                if str(data) == "abort" or str(data) == "retry":
+            if data != '\n': 
+                if data == "abort" or data == "retry":
                     dataList.append(str(data))
                     return dataList
                 for step in data:
-                    if step["type"] == "changeUsers":
-                        self.console.error("You are changing users directly within a 'yes' node. Use a process or change users afterwards", line=step["line"])
+                    if isinstance(step, ChangeUsersNode):
+                        self.console.error("You are changing users directly within a 'yes' node. Use a process or change users afterwards", line=step.line)
                 dataList = data
         return dataList
 
-    # if a checkstep node is read, we replace it with the dictionaries of the already transformed yes and no nodes and we also handle the try block 
+    # if a checkstep node is read, we replace it with a ConditionNode() of the already transformed yes and no nodes and we also handle the try block 
     def checkstep(self, args):
-        dataDict = {"type":"conditionSteps", "line":args[0].line, "condition":""} #initialised dictionary data
+        dataDict = {"condition":""} #initialised data of the ConditionNode()
         currentBlock = "try" # "pointer" to the current block (iteration follows)
         argsPos = 2 # "pointer" to the current argument (iteration follows)
         answer = "yes" # points to which answer block (yes/no) we are supposed to write data next
         for data in args[2:-1]:
-            if str(data) != '\n':
+            if data != '\n':
 
-                if str(data) == "check": currentBlock = "check"
+                if data == "check": currentBlock = "check"
 
                 if currentBlock == "try":
                     for step in data:
-                        if step["type"] == "changeUsers": #changing users directly in a try block (no process) can cause instability so we don't allow it (might change code to allow it later)
-                            self.console.error("You are changing users directly within a 'try' node. Use a process or change users beforehand", line=step["line"])
+                        if isinstance(step, ChangeUsersNode): #changing users directly in a try block (no process) can cause instability so we don't allow it (might change code to allow it later)
+                            self.console.error("You are changing users directly within a 'try' node. Use a process or change users beforehand", line=step.line)
                     dataDict["try"] = data
                 elif currentBlock == "check":
                     data = self.argumentCheck(data)
@@ -193,30 +221,30 @@ class ReduceTree(Transformer):
         #if both yes and no blocks contain retry/abort then the flow of the graph will be forced to stop, so we do not allow that.
         if (dataDict["yes"] and dataDict["yes"][-1] in ("retry", "abort")) and (dataDict["no"] and dataDict["no"][-1] in ("retry", "abort")):
             self.console.error("Both condition nodes of conditional structure (yes & no) include retry or abort. Graph forcibly stops.", line=args[0].line)
-        return dataDict
+        return ConditionNode(args[0].line, dataDict["condition"], dataDict["try"], dataDict["yes"], dataDict["no"])
 
     # if a userstep node is read, we transform the usersteps subtree to a dictionary. Note that we work bottom up so all the sub nodes are already transformed
     def userstep(self, args):
         users = {"users":[]}
         for token in args[1:-1]:
-            if str(token) != '\n':
+            if token != '\n':
                 users["users"].append(token)
         return users
 
-    # if a change_ userstep node is read, we transform the change_userstep subtree to an appropriate dictionary for later json conversion
+    # if a change_ userstep node is read, we transform the change_userstep subtree to a ChangeUsersNode() for later json conversion
     def change_userstep(self, args):
         add = [] #list with users added
         remove = [] #list with users removed
         temp = add #"pointer" to which command is used at the moment initialised to add for no reason    
         for token in args[2:-1]:
-            if str(token) != '\n':
-                if str(token) == "add":
+            if token != '\n':
+                if token == "add":
                     temp = add
-                elif str(token) == "remove":
+                elif token == "remove":
                     temp = remove
                 else:
                     temp.append(token)
-        return {"type":"changeUsers", "line":args[0].line, "add":add, "remove":remove}
+        return ChangeUsersNode(args[0].line, add, remove)
              
 
     # if a process node is read, we worked our way to the top therefore we can now extract the json (not supporting process calling yet)
@@ -224,36 +252,121 @@ class ReduceTree(Transformer):
         name = str(args[1])
         visible = "True"
         initialUsers = [] #list of the users defined at the start of the process
-        users = [] #list of current users as the process is executed
+        users = UserRoster() #current users as the process is executed (every "currentUsers" is a snapshot of it, see roster.py)
         if name[0] == "_": visible = "False"
         
         # we scan our data to determine the users after every "change user" block
         for data in args[3:-1]:
-            if str(data) != '\n':
+            if data != '\n':
                 if isinstance(data, dict): #this is roundabout way of determining we are in the "user" block data
                     initialUsers = data["users"]
-                    users = initialUsers.copy()
-                    for user in users:
-                        user.pop("line")
+                    for user in initialUsers:
+                        user.line = None #the lines of the users are not exported
+                    users = UserRoster(initialUsers)
                 else:
-                    for entry in data:
-                        if entry["type"] == "changeUsers":
-                            for user in entry["add"]:
-                                line = user.pop("line")
-                                if user in users:
-                                    self.console.warning("You are adding a user that is already in the user list. Will not re-add: " + self.console.colorName(user["name"]), line=line)
-                                else:
-                                    users.append(user)
-                            for user in entry["remove"]:
-                                line = user.pop("line")
-                                if user not in users:
-                                    self.console.warning("You are removing a user that is not in the user list. Will ignore: " + self.console.colorName(user["name"]), line=line)
-                                else:
-                                    users.remove(user)
-                            entry["currentUsers"] = users.copy()  
+                    for pos, entry in enumerate(data):
+                        if isinstance(entry, ChangeUsersNode):
+                            for user in entry.add:
+                                line, user.line = user.line, None
+                                if not users.add(user):
+                                    self.console.warning("You are adding a user that is already in the user list. Will not re-add: " + self.console.colorName(user.name), line=line)
+                            for user in entry.remove:
+                                line, user.line = user.line, None
+                                if not users.remove(user):
+                                    self.console.warning("You are removing a user that is not in the user list. Will ignore: " + self.console.colorName(user.name), line=line)
+                            entry.currentUsers = users.snapshot()
                         # if there is an invissible process, we need to visualise the change of users at the end of the process (going back to the users in the superprocess)
-                        elif entry["type"] == "process":
-                            if entry["visible"] == "False":
-                                entry["commands"].append({"type":"changeUsers", "add":[], "remove":[], "currentUsers":users.copy()})
+                        # called processes are shared by every call, so the invisible process is copied instead of changed in-place
+                        elif isinstance(entry, ProcessNode):
+                            if entry.visible == "False":
+                                data[pos] = entry.copy(commands=entry.commands + [ChangeUsersNode(None, [], [], users.snapshot())])
+                        elif isinstance(entry, dict) and entry["type"] == "process" and entry["visible"] == "False": #an imported process edited by a BPMML SCRIPT is a plain dict (see roster.plainData())
+                            data[pos] = dict(entry, commands=entry["commands"] + [ChangeUsersNode(None, [], [], users.snapshot())])
                     if visible == "False" and users: self.console.suggestion("You are adding users to invisible processes. Consider making them visible for better organisation.")
-        return {"type":"process", "file":self.fileName+".bpmml", "line":args[0].line, "name":name, "visible":visible, "users":initialUsers, "commands":data}
+        return ProcessNode(self.fileName+".bpmml", args[0].line, name, visible, initialUsers, data)
+
+class InlineReduceTree(ReduceTree):
+    """
+    Reduce the grammar nodes while they are being parsed (single pass) instead of transforming an already built tree.
+
+    Description:
+      InlineReduceTree() is given to a LALR parser as its transformer (see compiler.loadLanguage()), so every method runs as soon as its grammar rule is reduced and the tree of a process is never built.
+      Global arguments and imports are handed to a root handler as soon as they are parsed, so they are ready before the first process is reduced.
+      Global processes are placed in the readyProcessDict as soon as they are reduced and parsing returns the readyProcessDict.
+      The parser is shared by the whole session and imports are parsed while the importing file is still being parsed, so the state of every code file is pushed with begin() and restored with end().
+
+    Instance Variables (apart from the ReduceTree() ones):
+      rootHandler -- function with one argument (a "withstep" or "importstep" tree) that handles the global arguments and the imports of the code file
+      openProcesses -- integer containing the number of processes that have started but have not been reduced yet (0 means the next reduced process is a global one)
+      openImport -- boolean containing True if an import has started but has not been reduced yet (its arguments are not global arguments)
+
+    Public Methods (excluding tree reduction):
+      __init__(self)
+      begin(self, fileName, globalArgs, readyProcessDict, importedProcessDict, importedMainDict, console, rootHandler)
+      end(self)
+    """
+
+    _STATE = ("fileName", "globalArgs", "arguments", "readyProcessDict", "importedProcessDict", "importedMainDict", "console", "rootHandler", "openProcesses", "openImport")
+
+    def __init__(self):
+        """ Initialise """
+        super().__init__("", {}, {}, {}, {})
+        self.rootHandler = None
+        self.openProcesses = 0
+        self.openImport = False
+        self._saved = []
+
+    def begin(self, fileName, globalArgs, readyProcessDict, importedProcessDict, importedMainDict, console, rootHandler):
+        """ Save the state of the code file being parsed (if any) and start reducing a new code file (see ReduceTree() for the arguments)"""
+        self._saved.append(tuple(getattr(self, name) for name in self._STATE))
+        self.fileName = fileName
+        self.globalArgs = globalArgs
+        self.arguments = ArgumentSubstitution(globalArgs)
+        self.readyProcessDict = readyProcessDict
+        self.importedProcessDict = importedProcessDict
+        self.importedMainDict = importedMainDict
+        self.console = console
+        self.rootHandler = rootHandler
+        self.openProcesses = 0
+        self.openImport = False
+
+    def end(self):
+        """ Restore the state of the code file that was being parsed before the last begin()"""
+        for name, value in zip(self._STATE, self._saved.pop()):
+            setattr(self, name, value)
+
+    # the PROCESS token is shifted when a process starts, so we can tell global processes from the ones within other processes
+    def PROCESS(self, token):
+        self.openProcesses += 1
+        return token
+
+    # the arguments given to an import are reduced before the import itself, so we need to know if we are within an import
+    def IMPORT(self, token):
+        self.openImport = True
+        return token
+
+    # global arguments and imports must be handled before any process is reduced, which is the case as they are defined first
+    def withstep(self, args):
+        if self.openImport:
+            return Tree("withstep", args)
+        self.rootHandler(Tree("withstep", args))
+        return '\n'
+
+    def importstep(self, args):
+        self.openImport = False
+        self.rootHandler(Tree("importstep", args))
+        return '\n'
+
+    # a reduced process that is not within another process is a global process
+    def process(self, args):
+        reducedProcess = super().process(args)
+        self.openProcesses -= 1
+        if self.openProcesses == 0:
+            name = reducedProcess.name
+            if name in self.readyProcessDict.keys():
+                self.console.error("Two processes have the same name: " + self.console.colorName(name), line=args[0].line)
+            self.readyProcessDict[name] = reducedProcess
+        return reducedProcess
+
+    def start(self, args):
+        return self.readyProcessDict
@@ -0,0 +1,151 @@
+"""
+Imports:
+  import os
+  import time
+  from pathlib import Path
+  from colorama import Fore
+  from console import Console
+  from compiler import compileCode, loadLanguage, runVisualiser
+  from session import Session
+  from cache import ModuleCache
+  from batch import collectFiles
+
+Global Variables:
+  WATCH_INTERVAL -- float containing the seconds between two checks of the watched files
+
+Classes:
+  Watcher() -- keep the compiler warm and recompile code files as soon as they (or their imports) change
+"""
+import os
+import time
+from pathlib import Path
+from colorama import Fore
+from console import Console
+from compiler import compileCode, loadLanguage, runVisualiser
+from session import Session
+from cache import ModuleCache
+from batch import collectFiles
+
+WATCH_INTERVAL = 0.2
+
+class Watcher():
+    """
+    Keep the compiler warm and recompile code files as soon as they (or their imports) change.
+
+    Description:
+      Watcher() compiles every code file with a single Session(), so the parser and the compiled imports (see cache.ModuleCache()) stay in memory between compilations.
+      The files are polled (modification time and size), which works on every platform without extra libraries.
+      Every compilation records the files the code file was compiled from (itself and its imports, transitively). When a file changes only the code files depending on it are recompiled,
+      and their unchanged imports are served from the module cache.
+
+    Instance Variables:
+      paths -- list of strings containing the watched filenames, glob patterns or directories (see batch.collectFiles())
+      options -- dict containing the options of the compiler (see console.arguments())
+      session -- Session() object used by every compilation
+      dependencies -- dict containing the files every code file was compiled from (key: code file, value: list of absolute paths)
+
+    Public Methods:
+      __init__(self, paths, options, session=None)
+      compile(self, codefile)
+      poll(self)
+      run(self, interval=WATCH_INTERVAL)
+    """
+
+    def __init__(self, paths, options, session=None):
+        """
+        Initialise Watcher object.
+
+        Arguments:
+          paths -- list of strings containing filenames, glob patterns or directories to be watched (see batch.collectFiles())
+          options -- dict containing the options of the compiler (see console.arguments())
+          session -- (optional) Session() object used by every compilation. Defaults to a new Session() built from the options (with an in-memory module cache if none is given)
+        """
+        self.paths = paths
+        self.options = options
+        if session is None:
+            session = Session.fromOptions(loadLanguage, options)
+        if session.moduleCache is None:
+            session.moduleCache = ModuleCache()
+        self.session = session
+        self.dependencies = {}
+        self._stamps = {}
+
+    def compile(self, codefile):
+        """
+        Compile a code file, print the result and return True/False depending on the success of the compilation.
+
+        Arguments:
+          codefile -- string containing the filename of the code file to be compiled (IMPORTANT: with extension)
+
+        Note:
+          Errors of the compiler (sys.exit() of Console.error()) and unexpected exceptions are caught and reported, so that watching continues.
+          The visualiser is run after every successful compilation, if it was requested.
+        """
+        console = Console()
+        start = time.time()
+        success = False
+        self.session.moduleCache.begin(codefile)
+        try:
+            compileCode(codefile, console=console, output=self.options["output"], pretty=self.options["pretty"], importedArgs={}, session=self.session)
+            success = True
+        except SystemExit:
+            pass
+        except Exception as error:
+            console.error("Unexpected " + type(error).__name__ + ": " + str(error), exitCompiler=False)
+        finally:
+            record = self.session.moduleCache.end()
+            del self.session.scripts[:]
+        self.dependencies[codefile] = list(record["dependencies"])
+        for path in self.dependencies[codefile]:
+            self._stamps.setdefault(path, self._stamp(path))
+        if success:
+            print(Fore.GREEN + "Compiled " + Fore.YELLOW + codefile + Fore.GREEN + " in" + Fore.CYAN + " %.1f ms" % ((time.time() - start) * 1000) + Fore.RESET)
+            if self.options["visualise"]:
+                try:
+                    runVisualiser(codefile, self.options["stylise"], self.options["output"], self.options["binary"])
+                except Exception:
+                    console.warning("The visualiser executable was not found. Visualisation aborted.")
+        console.closeLog()
+        return success
+
+    def poll(self):
+        """
+        Check the watched files once, recompile the code files that are new or depend on a changed file and return a list of them.
+
+        Note:
+          The remembered hashes of the module cache are dropped before recompiling, so the changed files are read again.
+        """
+        changed = set()
+        for path, stamp in self._stamps.items():
+            current = self._stamp(path)
+            if current != stamp:
+                self._stamps[path] = current
+                changed.add(path)
+        codefiles = [codefile for codefile in collectFiles(self.paths) if codefile not in self.dependencies or changed.intersection(self.dependencies[codefile])]
+        if codefiles:
+            self.session.moduleCache.refresh()
+        for codefile in codefiles:
+            self.compile(codefile)
+        return codefiles
+
+    def run(self, interval=WATCH_INTERVAL):
+        """
+        Compile every watched code file, then keep recompiling them on change until interrupted (Ctrl+C).
+
+        Arguments:
+          interval -- (optional) float containing the seconds between two checks of the watched files. Defaults to WATCH_INTERVAL
+        """
+        print("Watching " + ", ".join(self.paths) + " (press Ctrl+C to stop)")
+        try:
+            while True:
+                self.poll()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("Stopped watching")
+
+    def _stamp(self, path):
+        try:
+            stat = os.stat(path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None